@@ -29,7 +29,8 @@ def create_index(use_langchain: bool = False):
     # Run pdf_to_json
     result = subprocess.run([
         str(python_path),
-        f"{base_path}/pdf_to_json.py"
+        "-m",
+        f"{base_path.replace('/', '.')}.pdf_to_json"
     ])
     if result.returncode != 0:
         return result.returncode
@@ -1,17 +1,19 @@
 import logging
-from typing import Optional
+from typing import List, Optional
 from server.src.data_model import PDFAgentResponse, pdfAgentFn
 from server.src.tools.pdf_tools import get_pdf_context
+from server.src.index.collections import resolve_collections
 from server.src.prompts.prompts import PDF_AGENT_PROMPT
 
 logger = logging.getLogger(__name__)
 
-def create_pdf_agent() -> pdfAgentFn:
-    """Factory function to create PDF agent functionality"""
-    
-    # Initialize index path at creation time
-    index_path = "server/tmp/indexes"
-    logger.debug(f"Initializing PDF agent with index: {index_path}")
+def create_pdf_agent(collections: Optional[List[str]] = None) -> pdfAgentFn:
+    """Factory function to create PDF agent functionality.
+
+    Queries go to the given collections (PDF_COLLECTIONS by default) and
+    the top chunks of all of them are merged.
+    """
+    logger.debug(f"Initializing PDF agent with collections: {collections or 'from PDF_COLLECTIONS'}")
     
     async def process_query(query: str) -> Optional[PDFAgentResponse]:
         """Process a PDF-related query using the index"""
@@ -22,14 +24,26 @@ def create_pdf_agent() -> pdfAgentFn:
             if not query or query.isspace():
                 return None
             
-            context = await get_pdf_context(query, index_path)
+            # Resolved per query so collections built while running are picked up
+            index_paths = resolve_collections(collections)
+            context = await get_pdf_context(query, index_paths)
             
             if context and context.relevant_chunks:
                 # Format chunks for prompt
                 formatted_chunks = []
                 for chunk in context.relevant_chunks:
+                    # Pages belong to the chunk's own file, not the near-identical
+                    # passages in other documents folded into it
+                    primary = chunk.source_file
+                    if chunk.page_start is not None:
+                        pages = (
+                            f"page {chunk.page_start}" if chunk.page_start == chunk.page_end
+                            else f"pages {chunk.page_start}-{chunk.page_end}"
+                        )
+                        primary = f"{primary} ({pages})"
+                    sources = ", ".join([primary, *chunk.duplicate_sources])
                     formatted_chunks.append(
-                        f"Source: {chunk.source_file}\n"
+                        f"Source: {sources}\n"
                         f"Relevance: {chunk.similarity_score:.2f}\n"
                         f"Content: {chunk.text}\n"
                     )
@@ -36,6 +36,8 @@ class ChunkMetadata(BaseModel):
     total_chunks: int
     chunk_size: int
     chunking_strategy: str
+    start_index: Optional[int] = None  # Character offsets into the document text
+    end_index: Optional[int] = None
 
 class DocumentChunk(BaseModel):
     """Represents a chunk of text with its metadata"""
@@ -43,6 +45,48 @@ class DocumentChunk(BaseModel):
     metadata: ChunkMetadata
     embedding: Optional[List[float]] = None
 
+class IndexType(str, Enum):
+    FLAT = "flat"
+    IVF_FLAT = "ivf_flat"
+    HNSW = "hnsw"
+    IVF_PQ = "ivf_pq"
+    SQ8 = "sq8"
+    PQ = "pq"
+
+class IndexConfig(BaseModel):
+    """How the FAISS index is built and searched"""
+    index_type: IndexType = IndexType.FLAT
+    nlist: Optional[int] = None  # IVF cells, defaults to 4 * sqrt(num vectors)
+    nprobe: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    pq_m: int = 16  # PQ sub-quantizers, must divide the embedding dimension
+    pq_bits: int = 8
+    train_sample_size: int = 50000
+    rescore: bool = False  # Re-score candidates exactly against the stored float16 vectors
+    rescore_factor: int = 5  # Candidates fetched per result when re-scoring
+
+class IndexBenchmarkResult(BaseModel):
+    """Recall and latency of one index operating point against exact search"""
+    index_type: IndexType
+    search_params: Dict[str, int]
+    rescore: bool = False
+    k: int
+    recall_at_k: float
+    latency_ms: float
+    build_time_seconds: float
+    memory_bytes: int
+
+class ExtractionStats(BaseModel):
+    """Extraction throughput for one PDF"""
+    source_file: str
+    pages: int
+    characters: int
+    seconds: float  # Extraction time summed over the file's page ranges
+    pages_per_second: float
+    cached: bool = False  # Served from the extraction cache without opening the PDF
+
 class PDFContext(BaseModel):
     """Represents a chunk of context from PDF documents"""
     text: str
@@ -50,6 +94,135 @@ class PDFContext(BaseModel):
     chunk_id: int
     total_chunks: int
     similarity_score: float
+    duplicate_sources: List[str] = []  # Other documents with a near-identical chunk folded into this one
+    page_start: Optional[int] = None  # Pages the chunk spans, numbered from 1, when page offsets were stored
+    page_end: Optional[int] = None
+
+class PDFPage(BaseModel):
+    """One page of a processed PDF, served from the chunk store"""
+    source_file: str
+    page: int  # Numbered from 1
+    num_pages: int
+    text: str
+
+class MetadataFilter(BaseModel):
+    """Restricts a PDF query to chunks whose metadata matches every given field"""
+    source_files: Optional[List[str]] = None
+    titles: Optional[List[str]] = None
+    authors: Optional[List[str]] = None
+    date_from: Optional[str] = None  # Inclusive creation date bounds, e.g. "2023-01-01" or "2024"
+    date_to: Optional[str] = None
+    chunking_strategies: Optional[List[str]] = None
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in self.model_dump().values())
+
+class EmbeddingModelStats(BaseModel):
+    """Load statistics for a resident embedding model"""
+    model_name: str
+    device: str
+    precision: str
+    backend: str = "torch"
+    load_time_seconds: float
+    memory_bytes: int
+
+class EncodeStats(BaseModel):
+    """Throughput of one batched embedding run"""
+    chunks: int
+    batches: int
+    seconds: float
+    chunks_per_second: float
+    padding_ratio: float  # Padded tokens encoded per real token, 1.0 means no padding
+
+class EmbeddingCacheStats(BaseModel):
+    """Hit rate of the on-disk embedding cache"""
+    path: str
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
+
+class ExtractionCacheStats(BaseModel):
+    """Hit rate and size of the extracted-text cache"""
+    path: str
+    entries: int
+    compressed_bytes: int
+    hits: int
+    misses: int
+    hit_rate: float
+
+class QueryCacheStats(BaseModel):
+    """Size and hit rate of the in-memory query embedding cache"""
+    entries: int
+    bytes: int
+    max_entries: int
+    max_bytes: Optional[int] = None
+    hits: int
+    misses: int
+    hit_rate: float
+
+class RetrievalBatcherStats(BaseModel):
+    """How many queries each micro-batched encode and search served"""
+    queries: int
+    batches: int
+    mean_batch_size: float
+    max_batch_size: int
+    max_wait_ms: float
+
+class IndexCacheStats(BaseModel):
+    """Resident indexes and how they fit the memory budget"""
+    resident: List[str]  # Index paths, least recently used first
+    resident_bytes: int  # On-disk size of the resident index files
+    budget_bytes: int
+    loads: int
+    evictions: int
+
+class RetrievalTimings(BaseModel):
+    """Wall time of each retrieval stage for one batch of queries"""
+    queries: int
+    reranker: str  # none, exact or cross_encoder
+    candidates: int  # First-stage width per query
+    embed_ms: float
+    search_ms: float
+    fusion_ms: float
+    rerank_ms: float
+    total_ms: float
+
+class RetrievalStageStats(BaseModel):
+    """Mean per-batch time of each retrieval stage since startup"""
+    batches: int
+    embed_ms: float
+    search_ms: float
+    fusion_ms: float
+    rerank_ms: float
+    total_ms: float
+
+class ExecutorStats(BaseModel):
+    """Queue depth and throughput of one blocking-work thread pool"""
+    name: str
+    max_workers: int
+    max_pending: int
+    waiting: int  # Callers waiting for admission on the event loop
+    queued: int  # Submitted to the pool but not started
+    running: int
+    completed: int
+    peak_queued: int
+
+class BackendBenchmarkResult(BaseModel):
+    """Speed and agreement with the stock torch model for one embedding backend"""
+    backend: str
+    query_latency_ms: float  # Median time to embed a single query
+    chunks_per_second: float
+    mean_cosine: float
+    min_cosine: float
+    load_time_seconds: float
+
+class HybridBenchmarkResult(BaseModel):
+    """Retrieval quality and search latency for one ranking method"""
+    method: str  # vector, lexical or hybrid
+    recall_at_k: float  # Share of queries whose source chunk is in the top k
+    mrr: float
+    latency_ms: float  # Median search time per query, query embedding excluded
 
 class PDFAgentResponse(BaseModel):
     """Response specific to PDF agent queries"""
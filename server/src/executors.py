@@ -0,0 +1,127 @@
+import asyncio
+import functools
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, TypeVar
+from server.src.data_model import ExecutorStats
+from server.utils.config import get_executor_config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# retrieval: CPU-bound embedding and FAISS search; io: blocking HTTP clients
+EXECUTOR_NAMES = ["retrieval", "io"]
+
+class BoundedExecutor:
+    """Thread pool that admits at most max_workers + max_pending jobs.
+
+    Callers over the limit wait on the event loop rather than piling
+    work into the pool, so one slow tool cannot queue without bound.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        # asyncio semaphores belong to one event loop
+        self._admission: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self.waiting = 0  # Waiting for admission on the event loop
+        self.queued = 0  # Submitted to the pool, not started
+        self.running = 0
+        self.completed = 0
+        self.peak_queued = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._admission.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_workers + self.max_pending)
+            self._admission[loop] = semaphore
+        return semaphore
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call in the pool without blocking the event loop"""
+        semaphore = self._semaphore()
+        with self._lock:
+            self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        try:
+            with self._lock:
+                self.queued += 1
+                self.peak_queued = max(self.peak_queued, self.queued)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._call, functools.partial(fn, *args, **kwargs))
+        finally:
+            semaphore.release()
+
+    def _call(self, fn: Callable[[], T]) -> T:
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def stats(self) -> ExecutorStats:
+        with self._lock:
+            return ExecutorStats(
+                name=self.name,
+                max_workers=self.max_workers,
+                max_pending=self.max_pending,
+                waiting=self.waiting,
+                queued=self.queued,
+                running=self.running,
+                completed=self.completed,
+                peak_queued=self.peak_queued
+            )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+def get_executor(name: str) -> BoundedExecutor:
+    """Get a named pool, creating it from the configured sizes on first use"""
+    if name not in EXECUTOR_NAMES:
+        raise ValueError(f"Unknown executor '{name}', expected one of {EXECUTOR_NAMES}")
+    executor = _executors.get(name)
+    if executor is not None:
+        return executor
+
+    with _executors_lock:
+        if name not in _executors:
+            config = get_executor_config()
+            _executors[name] = BoundedExecutor(name, config[f"{name}_workers"], config["max_pending"])
+            logger.info(f"Started {name} executor with {config[f'{name}_workers']} workers")
+        return _executors[name]
+
+async def run_blocking(name: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run fn(*args, **kwargs) in the named pool"""
+    return await get_executor(name).run(fn, *args, **kwargs)
+
+def get_executor_stats() -> List[ExecutorStats]:
+    """Queue depth and throughput of every started pool"""
+    return [executor.stats() for executor in _executors.values()]
+
+def shutdown_executors() -> None:
+    """Stop every pool; they are recreated on next use"""
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown()
+        _executors.clear()
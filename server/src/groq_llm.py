@@ -9,6 +9,7 @@ from server.src.agents.pdf_agent import create_pdf_agent
 from server.src.agents.meta_agent import analyze_query
 from server.src.agents.web_agent import create_web_agent
 from server.src.agents.finance_agent import create_finance_agent
+from server.src.executors import run_blocking
 from server.src.prompts.prompts import (
     META_AGENT_PROMPT,
     WEB_AGENT_PROMPT,
@@ -82,7 +83,8 @@ def create_groq_llm() -> llmFn:
             if Intent.FINANCE_AGENT in intents:
                 try:
                     finance_agent = create_finance_agent()
-                    finance_context = finance_agent(llm_request.query)
+                    # finance_search uses blocking requests, keep it off the event loop
+                    finance_context = await run_blocking("io", finance_agent, llm_request.query)
                 except Exception as finance_error:
                     logger.error(f"Finance agent error: {finance_error}")
                     finance_context = None
@@ -0,0 +1,80 @@
+import time
+import logging
+from typing import List, Optional
+import numpy as np
+from server.src.data_model import BackendBenchmarkResult
+from .embedding_registry import SUPPORTED_BACKENDS, get_embedding_model, get_embedding_model_stats
+from .batch_encoder import encode_batched
+
+logger = logging.getLogger(__name__)
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity between two embedding matrices"""
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    return np.sum(reference * candidate, axis=1)
+
+def benchmark_backends(
+    texts: List[str],
+    queries: List[str],
+    backends: Optional[List[str]] = None,
+    model_name: Optional[str] = None,
+    batch_size: Optional[int] = None
+) -> List[BackendBenchmarkResult]:
+    """Measure query latency, throughput and cosine agreement with the torch backend"""
+    backends = backends or SUPPORTED_BACKENDS
+    reference = None
+    results = []
+
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        model = get_embedding_model(model_name, device="cpu", precision="float32", backend=backend)
+        load_time = next(
+            (s.load_time_seconds for s in get_embedding_model_stats() if s.backend == backend),
+            0.0
+        )
+
+        embeddings, stats = encode_batched(model, texts, batch_size)
+        if reference is None:
+            reference = embeddings
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            model.encode([query])
+            latencies.append(time.perf_counter() - start)
+
+        agreement = cosine_agreement(reference, embeddings)
+        if backend in backends:
+            results.append(BackendBenchmarkResult(
+                backend=backend,
+                query_latency_ms=float(np.median(latencies)) * 1000,
+                chunks_per_second=stats.chunks_per_second,
+                mean_cosine=float(agreement.mean()),
+                min_cosine=float(agreement.min()),
+                load_time_seconds=load_time
+            ))
+    return results
+
+def print_backend_report(results: List[BackendBenchmarkResult]) -> None:
+    print(f"{'backend':<8} {'query ms':>9} {'chunks/s':>9} {'mean cos':>9} {'min cos':>9} {'load s':>7}")
+    for r in results:
+        print(
+            f"{r.backend:<8} {r.query_latency_ms:>9.2f} {r.chunks_per_second:>9.1f} "
+            f"{r.mean_cosine:>9.4f} {r.min_cosine:>9.4f} {r.load_time_seconds:>7.2f}"
+        )
+
+if __name__ == "__main__":
+    import argparse
+    from .json_to_index import load_and_split_texts
+
+    parser = argparse.ArgumentParser(description="Compare CPU embedding backends against the stock torch model")
+    parser.add_argument("--text-folder", default="./server/tmp/processed")
+    parser.add_argument("--backends", nargs="+", choices=SUPPORTED_BACKENDS, default=SUPPORTED_BACKENDS)
+    parser.add_argument("--limit", type=int, default=1000, help="Chunks to embed")
+    parser.add_argument("--num-queries", type=int, default=50)
+    args = parser.parse_args()
+
+    texts = [chunk.text for chunk in load_and_split_texts(args.text_folder)][:args.limit]
+    # Queries are short, like the questions the PDF agent receives
+    queries = [" ".join(text.split()[:12]) for text in texts[:args.num_queries]]
+    print_backend_report(benchmark_backends(texts, queries, args.backends))
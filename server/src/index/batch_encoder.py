@@ -0,0 +1,111 @@
+import time
+import logging
+from typing import List, Optional, Tuple
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from tqdm import tqdm
+from server.src.data_model import EncodeStats
+from server.utils.config import get_embedding_config
+
+logger = logging.getLogger(__name__)
+
+def token_lengths(model: SentenceTransformer, texts: List[str]) -> np.ndarray:
+    """Token count of each text after truncation, characters when the model has no tokenizer"""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None or not texts:
+        return np.array([len(text) for text in texts], dtype=np.int64)
+    max_length = getattr(model, "max_seq_length", None) or tokenizer.model_max_length
+    encoded = tokenizer(texts, truncation=True, max_length=max_length, return_length=True)
+    return np.asarray(encoded["length"], dtype=np.int64)
+
+def length_batches(
+    lengths: np.ndarray,
+    batch_size: int,
+    max_batch_tokens: Optional[int] = None
+) -> List[np.ndarray]:
+    """Group text positions into batches of similar length, longest first.
+
+    Each batch pads to its first (longest) text, so with max_batch_tokens
+    short texts are packed into larger batches under the same padded size.
+    """
+    order = np.argsort(-lengths, kind="stable")
+    batches = []
+    start = 0
+    while start < len(order):
+        size = batch_size
+        if max_batch_tokens:
+            size = min(size, max(1, max_batch_tokens // max(int(lengths[order[start]]), 1)))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+def encode_batched(
+    model: SentenceTransformer,
+    texts: List[str],
+    batch_size: Optional[int] = None,
+    max_batch_tokens: Optional[int] = None,
+    show_progress_bar: bool = False
+) -> Tuple[np.ndarray, EncodeStats]:
+    """Embed texts in length-sorted batches and return them in input order as float32"""
+    config = get_embedding_config()
+    batch_size = batch_size or config["batch_size"]
+    max_batch_tokens = max_batch_tokens or config["max_batch_tokens"]
+
+    started = time.perf_counter()
+    lengths = token_lengths(model, texts)
+    batches = length_batches(lengths, batch_size, max_batch_tokens)
+
+    embeddings: Optional[np.ndarray] = None
+    padded_tokens = 0
+    for positions in tqdm(batches, desc="Embedding", disable=not show_progress_bar):
+        batch_embeddings = np.asarray(
+            model.encode([texts[i] for i in positions], batch_size=len(positions)),
+            dtype=np.float32
+        )
+        if embeddings is None:
+            embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+        embeddings[positions] = batch_embeddings
+        padded_tokens += len(positions) * int(lengths[positions[0]])
+
+    if embeddings is None:
+        embeddings = np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    seconds = time.perf_counter() - started
+    stats = EncodeStats(
+        chunks=len(texts),
+        batches=len(batches),
+        seconds=seconds,
+        chunks_per_second=len(texts) / max(seconds, 1e-9),
+        padding_ratio=padded_tokens / max(int(lengths.sum()), 1)
+    )
+    if len(texts) > 1:
+        logger.info(
+            f"Embedded {stats.chunks} texts in {stats.batches} batches, "
+            f"{stats.chunks_per_second:.1f} chunks/s, padding ratio {stats.padding_ratio:.2f}"
+        )
+    return embeddings, stats
+
+if __name__ == "__main__":
+    import argparse
+    from .embedding_registry import get_embedding_model
+    from .json_to_index import load_and_split_texts
+
+    parser = argparse.ArgumentParser(description="Compare a single model.encode call with length-bucketed embedding throughput")
+    parser.add_argument("--text-folder", default="./server/tmp/processed")
+    parser.add_argument("--batch-size", type=int, default=get_embedding_config()["batch_size"])
+    parser.add_argument("--max-batch-tokens", type=int, default=None)
+    parser.add_argument("--limit", type=int, default=2000, help="Chunks to embed")
+    args = parser.parse_args()
+
+    model = get_embedding_model()
+    texts = [chunk.text for chunk in load_and_split_texts(args.text_folder)][:args.limit]
+
+    # What index builds did before: one encode call, which already sorts its input by length
+    started = time.perf_counter()
+    model.encode(texts, batch_size=args.batch_size, convert_to_tensor=True)
+    baseline = len(texts) / (time.perf_counter() - started)
+
+    _, stats = encode_batched(model, texts, args.batch_size, args.max_batch_tokens)
+    print(f"{len(texts)} chunks, batch size {args.batch_size}")
+    print(f"Single encode:   {baseline:.1f} chunks/s")
+    print(f"Length bucketed: {stats.chunks_per_second:.1f} chunks/s (padding ratio {stats.padding_ratio:.2f})")
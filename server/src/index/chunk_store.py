@@ -0,0 +1,585 @@
+import io
+import os
+import json
+import mmap
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+from server.src.data_model import DocumentChunk, ChunkMetadata, PDFContext
+
+# Flat UTF-8 text blob, fixed-width chunk rows and a small documents table;
+# the blob and rows can be memory-mapped. Each document's text is stored
+# once and chunks are byte ranges into it, so overlap costs nothing.
+CHUNK_STORE_FILES = [
+    "text.bin",
+    "chunks.npy",
+    "documents.json"
+]
+
+# Near-duplicate chunks folded into another row at build time; optional,
+# older stores have none
+DUPLICATES_FILE = "duplicates.npy"
+
+# Byte offset in text.bin where every page of every stored document starts,
+# plus each document's end; documents point at their slice with
+# pages_start / pages_end. Optional, like the duplicates table
+PAGES_FILE = "pages.npy"
+
+# Chunking strategies are stored as a one-byte code per chunk
+CHUNKING_STRATEGIES = ["regular", "dense", "tokens"]
+
+# One row per chunk; document fields live once in the documents table.
+# Rows are kept in ascending vector_id order, the id of the chunk's vector
+# in the FAISS index.
+CHUNK_ROW_DTYPE = np.dtype([
+    ("vector_id", np.int64),
+    ("doc_id", np.int32),
+    ("chunk_id", np.int32),
+    ("total_chunks", np.int32),
+    ("chunk_size", np.int32),
+    ("text_start", np.int64),  # Byte offsets into text.bin
+    ("text_end", np.int64),
+    ("char_start", np.int32),  # Character offsets into the document text, -1 if unknown
+    ("char_end", np.int32),
+    ("strategy", np.uint8)
+])
+
+# One row per folded duplicate, sorted by the row of the chunk whose vector
+# it shares; text offsets point into text.bin like chunk rows
+DUPLICATE_ROW_DTYPE = np.dtype(
+    [("row", np.int32)] + [(name, CHUNK_ROW_DTYPE[name]) for name in CHUNK_ROW_DTYPE.names if name != "vector_id"]
+)
+
+DOCUMENT_FIELDS = ["title", "author", "creation_date", "source_file"]
+
+def replace_file(path: str, write_fn: Callable[[BinaryIO], None]) -> None:
+    """Write to a temp file and rename it into place.
+
+    Servers may have the old file memory-mapped; truncating it in place
+    would crash them, a rename leaves their mapping intact.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write_fn(f)
+    os.replace(tmp_path, path)
+
+def save_array(path: str, array: np.ndarray) -> None:
+    """Save a .npy file without disturbing existing mappings of it"""
+    replace_file(path, lambda f: np.save(f, array))
+
+def map_file(path: str) -> Union[mmap.mmap, bytes]:
+    """Memory-map a file read-only"""
+    with open(path, "rb") as f:
+        # mmap can't map empty files
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def utf8_offsets(text: str) -> np.ndarray:
+    """Byte offset in the UTF-8 encoding of every character position"""
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    widths = 1 + (codepoints >= 0x80) + (codepoints >= 0x800) + (codepoints >= 0x10000)
+    offsets = np.zeros(len(text) + 1, dtype=np.int64)
+    np.cumsum(widths, out=offsets[1:])
+    return offsets
+
+def ids_to_rows(vector_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Map FAISS ids to row numbers in a sorted vector_id column, -1 where absent"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(vector_ids) == 0:
+        return np.full(ids.shape, -1, dtype=np.int64)
+    rows = np.searchsorted(vector_ids, ids)
+    rows = np.minimum(rows, len(vector_ids) - 1)
+    return np.where((vector_ids[rows] == ids) & (ids >= 0), rows, -1)
+
+class ChunkStoreWriter:
+    """Appends chunks to a text blob as they arrive, for stores too large to encode at once"""
+
+    def __init__(self, text_file: BinaryIO):
+        self.text_file = text_file
+        self.offset = 0
+        self.documents: List[Dict[str, Any]] = []
+        self._document_ids: Dict[Tuple[str, ...], int] = {}
+        # Character to byte offsets (8 bytes per character) of the last non-ASCII document only
+        self._offsets_doc_id: Optional[int] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._rows = np.zeros(1024, dtype=CHUNK_ROW_DTYPE)
+        self._num_rows = 0
+        self._duplicates: List[Tuple[int, ...]] = []
+        self._pages: List[np.ndarray] = []
+        self._num_pages = 0
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self._rows[:self._num_rows]
+
+    def _write(self, data: bytes) -> Tuple[int, int]:
+        self.text_file.write(data)
+        start = self.offset
+        self.offset += len(data)
+        return start, self.offset
+
+    def _add_document(
+        self,
+        key: Tuple[str, ...],
+        document_text: Optional[str],
+        content_hash: Optional[str],
+        page_offsets: Optional[List[int]] = None
+    ) -> int:
+        doc_id = len(self.documents)
+        self._document_ids[key] = doc_id
+        document: Dict[str, Any] = dict(zip(DOCUMENT_FIELDS, key))
+        if content_hash is not None:
+            document["content_hash"] = content_hash
+
+        self.documents.append(document)
+        if document_text is not None:
+            document["text_start"], document["text_end"] = self._write(document_text.encode("utf-8"))
+            if page_offsets is not None:
+                offsets = np.asarray(page_offsets, dtype=np.int64)
+                positions = self._byte_positions(doc_id, document_text)
+                self._pages.append(document["text_start"] + (offsets if positions is None else positions[offsets]))
+                document["pages_start"] = self._num_pages
+                self._num_pages += len(offsets)
+                document["pages_end"] = self._num_pages
+        return doc_id
+
+    def _byte_positions(self, doc_id: int, document_text: str) -> Optional[np.ndarray]:
+        """Byte offset of every character of a stored document, None for ASCII text where they match.
+
+        Only the most recent document's offsets are kept: chunks arrive
+        grouped by document, so memory stays bounded by the largest
+        document rather than growing with the corpus.
+        """
+        document = self.documents[doc_id]
+        if document["text_end"] - document["text_start"] == len(document_text):
+            return None
+        if self._offsets_doc_id != doc_id:
+            self._offsets_doc_id, self._offsets = doc_id, utf8_offsets(document_text)
+        return self._offsets
+
+    def _locate(
+        self,
+        chunk: DocumentChunk,
+        document_text: Optional[str],
+        content_hash: Optional[str],
+        page_offsets: Optional[List[int]]
+    ) -> Tuple[int, int, int, int, int]:
+        """Document id, byte range and character range of a chunk, writing whatever text is new"""
+        metadata = chunk.metadata
+        key = tuple(getattr(metadata, field) for field in DOCUMENT_FIELDS)
+        doc_id = self._document_ids.get(key)
+        if doc_id is None:
+            doc_id = self._add_document(key, document_text, content_hash, page_offsets)
+        document = self.documents[doc_id]
+
+        if "text_start" in document and document_text is not None and metadata.start_index is not None:
+            char_start, char_end = metadata.start_index, metadata.end_index
+            positions = self._byte_positions(doc_id, document_text)
+            if positions is None:
+                text_start = document["text_start"] + char_start
+                text_end = document["text_start"] + char_end
+            else:
+                text_start = document["text_start"] + int(positions[char_start])
+                text_end = document["text_start"] + int(positions[char_end])
+        else:
+            text_start, text_end = self._write(chunk.text.encode("utf-8"))
+            char_start = char_end = -1
+        return doc_id, text_start, text_end, char_start, char_end
+
+    def add_chunk(
+        self,
+        chunk: DocumentChunk,
+        vector_id: int,
+        document_text: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        page_offsets: Optional[List[int]] = None
+    ) -> None:
+        """Append one chunk; the document text and page offsets are written when its first chunk arrives"""
+        doc_id, text_start, text_end, char_start, char_end = self._locate(
+            chunk, document_text, content_hash, page_offsets
+        )
+        metadata = chunk.metadata
+        if self._num_rows == len(self._rows):
+            self._rows = np.concatenate([self._rows, np.zeros_like(self._rows)])
+        self._rows[self._num_rows] = (
+            vector_id,
+            doc_id,
+            metadata.chunk_id,
+            metadata.total_chunks,
+            metadata.chunk_size,
+            text_start,
+            text_end,
+            char_start,
+            char_end,
+            CHUNKING_STRATEGIES.index(metadata.chunking_strategy)
+        )
+        self._num_rows += 1
+
+    def add_duplicate(
+        self,
+        chunk: DocumentChunk,
+        row: int,
+        document_text: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        page_offsets: Optional[List[int]] = None
+    ) -> None:
+        """Record a near-duplicate chunk served by the vector of an existing row"""
+        doc_id, text_start, text_end, char_start, char_end = self._locate(
+            chunk, document_text, content_hash, page_offsets
+        )
+        metadata = chunk.metadata
+        self._duplicates.append((
+            row,
+            doc_id,
+            metadata.chunk_id,
+            metadata.total_chunks,
+            metadata.chunk_size,
+            text_start,
+            text_end,
+            char_start,
+            char_end,
+            CHUNKING_STRATEGIES.index(metadata.chunking_strategy)
+        ))
+
+    def _copy_document(self, store: "ChunkStore", doc_id: int) -> Tuple[int, int]:
+        """Copy a document entry with its text and page offsets; returns its id here and the byte shift"""
+        document = dict(store.documents[doc_id])
+        new_doc_id = len(self.documents)
+        self._document_ids[tuple(document[field] for field in DOCUMENT_FIELDS)] = new_doc_id
+        self.documents.append(document)
+        if "text_start" not in document:
+            return new_doc_id, 0
+
+        shift = self.offset - document["text_start"]
+        document["text_start"], document["text_end"] = self._write(
+            store.texts[document["text_start"]:document["text_end"]]
+        )
+        if "pages_start" in document:
+            bounds = np.asarray(store.pages[document["pages_start"]:document["pages_end"]], dtype=np.int64)
+            self._pages.append(bounds + shift)
+            document["pages_start"] = self._num_pages
+            self._num_pages += len(bounds)
+            document["pages_end"] = self._num_pages
+        return new_doc_id, shift
+
+    def _copy_rows(self, store: "ChunkStore", table: np.ndarray, doc_ids: np.ndarray, shifts: np.ndarray) -> np.ndarray:
+        """Point copied chunk or duplicate rows at their documents' new ids and text here"""
+        table = np.array(table)
+        # Rows with a character range are slices of their document's text, the rest carry their own copy
+        in_document = table["char_start"] >= 0
+        shift = shifts[table["doc_id"][in_document]]
+        table["text_start"][in_document] += shift
+        table["text_end"][in_document] += shift
+        for i in np.flatnonzero(~in_document):
+            table["text_start"][i], table["text_end"][i] = self._write(
+                store.texts[table["text_start"][i]:table["text_end"][i]]
+            )
+        table["doc_id"] = doc_ids[table["doc_id"]]
+        return table
+
+    def add_stored(
+        self,
+        store: "ChunkStore",
+        doc_ids: List[int],
+        rows: np.ndarray,
+        duplicates: np.ndarray,
+        duplicate_rows: np.ndarray
+    ) -> None:
+        """Copy documents, chunk rows and folded duplicates of another store without decoding them.
+
+        doc_ids are the documents to carry over with their text and page
+        offsets; rows (ascending, in doc_ids' documents) are appended with
+        their vector ids. duplicates are positions in the store's
+        duplicates table, folded into duplicate_rows of this writer.
+        Chunks added afterwards find the copied documents by metadata.
+        """
+        new_doc_ids = np.full(len(store.documents), -1, dtype=np.int64)
+        shifts = np.zeros(len(store.documents), dtype=np.int64)
+        for doc_id in doc_ids:
+            new_doc_ids[doc_id], shifts[doc_id] = self._copy_document(store, doc_id)
+
+        copied = self._copy_rows(store, store.rows[rows], new_doc_ids, shifts)
+        capacity = len(self._rows)
+        while capacity < self._num_rows + len(copied):
+            capacity *= 2
+        if capacity > len(self._rows):
+            self._rows = np.concatenate([self._rows, np.zeros(capacity - len(self._rows), dtype=CHUNK_ROW_DTYPE)])
+        self._rows[self._num_rows:self._num_rows + len(copied)] = copied
+        self._num_rows += len(copied)
+
+        copied = self._copy_rows(store, store.duplicates[duplicates], new_doc_ids, shifts)
+        copied["row"] = duplicate_rows
+        self._duplicates.extend(copied.tolist())
+
+    @property
+    def pages(self) -> np.ndarray:
+        return np.concatenate(self._pages) if self._pages else np.zeros(0, dtype=np.int64)
+
+    @property
+    def duplicates(self) -> np.ndarray:
+        duplicates = np.array(self._duplicates, dtype=DUPLICATE_ROW_DTYPE)
+        return duplicates[np.argsort(duplicates["row"], kind="stable")]
+
+    def save_tables(self, index_path: str) -> None:
+        """Save the rows, duplicates, pages and documents table next to the text blob"""
+        save_array(os.path.join(index_path, "chunks.npy"), self.rows)
+        save_array(os.path.join(index_path, DUPLICATES_FILE), self.duplicates)
+        save_array(os.path.join(index_path, PAGES_FILE), self.pages)
+        replace_file(
+            os.path.join(index_path, "documents.json"),
+            lambda f: f.write(json.dumps(self.documents).encode("utf-8"))
+        )
+
+def encode_chunks(
+    chunks: List[DocumentChunk],
+    document_texts: Optional[Dict[str, str]] = None,
+    vector_ids: Optional[np.ndarray] = None,
+    content_hashes: Optional[Dict[str, str]] = None,
+    duplicates: Optional[List[Tuple[int, DocumentChunk]]] = None,
+    document_pages: Optional[Dict[str, List[int]]] = None
+) -> Tuple[bytes, np.ndarray, List[Dict[str, Any]], np.ndarray, np.ndarray]:
+    """Split chunks into a text blob, chunk rows, a documents table, duplicate rows and page offsets.
+
+    document_texts maps source_file to the full document text; chunks of
+    those documents are stored as offsets into it. Other chunks keep
+    their own copy of their text. vector_ids (ascending, row numbers by
+    default) and content_hashes (by source_file) are recorded as given.
+    duplicates are (row, chunk) pairs of near-duplicates sharing that
+    row's vector. document_pages maps source_file to the character offset
+    of every page start in the document text, plus its length.
+    """
+    document_texts = document_texts or {}
+    content_hashes = content_hashes or {}
+    document_pages = document_pages or {}
+    if vector_ids is None:
+        vector_ids = np.arange(len(chunks), dtype=np.int64)
+
+    buffer = io.BytesIO()
+    writer = ChunkStoreWriter(buffer)
+    for chunk, vector_id in zip(chunks, vector_ids):
+        source_file = chunk.metadata.source_file
+        writer.add_chunk(
+            chunk,
+            vector_id,
+            document_texts.get(source_file),
+            content_hashes.get(source_file),
+            document_pages.get(source_file)
+        )
+    for row, chunk in duplicates or []:
+        source_file = chunk.metadata.source_file
+        writer.add_duplicate(
+            chunk,
+            row,
+            document_texts.get(source_file),
+            content_hashes.get(source_file),
+            document_pages.get(source_file)
+        )
+
+    return buffer.getvalue(), writer.rows.copy(), writer.documents, writer.duplicates, writer.pages
+
+def write_chunk_store(
+    index_path: str,
+    chunks: List[DocumentChunk],
+    document_texts: Optional[Dict[str, str]] = None,
+    vector_ids: Optional[np.ndarray] = None,
+    content_hashes: Optional[Dict[str, str]] = None,
+    duplicates: Optional[List[Tuple[int, DocumentChunk]]] = None,
+    document_pages: Optional[Dict[str, List[int]]] = None
+) -> None:
+    """Save chunks as a text blob, chunk rows, a documents table, duplicate rows and page offsets"""
+    texts, rows, documents, duplicate_rows, pages = encode_chunks(
+        chunks, document_texts, vector_ids, content_hashes, duplicates, document_pages
+    )
+    replace_file(os.path.join(index_path, "text.bin"), lambda f: f.write(texts))
+    save_array(os.path.join(index_path, "chunks.npy"), rows)
+    save_array(os.path.join(index_path, DUPLICATES_FILE), duplicate_rows)
+    save_array(os.path.join(index_path, PAGES_FILE), pages)
+    replace_file(
+        os.path.join(index_path, "documents.json"),
+        lambda f: f.write(json.dumps(documents).encode("utf-8"))
+    )
+
+def chunk_store_exists(index_path: str) -> bool:
+    """Check whether an index directory holds a binary chunk store"""
+    return all(os.path.exists(os.path.join(index_path, f)) for f in CHUNK_STORE_FILES)
+
+class ChunkStore:
+    """Compact chunk storage; Pydantic objects are only built for chunks that are accessed"""
+
+    def __init__(
+        self,
+        texts: Union[mmap.mmap, bytes],
+        rows: np.ndarray,
+        documents: List[Dict[str, Any]],
+        duplicates: Optional[np.ndarray] = None,
+        pages: Optional[np.ndarray] = None
+    ):
+        self.texts = texts
+        self.rows = rows
+        self.documents = documents
+        self.duplicates = duplicates if duplicates is not None else np.zeros(0, dtype=DUPLICATE_ROW_DTYPE)
+        self.pages = pages if pages is not None else np.zeros(0, dtype=np.int64)
+        # Full builds number vectors by row, so no lookup is needed
+        self._ids_are_rows = bool(
+            len(rows) == 0
+            or (rows["vector_id"][0] == 0 and rows["vector_id"][-1] == len(rows) - 1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i: int) -> DocumentChunk:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Chunk {i} out of range")
+        return DocumentChunk(text=self.get_text(i), metadata=self.get_metadata(i))
+
+    def __iter__(self) -> Iterator[DocumentChunk]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def rows_for_ids(self, ids: np.ndarray) -> np.ndarray:
+        """Map FAISS ids returned by a search to rows, -1 where absent"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self._ids_are_rows:
+            return np.where((ids >= 0) & (ids < len(self)), ids, -1)
+        return ids_to_rows(self.rows["vector_id"], ids)
+
+    def _text(self, row: np.void) -> str:
+        return self.texts[row["text_start"]:row["text_end"]].decode("utf-8")
+
+    def _metadata(self, row: np.void) -> ChunkMetadata:
+        document = self.documents[row["doc_id"]]
+        return ChunkMetadata(
+            **{field: document[field] for field in DOCUMENT_FIELDS},
+            chunk_id=int(row["chunk_id"]),
+            total_chunks=int(row["total_chunks"]),
+            chunk_size=int(row["chunk_size"]),
+            chunking_strategy=CHUNKING_STRATEGIES[row["strategy"]],
+            start_index=int(row["char_start"]) if row["char_start"] >= 0 else None,
+            end_index=int(row["char_end"]) if row["char_end"] >= 0 else None
+        )
+
+    def get_text(self, i: int) -> str:
+        """Decode the text of one chunk"""
+        return self._text(self.rows[i])
+
+    def get_document(self, i: int) -> Dict[str, Any]:
+        """Document table entry for one chunk"""
+        return self.documents[self.rows[i]["doc_id"]]
+
+    def get_document_text(self, doc_id: int) -> Optional[str]:
+        """Full text of a document, if it was stored"""
+        document = self.documents[doc_id]
+        if "text_start" not in document:
+            return None
+        return self.texts[document["text_start"]:document["text_end"]].decode("utf-8")
+
+    def get_metadata(self, i: int) -> ChunkMetadata:
+        """Rebuild the full metadata of one chunk"""
+        return self._metadata(self.rows[i])
+
+    def duplicate_indices(self, i: int) -> np.ndarray:
+        """Positions in the duplicates table of the chunks folded into row i"""
+        start, end = np.searchsorted(self.duplicates["row"], [i, i + 1])
+        return np.arange(start, end)
+
+    def get_duplicate(self, j: int) -> DocumentChunk:
+        """Rebuild a folded duplicate chunk from its position in the duplicates table"""
+        duplicate = self.duplicates[j]
+        return DocumentChunk(text=self._text(duplicate), metadata=self._metadata(duplicate))
+
+    def find_document(self, source_file: str) -> Optional[int]:
+        """Document id of a source file, None if the store doesn't hold it"""
+        for doc_id, document in enumerate(self.documents):
+            if document["source_file"] == source_file:
+                return doc_id
+        return None
+
+    def _page_bounds(self, doc_id: int) -> Optional[np.ndarray]:
+        document = self.documents[doc_id]
+        if "pages_start" not in document:
+            return None
+        return self.pages[document["pages_start"]:document["pages_end"]]
+
+    def get_page_offsets(self, doc_id: int) -> Optional[List[int]]:
+        """Character offsets of a document's page starts plus its length, as the writer takes them"""
+        bounds = self._page_bounds(doc_id)
+        if bounds is None:
+            return None
+        document = self.documents[doc_id]
+        offsets = np.asarray(bounds, dtype=np.int64) - document["text_start"]
+        text = self.get_document_text(doc_id)
+        if len(text) != document["text_end"] - document["text_start"]:
+            offsets = np.searchsorted(utf8_offsets(text), offsets)
+        return offsets.tolist()
+
+    def page_count(self, doc_id: int) -> int:
+        """Pages recorded for a document, 0 when it was stored without page offsets"""
+        bounds = self._page_bounds(doc_id)
+        return 0 if bounds is None else len(bounds) - 1
+
+    def get_page_text(self, doc_id: int, page: int) -> str:
+        """Text of one page (numbered from 1) of a stored document"""
+        bounds = self._page_bounds(doc_id)
+        if bounds is None:
+            raise ValueError(f"No page offsets stored for {self.documents[doc_id]['source_file']}")
+        if not 1 <= page < len(bounds):
+            source_file = self.documents[doc_id]["source_file"]
+            raise IndexError(f"Page {page} out of range, {source_file} has {len(bounds) - 1} pages")
+        return self.texts[bounds[page - 1]:bounds[page]].decode("utf-8")
+
+    def get_pages(self, i: int) -> Optional[Tuple[int, int]]:
+        """First and last page (numbered from 1) a chunk spans, None without page offsets"""
+        row = self.rows[i]
+        bounds = self._page_bounds(int(row["doc_id"]))
+        if bounds is None or row["char_start"] < 0 or len(bounds) < 2:
+            return None
+        # A page starts at or before the chunk's first byte; empty pages are skipped over
+        last_byte = max(row["text_end"] - 1, row["text_start"])
+        first, last = np.searchsorted(bounds, [row["text_start"], last_byte], side="right")
+        num_pages = len(bounds) - 1
+        return min(max(int(first), 1), num_pages), min(max(int(last), 1), num_pages)
+
+    def get_pdf_context(self, i: int, similarity_score: float) -> PDFContext:
+        """Build the PDFContext for a retrieved chunk"""
+        row = self.rows[i]
+        source_file = self.documents[row["doc_id"]]["source_file"]
+        duplicate_sources = []
+        for doc_id in self.duplicates["doc_id"][self.duplicate_indices(i)]:
+            duplicate_source = self.documents[doc_id]["source_file"]
+            if duplicate_source != source_file and duplicate_source not in duplicate_sources:
+                duplicate_sources.append(duplicate_source)
+        pages = self.get_pages(i)
+        return PDFContext(
+            text=self._text(row),
+            source_file=source_file,
+            chunk_id=int(row["chunk_id"]),
+            total_chunks=int(row["total_chunks"]),
+            similarity_score=similarity_score,
+            duplicate_sources=duplicate_sources,
+            page_start=pages[0] if pages else None,
+            page_end=pages[1] if pages else None
+        )
+
+def build_chunk_store(
+    chunks: List[DocumentChunk],
+    document_texts: Optional[Dict[str, str]] = None
+) -> ChunkStore:
+    """Build an in-memory chunk store from chunk objects"""
+    return ChunkStore(*encode_chunks(chunks, document_texts))
+
+def open_chunk_store(index_path: str) -> ChunkStore:
+    """Open a saved chunk store without decoding any chunks"""
+    with open(os.path.join(index_path, "documents.json"), "r") as f:
+        documents = json.load(f)
+    duplicates_path = os.path.join(index_path, DUPLICATES_FILE)
+    pages_path = os.path.join(index_path, PAGES_FILE)
+    return ChunkStore(
+        map_file(os.path.join(index_path, "text.bin")),
+        np.load(os.path.join(index_path, "chunks.npy"), mmap_mode="r"),
+        documents,
+        np.load(duplicates_path, mmap_mode="r") if os.path.exists(duplicates_path) else None,
+        np.load(pages_path, mmap_mode="r") if os.path.exists(pages_path) else None
+    )
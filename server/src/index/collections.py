@@ -0,0 +1,79 @@
+import os
+import re
+import logging
+from typing import List, Optional
+from server.utils.config import get_collections_config
+
+logger = logging.getLogger(__name__)
+
+# The original single corpus at INDEX_PATH
+DEFAULT_COLLECTION = "default"
+
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+def collection_path(name: str) -> str:
+    """Index directory of a collection; others live under COLLECTIONS_ROOT/<name>"""
+    config = get_collections_config()
+    if name == DEFAULT_COLLECTION:
+        return config["index_path"]
+    if not COLLECTION_NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid collection name '{name}'")
+    return os.path.join(config["collections_root"], name)
+
+def collection_exists(name: str) -> bool:
+    # The manifest is written last; flat indexes have no faiss.index, older builds no manifest
+    path = collection_path(name)
+    return any(os.path.exists(os.path.join(path, file_name)) for file_name in ("manifest.json", "faiss.index"))
+
+def list_collections() -> List[str]:
+    """Every collection with a built index"""
+    names = [DEFAULT_COLLECTION] if collection_exists(DEFAULT_COLLECTION) else []
+    root = get_collections_config()["collections_root"]
+    if os.path.isdir(root):
+        names += sorted(
+            name for name in os.listdir(root)
+            if name != DEFAULT_COLLECTION and COLLECTION_NAME_PATTERN.match(name) and collection_exists(name)
+        )
+    return names
+
+def resolve_collections(names: Optional[List[str]] = None) -> List[str]:
+    """Index paths for collection names, PDF_COLLECTIONS by default; "all" expands to every collection"""
+    names = names or get_collections_config()["pdf_collections"]
+    if "all" in names:
+        names = list_collections()
+
+    missing = [name for name in names if not collection_exists(name)]
+    if missing:
+        raise ValueError(f"No index built for collection(s) {missing}, available: {list_collections()}")
+    return [collection_path(name) for name in names]
+
+if __name__ == "__main__":
+    import argparse
+    from server.src.data_model import IndexConfig, IndexType
+    from server.utils.config import get_embedding_config
+    from .embedding_cache import EmbeddingCache
+    from .json_to_index import create_faiss_index, read_manifest
+
+    parser = argparse.ArgumentParser(description="Build and list PDF collections")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build a collection's index from processed documents")
+    build.add_argument("name")
+    build.add_argument("--text-folder", required=True)
+    build.add_argument("--index-type", choices=[t.value for t in IndexType], default=IndexType.FLAT.value)
+    build.add_argument("--no-embedding-cache", action="store_true")
+    subparsers.add_parser("list", help="List collections with their size")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        create_faiss_index(
+            args.text_folder,
+            collection_path(args.name),
+            index_config=IndexConfig(index_type=args.index_type),
+            embedding_cache=None if args.no_embedding_cache else EmbeddingCache(get_embedding_config()["cache_path"])
+        )
+    else:
+        for name in list_collections():
+            path = collection_path(name)
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            manifest = read_manifest(path)
+            print(f"{name:<24} {manifest.get('num_chunks', '?'):>8} chunks {size / 1024 / 1024:>9.1f} MB  {path}")
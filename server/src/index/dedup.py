@@ -0,0 +1,209 @@
+import os
+import re
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from server.src.data_model import DocumentChunk
+from .chunk_store import save_array
+
+# 128 MinHash values split into 16 LSH bands of 8: pairs above Jaccard ~0.7
+# land in a shared bucket, and candidates are then checked against the
+# threshold on the full signature
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 16
+
+# Word 3-grams; a changed date or page number only breaks the three shingles around it
+SHINGLE_SIZE = 3
+
+DEFAULT_THRESHOLD = 0.9
+
+# Fixed so signatures are comparable across builds and processes
+SEED = 20240601
+
+# Shingles hashed per block when signing many texts, bounds the temporary arrays
+BLOCK_SHINGLES = 1 << 16
+
+WORD_PATTERN = re.compile(r"\w+")
+
+_EMPTY = np.iinfo(np.uint32).max
+
+# Signature of every chunk row, saved with indexes built with dedup on so
+# updates sign only new chunks (512 bytes per row); not needed for serving
+SIGNATURES_FILE = "signatures.npy"
+
+def _permutations(num_permutations: int = NUM_PERMUTATIONS) -> Tuple[np.ndarray, np.ndarray]:
+    """Multiply-add hash parameters, one (odd a, b) pair per permutation.
+
+    Arithmetic wraps at 32 bits; only the order of the results matters for
+    MinHash and that is set by the well-mixed high bits.
+    """
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(0, _EMPTY, size=num_permutations, dtype=np.uint32, endpoint=True) | np.uint32(1)
+    b = rng.integers(0, _EMPTY, size=num_permutations, dtype=np.uint32, endpoint=True)
+    return a, b
+
+_A, _B = _permutations()
+
+def shingle_hashes(
+    text: str,
+    shingle_size: int = SHINGLE_SIZE,
+    word_hashes: Optional[Dict[str, int]] = None
+) -> np.ndarray:
+    """Distinct 32-bit hashes of the text's lowercased word n-grams (one shingle for shorter texts).
+
+    word_hashes memoizes the CRC of each word across calls.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint32)
+    if word_hashes is None:
+        word_hashes = {}
+    for word in set(words).difference(word_hashes):
+        word_hashes[word] = zlib.crc32(word.encode("utf-8"))
+    tokens = np.array(list(map(word_hashes.__getitem__, words)), dtype=np.uint32)
+    size = min(shingle_size, len(tokens))
+    count = len(tokens) - size + 1
+    shingles = tokens[:count].copy()
+    for offset in range(1, size):
+        shingles *= np.uint32(0x9E3779B1)
+        shingles ^= tokens[offset:offset + count]
+    return np.unique(shingles)
+
+def minhash_signatures(texts: Sequence[str]) -> np.ndarray:
+    """MinHash signature of every text as an (n, NUM_PERMUTATIONS) uint32 array.
+
+    Texts without words get an all-max signature that matches nothing.
+    """
+    signatures = np.full((len(texts), NUM_PERMUTATIONS), _EMPTY, dtype=np.uint32)
+    word_hashes: Dict[str, int] = {}
+    pending: List[np.ndarray] = []
+    pending_rows: List[int] = []
+    pending_size = 0
+
+    def flush() -> None:
+        shingles = np.concatenate(pending)
+        starts = np.zeros(len(pending), dtype=np.int64)
+        np.cumsum([len(s) for s in pending[:-1]], out=starts[1:])
+        # One contiguous row per permutation keeps the per-text minimum a sequential scan
+        hashed = _A[:, None] * shingles[None, :]
+        hashed += _B[:, None]
+        signatures[pending_rows] = np.minimum.reduceat(hashed, starts, axis=1).T
+
+    for row, text in enumerate(texts):
+        shingles = shingle_hashes(text, word_hashes=word_hashes)
+        if not len(shingles):
+            continue
+        pending.append(shingles)
+        pending_rows.append(row)
+        pending_size += len(shingles)
+        if pending_size >= BLOCK_SHINGLES:
+            flush()
+            pending, pending_rows, pending_size = [], [], 0
+    if pending:
+        flush()
+    return signatures
+
+def estimated_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Fraction of matching MinHash values, an estimate of the Jaccard similarity"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+class NearDuplicateIndex:
+    """LSH buckets over the signatures of representative chunks.
+
+    Items are added in order; an item that matches an earlier
+    representative above the threshold is reported as its duplicate,
+    anything else becomes a representative itself. Duplicates are never
+    bucketed, so every duplicate is directly similar to its representative.
+
+    Each representative costs about 3 KB. With max_signatures set, the
+    least recently matched representatives are forgotten beyond that
+    many; boilerplate that keeps recurring stays, and a forgotten one
+    only means a later copy gets its own vector.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, max_signatures: Optional[int] = None):
+        self.threshold = threshold
+        self.max_signatures = max_signatures
+        self.rows_per_band = NUM_PERMUTATIONS // NUM_BANDS
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(NUM_BANDS)]
+        # Least recently matched first
+        self._signatures: "OrderedDict[int, np.ndarray]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+            for band in range(NUM_BANDS)
+        ]
+
+    def insert(self, item_id: int, signature: np.ndarray) -> None:
+        """Add a representative without looking for matches"""
+        if (signature == _EMPTY).all():
+            return
+        # A copy, so a row view doesn't keep the whole batch of signatures alive
+        self._signatures[item_id] = signature = signature.copy()
+        for bucket, key in zip(self._buckets, self._keys(signature)):
+            bucket.setdefault(key, []).append(item_id)
+        if self.max_signatures is not None and len(self._signatures) > self.max_signatures:
+            self._forget(next(iter(self._signatures)))
+
+    def _forget(self, item_id: int) -> None:
+        signature = self._signatures.pop(item_id)
+        for bucket, key in zip(self._buckets, self._keys(signature)):
+            items = bucket[key]
+            items.remove(item_id)
+            if not items:
+                del bucket[key]
+
+    def add(self, item_id: int, signature: np.ndarray) -> Optional[int]:
+        """Representative that item_id duplicates, or None after adding it as a new representative"""
+        if not (signature == _EMPTY).all():
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._keys(signature)):
+                candidates.update(bucket.get(key, ()))
+            # The earliest matching representative wins, so results don't depend on set order
+            for candidate in sorted(candidates):
+                if estimated_similarity(signature, self._signatures[candidate]) >= self.threshold:
+                    self._signatures.move_to_end(candidate)
+                    return candidate
+        self.insert(item_id, signature)
+        return None
+
+def fold_duplicates(
+    chunks: Sequence[DocumentChunk],
+    signatures: np.ndarray,
+    index: NearDuplicateIndex,
+    first_row: int = 0
+) -> Tuple[List[int], List[Tuple[int, DocumentChunk]]]:
+    """Positions of the chunks to embed, and (row, chunk) for every chunk folded into an earlier row.
+
+    The chunks to embed become rows first_row, first_row + 1, ... of the
+    index, after whatever rows it already holds.
+    """
+    unique: List[int] = []
+    duplicates: List[Tuple[int, DocumentChunk]] = []
+    for position, (chunk, signature) in enumerate(zip(chunks, signatures)):
+        representative = index.add(first_row + len(unique), signature)
+        if representative is None:
+            unique.append(position)
+        else:
+            duplicates.append((representative, chunk))
+    return unique, duplicates
+
+def write_signatures(index_path: str, signatures: Optional[np.ndarray]) -> None:
+    """Save the signature of every chunk row, or drop a stale file when dedup is off"""
+    path = os.path.join(index_path, SIGNATURES_FILE)
+    if signatures is not None:
+        save_array(path, np.asarray(signatures, dtype=np.uint32))
+    elif os.path.exists(path):
+        os.remove(path)
+
+def load_signatures(index_path: str) -> Optional[np.ndarray]:
+    """Memory-map the saved signatures, None for indexes built without them"""
+    path = os.path.join(index_path, SIGNATURES_FILE)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,132 @@
+import os
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from server.src.data_model import EmbeddingCacheStats
+from .embedding_registry import normalize_model_name, resolve_model_key
+from .batch_encoder import encode_batched
+
+logger = logging.getLogger(__name__)
+
+# Hashes per SELECT, below SQLite's bound parameter limit
+LOOKUP_BATCH = 500
+
+def embedding_cache_id(
+    model_name: Optional[str] = None,
+    precision: Optional[str] = None,
+    backend: Optional[str] = None
+) -> str:
+    """Cache namespace for a model; vectors from different models, precisions or backends never mix"""
+    name, _, precision, backend = resolve_model_key(normalize_model_name(model_name), "cpu", precision, backend)
+    if backend == "torch":
+        return f"{name}:{precision}"
+    return f"{name}:{precision}:{backend}"
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+class EmbeddingCache:
+    """Persistent embeddings keyed by (model id, SHA-256 of the chunk text)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash BLOB NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, text_hash)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model_id: str, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Cached float32 vectors for the hashes that have one"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), LOOKUP_BATCH):
+                batch = hashes[start:start + LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model_id, *batch]
+                )
+                for digest, vector in rows:
+                    found[digest] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, model_id: str, hashes: List[bytes], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model_id, digest, vector.tobytes()) for digest, vector in zip(hashes, vectors)]
+            )
+            self._conn.commit()
+
+    def encode(
+        self,
+        model: SentenceTransformer,
+        texts: List[str],
+        model_id: str,
+        **encode_kwargs: Any
+    ) -> np.ndarray:
+        """Embed texts, running the model only on text the cache has never seen"""
+        hashes = [text_hash(text) for text in texts]
+        cached = self.get_many(model_id, list(set(hashes)))
+
+        # Identical chunks are encoded once
+        missing: Dict[bytes, str] = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in cached and digest not in missing:
+                missing[digest] = text
+
+        if missing:
+            new_vectors, _ = encode_batched(model, list(missing.values()), **encode_kwargs)
+            self.put_many(model_id, list(missing), new_vectors)
+            cached.update(zip(missing, new_vectors))
+
+        # Every text the model did not have to encode counts as a hit
+        hits = len(hashes) - len(missing)
+        self.hits += hits
+        self.misses += len(missing)
+        logger.info(f"Embedding cache: {hits}/{len(hashes)} hits, encoded {len(missing)} texts")
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([cached[digest] for digest in hashes])
+
+    def stats(self) -> EmbeddingCacheStats:
+        total = self.hits + self.misses
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return EmbeddingCacheStats(
+            path=self.path,
+            entries=entries,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / total if total else 0.0
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def encode_texts(
+    model: SentenceTransformer,
+    texts: List[str],
+    model_name: Optional[str] = None,
+    cache: Optional[EmbeddingCache] = None,
+    **encode_kwargs: Any
+) -> np.ndarray:
+    """Embed texts as float32 in length-bucketed batches, through the cache when one is given"""
+    if cache is None:
+        return encode_batched(model, texts, **encode_kwargs)[0]
+    return cache.encode(model, texts, embedding_cache_id(model_name), **encode_kwargs)
@@ -0,0 +1,196 @@
+import os
+import time
+import logging
+import threading
+import importlib.util
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import torch
+from sentence_transformers import SentenceTransformer
+from server.src.data_model import EmbeddingModelStats
+from server.utils.config import get_embedding_config
+
+logger = logging.getLogger(__name__)
+
+# Registry key: (model name, device, precision, backend)
+ModelKey = Tuple[str, str, str, str]
+
+SUPPORTED_PRECISIONS = ["float32", "float16", "bfloat16"]
+
+# torch: stock SentenceTransformer; onnx: exported ONNX Runtime model (needs
+# optimum[onnxruntime]); int8: torch model with dynamically quantized Linear layers
+SUPPORTED_BACKENDS = ["torch", "onnx", "int8"]
+
+# Process-wide registry shared by every pipeline (ollama, groq, index builds)
+_models: Dict[ModelKey, SentenceTransformer] = {}
+_model_stats: Dict[ModelKey, EmbeddingModelStats] = {}
+_registry_lock = threading.Lock()
+
+def normalize_model_name(model_name: Optional[str] = None) -> str:
+    """Expand short names like 'all-MiniLM-L6-v2' to their hub id"""
+    model_name = model_name or get_embedding_config()["model_name"]
+    if "/" in model_name or os.path.isdir(model_name):
+        return model_name
+    return f"sentence-transformers/{model_name}"
+
+def resolve_device(device: Optional[str] = None) -> str:
+    """Pick the embedding device: explicit argument, then EMBEDDING_DEVICE, then best available"""
+    device = device or get_embedding_config()["device"]
+
+    if device and device != "auto":
+        if device == "mps" and not torch.backends.mps.is_available():
+            logger.warning("Embedding device 'mps' requested but not available, using 'cpu'")
+            return "cpu"
+        if device.startswith("cuda") and not torch.cuda.is_available():
+            logger.warning(f"Embedding device '{device}' requested but CUDA is not available, using 'cpu'")
+            return "cpu"
+        return device
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+def resolve_model_key(
+    model_name: Optional[str] = None,
+    device: Optional[str] = None,
+    precision: Optional[str] = None,
+    backend: Optional[str] = None
+) -> ModelKey:
+    """Build the registry key for a model request"""
+    config = get_embedding_config()
+    precision = precision or config["precision"]
+    backend = backend or config["backend"]
+    if precision not in SUPPORTED_PRECISIONS:
+        raise ValueError(f"Unsupported embedding precision '{precision}', expected one of {SUPPORTED_PRECISIONS}")
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported embedding backend '{backend}', expected one of {SUPPORTED_BACKENDS}")
+    if backend != "torch" and precision != "float32":
+        raise ValueError(f"The {backend} backend runs from float32 weights, got precision '{precision}'")
+
+    device = resolve_device(device)
+    if backend == "int8" and device != "cpu":
+        # Dynamically quantized kernels only exist for CPU
+        logger.warning(f"int8 embedding backend requested on '{device}', using 'cpu'")
+        device = "cpu"
+    return normalize_model_name(model_name), device, precision, backend
+
+def _onnx_model_bytes(model: SentenceTransformer) -> int:
+    """Size of the ONNX graph files an ONNX Runtime session was loaded from"""
+    total = 0
+    for module in model:
+        model_path = getattr(getattr(module, "auto_model", None), "model_path", None)
+        if model_path is None:
+            continue
+        # Large exports keep their weights next to the graph (model.onnx_data, model.onnx.data)
+        model_path = Path(model_path)
+        for path in model_path.parent.glob(f"{model_path.name}*"):
+            if path.is_file():
+                total += path.stat().st_size
+    return total
+
+def _model_memory_bytes(model: SentenceTransformer, backend: str = "torch") -> int:
+    """Bytes held by the model's parameters and buffers, or its ONNX weights"""
+    if backend == "onnx":
+        # ONNX Runtime holds the weights outside torch, roughly the size of the exported graph
+        return _onnx_model_bytes(model)
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+def _load_model(key: ModelKey) -> SentenceTransformer:
+    """Load a model from disk for the requested backend and precision"""
+    model_name, device, precision, backend = key
+    if backend == "onnx":
+        if importlib.util.find_spec("optimum") is None or importlib.util.find_spec("onnxruntime") is None:
+            raise ImportError(
+                "The onnx embedding backend needs optimum and onnxruntime: "
+                "pip install -r server/server_requirements.txt"
+            )
+        return SentenceTransformer(model_name, device=device, backend="onnx")
+
+    model = SentenceTransformer(model_name, device=device)
+
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif precision == "float16":
+        model = model.half()
+    elif precision == "bfloat16":
+        model = model.to(torch.bfloat16)
+
+    return model
+
+def get_embedding_model(
+    model_name: Optional[str] = None,
+    device: Optional[str] = None,
+    precision: Optional[str] = None,
+    backend: Optional[str] = None
+) -> SentenceTransformer:
+    """Get a resident embedding model, loading it on first use"""
+    key = resolve_model_key(model_name, device, precision, backend)
+
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        # Another caller may have loaded it while we waited
+        if key in _models:
+            return _models[key]
+
+        start_time = time.time()
+        model = _load_model(key)
+        load_time = time.time() - start_time
+
+        stats = EmbeddingModelStats(
+            model_name=key[0],
+            device=key[1],
+            precision=key[2],
+            backend=key[3],
+            load_time_seconds=load_time,
+            memory_bytes=_model_memory_bytes(model, key[3])
+        )
+        _models[key] = model
+        _model_stats[key] = stats
+
+        logger.info(
+            f"Loaded embedding model {key[0]} on {key[1]} ({key[2]}, {key[3]}) "
+            f"in {load_time:.2f}s, {stats.memory_bytes / 1024 / 1024:.1f} MB resident"
+        )
+        return model
+
+def register_embedding_model(
+    model: SentenceTransformer,
+    model_name: Optional[str] = None,
+    device: Optional[str] = None,
+    precision: Optional[str] = None,
+    backend: Optional[str] = None
+) -> ModelKey:
+    """Register an already constructed model under a registry key"""
+    key = resolve_model_key(model_name, device, precision, backend)
+    with _registry_lock:
+        _models[key] = model
+        _model_stats[key] = EmbeddingModelStats(
+            model_name=key[0],
+            device=key[1],
+            precision=key[2],
+            backend=key[3],
+            load_time_seconds=0.0,
+            memory_bytes=_model_memory_bytes(model, key[3])
+        )
+    return key
+
+def preload_embedding_models() -> List[EmbeddingModelStats]:
+    """Load the configured embedding model so the first query doesn't pay for it"""
+    get_embedding_model()
+    return get_embedding_model_stats()
+
+def get_embedding_model_stats() -> List[EmbeddingModelStats]:
+    """Load time and resident memory for every registered model"""
+    return list(_model_stats.values())
+
+def clear_embedding_models() -> None:
+    """Drop every registered model"""
+    with _registry_lock:
+        _models.clear()
+        _model_stats.clear()
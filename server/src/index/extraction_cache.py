@@ -0,0 +1,118 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import zstandard
+from server.src.data_model import ExtractionCacheStats
+
+# Bumped whenever extraction output changes shape, so old entries are ignored
+EXTRACTOR_VERSION = 2
+
+# Bytes hashed per read when fingerprinting a PDF
+HASH_BLOCK_SIZE = 1 << 20
+
+def file_hash(path: str) -> bytes:
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.digest()
+
+def compress_json(value: Any, level: int = 3) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(json.dumps(value).encode("utf-8"))
+
+def decompress_json(data: bytes) -> Any:
+    return json.loads(zstandard.ZstdDecompressor().decompress(data).decode("utf-8"))
+
+class ExtractionCache:
+    """Extracted PDF text and metadata keyed by the SHA-256 of the PDF's bytes, zstd-compressed.
+
+    Files are fingerprinted by (size, mtime) first, so unchanged PDFs are
+    neither opened nor re-hashed on later runs; a renamed or copied PDF
+    still hits through its content hash.
+    """
+
+    def __init__(self, path: str, level: int = 3):
+        self.path = path
+        self.level = level
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            "content_hash BLOB NOT NULL, version INTEGER NOT NULL, data BLOB NOT NULL, "
+            "PRIMARY KEY (content_hash, version)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, content_hash BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def content_hash(self, path: str) -> bytes:
+        """Hash of a PDF, reused from the last run while its size and mtime are unchanged"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        digest = file_hash(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest)
+            )
+            self._conn.commit()
+        return digest
+
+    def get(self, digest: bytes) -> Optional[Tuple[str, Dict[str, str], List[int]]]:
+        """(raw text, PDF metadata, page offsets) for a content hash, None on a miss"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM extractions WHERE content_hash = ? AND version = ?",
+                (digest, EXTRACTOR_VERSION)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry = decompress_json(row[0])
+        return entry["text"], entry["metadata"], entry["page_offsets"]
+
+    def put(self, digest: bytes, text: str, pdf_metadata: Dict[str, str], page_offsets: List[int]) -> None:
+        data = compress_json({"text": text, "metadata": pdf_metadata, "page_offsets": page_offsets}, self.level)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (content_hash, version, data) VALUES (?, ?, ?)",
+                (digest, EXTRACTOR_VERSION, data)
+            )
+            self._conn.commit()
+
+    def stats(self) -> ExtractionCacheStats:
+        total = self.hits + self.misses
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM extractions"
+            ).fetchone()
+        return ExtractionCacheStats(
+            path=self.path,
+            entries=entries,
+            compressed_bytes=size,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / total if total else 0.0
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
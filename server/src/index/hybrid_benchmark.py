@@ -0,0 +1,93 @@
+import time
+import random
+import logging
+from typing import Callable, List, Tuple
+import numpy as np
+from server.src.data_model import HybridBenchmarkResult
+from server.utils.config import get_retrieval_config
+from .index_cache import LoadedIndex, get_loaded_index
+from .retrieval_batcher import embed_queries, hybrid_rank
+from .search import search_index
+
+logger = logging.getLogger(__name__)
+
+def sample_queries(loaded: LoadedIndex, num_queries: int, words: int = 8, seed: int = 0) -> List[Tuple[str, int]]:
+    """(query, source row) pairs made from a run of words inside randomly chosen chunks"""
+    rng = random.Random(seed)
+    rows = rng.sample(range(len(loaded.chunks)), min(num_queries, len(loaded.chunks)))
+    queries = []
+    for row in rows:
+        tokens = loaded.chunks.get_text(row).split()
+        start = rng.randrange(max(len(tokens) - words, 0) + 1)
+        queries.append((" ".join(tokens[start:start + words]), row))
+    return queries
+
+def evaluate(
+    method: str,
+    rank: Callable[[int], np.ndarray],
+    targets: List[int],
+    k: int
+) -> HybridBenchmarkResult:
+    """Score a ranking function that returns the rows for query i"""
+    latencies = []
+    reciprocal_ranks = []
+    for i, target in enumerate(targets):
+        start = time.perf_counter()
+        rows = list(rank(i)[:k])
+        latencies.append(time.perf_counter() - start)
+        reciprocal_ranks.append(1.0 / (rows.index(target) + 1) if target in rows else 0.0)
+    return HybridBenchmarkResult(
+        method=method,
+        recall_at_k=float(np.mean([rr > 0 for rr in reciprocal_ranks])),
+        mrr=float(np.mean(reciprocal_ranks)),
+        latency_ms=float(np.median(latencies)) * 1000
+    )
+
+def benchmark_hybrid(index_path: str, num_queries: int = 200, k: int = 7) -> List[HybridBenchmarkResult]:
+    """Compare vector-only, BM25-only and fused retrieval on queries drawn from the indexed chunks"""
+    loaded = get_loaded_index(index_path)
+    if loaded.lexical is None or loaded.vectors is None:
+        raise ValueError(f"Index at {index_path} has no lexical index, rebuild it first")
+
+    config = get_retrieval_config()
+    candidates = max(k, config["hybrid_candidates"])
+    queries = sample_queries(loaded, num_queries)
+    embeddings = embed_queries([query for query, _ in queries])
+    targets = [row for _, row in queries]
+
+    def vector_rows(i: int, width: int) -> np.ndarray:
+        _, rows = search_index(
+            loaded.index,
+            embeddings[i:i + 1],
+            width,
+            config=loaded.config,
+            vectors=loaded.vectors,
+            chunks=loaded.chunks
+        )
+        return rows[0]
+
+    def hybrid(i: int) -> np.ndarray:
+        rows = vector_rows(i, candidates)
+        return hybrid_rank(loaded, queries[i][0], embeddings[i], rows, k, candidates, config["rrf_k"])[1]
+
+    return [
+        evaluate("vector", lambda i: vector_rows(i, k), targets, k),
+        evaluate("lexical", lambda i: loaded.lexical.search(queries[i][0], k)[1], targets, k),
+        evaluate("hybrid", hybrid, targets, k)
+    ]
+
+def print_hybrid_report(results: List[HybridBenchmarkResult], k: int) -> None:
+    print(f"{'method':<8} {f'recall@{k}':>9} {'mrr':>7} {'search ms':>10}")
+    for r in results:
+        print(f"{r.method:<8} {r.recall_at_k:>9.3f} {r.mrr:>7.3f} {r.latency_ms:>10.2f}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare vector, BM25 and hybrid retrieval on the saved index")
+    parser.add_argument("--index-path", default="./server/tmp/indexes")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=7)
+    args = parser.parse_args()
+
+    print_hybrid_report(benchmark_hybrid(args.index_path, args.num_queries, args.k), args.k)
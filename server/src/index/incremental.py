@@ -0,0 +1,218 @@
+import os
+import logging
+from typing import Dict, Optional
+import numpy as np
+import faiss
+from server.src.data_model import IndexConfig, IndexType
+from server.utils.config import get_chunking_config, get_dedup_config
+from .document_processor import process_document
+from .embedding_registry import get_embedding_model
+from .embedding_cache import EmbeddingCache, encode_texts
+from .index_factory import build_index, uses_mapped_vectors
+from .chunk_store import ChunkStoreWriter, open_chunk_store, chunk_store_exists
+from .lexical_index import write_lexical_index
+from .dedup import NearDuplicateIndex, fold_duplicates, load_signatures, minhash_signatures, write_signatures
+from .json_to_index import (
+    create_faiss_index,
+    document_hash,
+    load_documents,
+    load_vectors,
+    read_manifest,
+    write_index,
+    write_manifest
+)
+
+logger = logging.getLogger(__name__)
+
+def update_faiss_index(
+    text_folder: str,
+    index_path: str,
+    embedding_model: str = 'sentence-transformers/all-MiniLM-L6-v2',
+    embedding_cache: Optional[EmbeddingCache] = None
+) -> Dict[str, int]:
+    """Bring a saved index in line with the processed documents.
+
+    Documents whose content hash is unchanged keep their vectors; changed
+    and deleted documents have their ids removed and new or changed ones
+    are embedded and appended. The index type and its trained quantizers
+    are kept, so run a full create_faiss_index after large corpus changes.
+    New chunks that near-duplicate a kept one share its vector. Kept
+    chunks are copied from the saved store and matched by their saved
+    MinHash signatures, so only new and changed documents are processed.
+    Returns the number of added, removed and unchanged documents.
+    """
+    manifest = read_manifest(index_path)
+    chunking = get_chunking_config()
+    dedup = get_dedup_config()
+    if (
+        "next_vector_id" not in manifest
+        or manifest.get("embedding_model") != embedding_model
+        or manifest.get("chunking", {"mode": "characters", "max_tokens": None})
+        != {"mode": chunking["mode"], "max_tokens": chunking["max_tokens"]}
+        or manifest.get("dedup_threshold") != (dedup["threshold"] if dedup["enabled"] else None)
+        or not chunk_store_exists(index_path)
+        or not os.path.exists(os.path.join(index_path, "vectors.npy"))
+    ):
+        logger.info(f"No updatable index at {index_path} for this model, chunking and dedup, building from scratch")
+        config = IndexConfig(**manifest["index_config"]) if "index_config" in manifest else None
+        create_faiss_index(text_folder, index_path, embedding_model, config, embedding_cache)
+        documents = {metadata["source_file"] for _, metadata in load_documents(text_folder)}
+        return {"added": len(documents), "removed": 0, "unchanged": 0}
+
+    config = IndexConfig(**manifest["index_config"])
+    store = open_chunk_store(index_path)
+
+    # Compare content hashes by source file
+    current = {
+        metadata["source_file"]: (text, metadata, document_hash(text, metadata))
+        for text, metadata in load_documents(text_folder)
+    }
+    stored = {document["source_file"]: document.get("content_hash") for document in store.documents}
+    added = [source for source, (_, _, digest) in current.items() if stored.get(source) != digest]
+    removed = [source for source in stored if source not in current or source in added]
+    stats = {"added": len(added), "removed": len(removed), "unchanged": len(current) - len(added)}
+
+    if not added and not removed:
+        logger.info(f"Index at {index_path} is up to date")
+        return stats
+
+    removed_doc_ids = [i for i, document in enumerate(store.documents) if document["source_file"] in removed]
+    kept_doc_ids = [i for i, document in enumerate(store.documents) if document["source_file"] not in removed]
+    keep = ~np.isin(store.rows["doc_id"], removed_doc_ids)
+    kept_rows = np.flatnonzero(keep)
+    kept_ids = np.array(store.rows["vector_id"][keep], dtype=np.int64)
+    kept_vectors = np.asarray(load_vectors(index_path)[kept_rows], dtype=np.float32)
+
+    # Folded duplicates of kept documents follow their row; those whose row
+    # belonged to a removed document need a vector of their own again
+    kept_duplicates = []
+    new_chunks = []
+    document_texts = {}
+    duplicate_rows = store.duplicates["row"]
+    for j in np.flatnonzero(~np.isin(store.duplicates["doc_id"], removed_doc_ids)):
+        row = int(duplicate_rows[j])
+        if keep[row]:
+            kept_duplicates.append(int(j))
+        else:
+            chunk = store.get_duplicate(int(j))
+            new_chunks.append(chunk)
+            # Its document is copied below, the text only locates the chunk in it
+            if chunk.metadata.source_file not in document_texts:
+                document_texts[chunk.metadata.source_file] = store.get_document_text(int(store.duplicates["doc_id"][j]))
+    kept_duplicates = np.array(kept_duplicates, dtype=np.int64)
+
+    # Only new and changed documents are split, signed and embedded
+    content_hashes = {}
+    document_pages = {}
+    for source in added:
+        text, metadata, digest = current[source]
+        new_chunks.extend(process_document(text, metadata, embedding_model))
+        document_texts[source] = text
+        content_hashes[source] = digest
+        if "page_offsets" in metadata:
+            document_pages[source] = metadata["page_offsets"]
+
+    duplicates = []
+    signatures = None
+    if dedup["enabled"]:
+        stored_signatures = load_signatures(index_path)
+        if stored_signatures is not None and len(stored_signatures) == len(store):
+            kept_signatures = np.asarray(stored_signatures[kept_rows])
+        else:
+            # Built before signatures were saved, sign the kept chunks once
+            kept_signatures = minhash_signatures([store.get_text(int(row)) for row in kept_rows])
+        new_signatures = minhash_signatures([c.text for c in new_chunks])
+        if new_chunks:
+            near_duplicates = NearDuplicateIndex(dedup["threshold"], dedup["max_signatures"])
+            for row, signature in enumerate(kept_signatures):
+                near_duplicates.insert(row, signature)
+            unique, duplicates = fold_duplicates(new_chunks, new_signatures, near_duplicates, len(kept_rows))
+            new_chunks = [new_chunks[i] for i in unique]
+            new_signatures = new_signatures[unique]
+        signatures = np.concatenate([kept_signatures, new_signatures])
+
+    dimension = manifest["dimension"]
+    new_vectors = np.zeros((0, dimension), dtype=np.float32)
+    if new_chunks:
+        model = get_embedding_model(embedding_model)
+        new_vectors = encode_texts(
+            model,
+            [c.text for c in new_chunks],
+            embedding_model,
+            embedding_cache,
+            show_progress_bar=True
+        )
+        faiss.normalize_L2(new_vectors)
+    next_vector_id = manifest["next_vector_id"]
+    new_ids = np.arange(next_vector_id, next_vector_id + len(new_chunks), dtype=np.int64)
+
+    vectors = np.vstack([kept_vectors, new_vectors])
+    if uses_mapped_vectors(config):
+        # A flat index is just its vectors
+        index = None
+    elif config.index_type == IndexType.HNSW and removed:
+        # HNSW graphs cannot drop vectors, rebuild from the stored ones
+        index = build_index(vectors, config, np.concatenate([kept_ids, new_ids]))
+    else:
+        index = faiss.read_index(os.path.join(index_path, "faiss.index"))
+        removed_ids = np.array(store.rows["vector_id"][~keep], dtype=np.int64)
+        if len(removed_ids):
+            index.remove_ids(faiss.IDSelectorBatch(removed_ids))
+        if new_chunks:
+            index.add_with_ids(new_vectors, new_ids)
+
+    write_index(index_path, vectors, index)
+
+    # Kept documents, rows and duplicates are copied as stored, new chunks appended after them
+    text_path = os.path.join(index_path, "text.bin")
+    with open(f"{text_path}.tmp", "wb") as text_file:
+        writer = ChunkStoreWriter(text_file)
+        writer.add_stored(
+            store,
+            kept_doc_ids,
+            kept_rows,
+            kept_duplicates,
+            np.searchsorted(kept_rows, duplicate_rows[kept_duplicates])
+        )
+        for chunk, vector_id in zip(new_chunks, new_ids):
+            source = chunk.metadata.source_file
+            writer.add_chunk(
+                chunk, vector_id, document_texts.get(source), content_hashes.get(source), document_pages.get(source)
+            )
+        for row, chunk in duplicates:
+            source = chunk.metadata.source_file
+            writer.add_duplicate(
+                chunk, row, document_texts.get(source), content_hashes.get(source), document_pages.get(source)
+            )
+    os.replace(f"{text_path}.tmp", text_path)
+    writer.save_tables(index_path)
+    write_signatures(index_path, signatures)
+
+    # Postings are by row and rows shift on removal, so the lexical index is rebuilt (no embedding involved)
+    store = open_chunk_store(index_path)
+    write_lexical_index(index_path, (store.get_text(row) for row in range(len(store))))
+    write_manifest(index_path, embedding_model, len(store), dimension, config, next_vector_id + len(new_chunks))
+
+    logger.info(
+        f"Updated index at {index_path}: {stats['added']} added, "
+        f"{stats['removed']} removed, {stats['unchanged']} unchanged"
+    )
+    return stats
+
+if __name__ == "__main__":
+    import argparse
+    from server.utils.config import get_embedding_config
+
+    parser = argparse.ArgumentParser(description="Update the FAISS index with new, changed and deleted documents")
+    parser.add_argument("--text-folder", default="./server/tmp/processed")
+    parser.add_argument("--index-path", default="./server/tmp/indexes")
+    parser.add_argument("--embedding-cache", default=get_embedding_config()["cache_path"])
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Embed every chunk from scratch")
+    args = parser.parse_args()
+
+    stats = update_faiss_index(
+        args.text_folder,
+        args.index_path,
+        embedding_cache=None if args.no_embedding_cache else EmbeddingCache(args.embedding_cache)
+    )
+    print(f"Added {stats['added']}, removed {stats['removed']}, unchanged {stats['unchanged']} documents")
@@ -0,0 +1,143 @@
+import time
+import logging
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import faiss
+from server.src.data_model import IndexBenchmarkResult, IndexConfig, IndexType
+from .index_factory import build_index, resolve_index_config, apply_search_params
+from .search import search_index
+
+# Searches a (1, d) query for k results, returning (scores, ids)
+SearchFn = Callable[[np.ndarray, int], Tuple[np.ndarray, np.ndarray]]
+
+logger = logging.getLogger(__name__)
+
+# Compressed first stages, each measured with and without exact re-scoring
+COMPRESSED_CONFIGS = [
+    IndexConfig(index_type=index_type, rescore=rescore)
+    for index_type in (IndexType.SQ8, IndexType.PQ, IndexType.IVF_PQ)
+    for rescore in (False, True)
+]
+
+# Query-time parameter swept for each index type
+SWEEP_PARAMS = {
+    IndexType.IVF_FLAT: ("nprobe", [1, 4, 8, 16, 32, 64]),
+    IndexType.IVF_PQ: ("nprobe", [1, 4, 8, 16, 32, 64]),
+    IndexType.HNSW: ("ef_search", [16, 32, 64, 128, 256])
+}
+
+def recall_at_k(ground_truth: np.ndarray, results: np.ndarray, k: int) -> float:
+    """Fraction of the exact top-k found in the approximate top-k"""
+    hits = 0
+    for truth, found in zip(ground_truth[:, :k], results[:, :k]):
+        hits += len(set(truth[truth >= 0]) & set(found[found >= 0]))
+    return hits / (len(ground_truth) * k)
+
+def timed_search(search_fn: SearchFn, queries: np.ndarray, k: int) -> Tuple[np.ndarray, float]:
+    """Search one query at a time, as the server does; returns ids and mean ms per query"""
+    results = np.zeros((len(queries), k), dtype=np.int64)
+    start_time = time.perf_counter()
+    for i, query in enumerate(queries):
+        _, indices = search_fn(query.reshape(1, -1), k)
+        results[i] = indices[0]
+    latency_ms = (time.perf_counter() - start_time) * 1000 / max(len(queries), 1)
+    return results, latency_ms
+
+def benchmark_index_configs(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    configs: List[IndexConfig],
+    k: int = 7
+) -> List[IndexBenchmarkResult]:
+    """Measure recall@k and latency of each config against the exact flat index.
+
+    Configs with rescore enabled re-rank against a float16 copy of the
+    embeddings, as served from vectors.npy. memory_bytes counts the index
+    only, the float16 vectors stay on disk.
+    """
+    exact_index = build_index(embeddings, IndexConfig(index_type=IndexType.FLAT))
+    ground_truth, _ = timed_search(exact_index.search, queries, k)
+    stored_vectors = embeddings.astype(np.float16)
+
+    results = []
+    for config in configs:
+        config = resolve_index_config(config, len(embeddings), embeddings.shape[1])
+
+        start_time = time.time()
+        index = build_index(embeddings, config)
+        build_time = time.time() - start_time
+        memory_bytes = int(faiss.serialize_index(index).nbytes)
+
+        param_name, values = SWEEP_PARAMS.get(config.index_type, (None, [None]))
+        for value in values:
+            search_params: Dict[str, int] = {}
+            if param_name is not None:
+                if param_name == "nprobe" and value > config.nlist:
+                    continue
+                config = config.model_copy(update={param_name: value})
+                apply_search_params(index, config)
+                search_params[param_name] = value
+
+            search_fn = lambda q, n, config=config: search_index(index, q, n, config, stored_vectors)
+            found, latency_ms = timed_search(search_fn, queries, k)
+            results.append(IndexBenchmarkResult(
+                index_type=config.index_type,
+                search_params=search_params,
+                rescore=config.rescore,
+                k=k,
+                recall_at_k=recall_at_k(ground_truth, found, k),
+                latency_ms=latency_ms,
+                build_time_seconds=build_time,
+                memory_bytes=memory_bytes
+            ))
+
+    return results
+
+def print_benchmark_report(results: List[IndexBenchmarkResult]) -> None:
+    """Print a recall vs latency table"""
+    print(f"{'index':<10} {'params':<16} {'rescore':<8} {'recall@k':>9} {'ms/query':>9} {'build s':>8} {'MB':>8}")
+    for result in results:
+        params = ", ".join(f"{name}={value}" for name, value in result.search_params.items())
+        print(
+            f"{result.index_type.value:<10} {params:<16} {'yes' if result.rescore else 'no':<8} "
+            f"{result.recall_at_k:>9.3f} "
+            f"{result.latency_ms:>9.3f} {result.build_time_seconds:>8.2f} "
+            f"{result.memory_bytes / 1024 / 1024:>8.2f}"
+        )
+
+def sample_queries(embeddings: np.ndarray, num_queries: int, seed: int = 0) -> np.ndarray:
+    """Use a random sample of corpus vectors as queries"""
+    rng = np.random.default_rng(seed)
+    size = min(num_queries, len(embeddings))
+    return embeddings[rng.choice(len(embeddings), size, replace=False)]
+
+if __name__ == "__main__":
+    import argparse
+    from .json_to_index import load_and_split_texts
+    from .embedding_registry import get_embedding_model
+    from .batch_encoder import encode_batched
+
+    parser = argparse.ArgumentParser(description="Compare approximate FAISS indexes with exact search")
+    parser.add_argument("--text-folder", default="./server/tmp/processed")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=7)
+    parser.add_argument(
+        "--compressed",
+        action="store_true",
+        help="Compare compressed indexes with and without exact re-scoring"
+    )
+    args = parser.parse_args()
+
+    chunks = load_and_split_texts(args.text_folder)
+    model = get_embedding_model()
+    embeddings, _ = encode_batched(model, [c.text for c in chunks], show_progress_bar=True)
+    faiss.normalize_L2(embeddings)
+
+    results = benchmark_index_configs(
+        embeddings,
+        sample_queries(embeddings, args.num_queries),
+        COMPRESSED_CONFIGS if args.compressed else [IndexConfig(index_type=t) for t in IndexType],
+        k=args.k
+    )
+    print(f"\n{len(embeddings)} vectors, {args.num_queries} queries")
+    print_benchmark_report(results)
@@ -0,0 +1,140 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple, Union
+import numpy as np
+import faiss
+from server.src.data_model import IndexCacheStats, IndexConfig
+from server.utils.config import get_collections_config
+from .json_to_index import load_index, load_vectors, read_manifest, INDEX_FILES
+from .chunk_store import ChunkStore
+from .index_factory import MappedFlatIndex
+from .lexical_index import LexicalIndex, open_lexical_index
+from .metadata_filter import MetadataFilterIndex
+
+logger = logging.getLogger(__name__)
+
+# (file name, mtime_ns, size) for every index file present on disk
+IndexSignature = Tuple[Tuple[str, int, int], ...]
+
+class LoadedIndex(NamedTuple):
+    """Everything retrieval needs from one index directory"""
+    index: Union[faiss.Index, MappedFlatIndex]
+    chunks: ChunkStore
+    vectors: Optional[np.ndarray]  # Memory-mapped vectors.npy by row, for re-scoring and fusion
+    config: IndexConfig
+    lexical: Optional[LexicalIndex] = None  # BM25 postings, absent for indexes built before them
+    filters: Optional[MetadataFilterIndex] = None  # Per-field masks for filtered search
+
+# Resident indexes keyed by absolute index path, least recently used first
+_index_cache: "OrderedDict[str, Tuple[IndexSignature, LoadedIndex]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_loads = 0
+_evictions = 0
+
+def get_index_signature(index_path: str) -> IndexSignature:
+    """Stat the index files so on-disk changes can be detected cheaply"""
+    signature = []
+    for file_name in INDEX_FILES:
+        file_path = os.path.join(index_path, file_name)
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            continue
+        signature.append((file_name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def signature_bytes(signature: IndexSignature) -> int:
+    """Size of an index on disk, which is what it occupies once its mapped pages are touched"""
+    return sum(size for _, _, size in signature)
+
+def _touch(cache_key: str) -> None:
+    """Mark an index as most recently used; OrderedDict moves are atomic, so hits skip the lock"""
+    try:
+        _index_cache.move_to_end(cache_key)
+    except KeyError:
+        pass  # Evicted by a concurrent load
+
+def _evict(keep: str) -> None:
+    """Drop least recently used indexes until the rest fit the memory budget; call with the lock held"""
+    global _evictions
+    budget = get_collections_config()["memory_budget_bytes"]
+    resident = sum(signature_bytes(signature) for signature, _ in _index_cache.values())
+    for cache_key in list(_index_cache):
+        if resident <= budget:
+            break
+        if cache_key == keep:
+            continue
+        signature, _ = _index_cache.pop(cache_key)
+        resident -= signature_bytes(signature)
+        _evictions += 1
+        # Queries already holding the index finish on it; its mappings close when they drop it
+        logger.info(f"Evicted index {cache_key} ({signature_bytes(signature) / 1024 / 1024:.1f} MB) over memory budget")
+
+def _load(index_path: str) -> LoadedIndex:
+    index, chunks = load_index(index_path)
+    manifest = read_manifest(index_path)
+    return LoadedIndex(
+        index=index,
+        chunks=chunks,
+        vectors=load_vectors(index_path),
+        config=IndexConfig(**manifest.get("index_config", {})),
+        lexical=open_lexical_index(index_path),
+        filters=MetadataFilterIndex(chunks)
+    )
+
+def get_loaded_index(index_path: str) -> LoadedIndex:
+    """Get the resident index, loading it on first use and reloading only when the files changed"""
+    global _loads
+    cache_key = os.path.abspath(index_path)
+    signature = get_index_signature(cache_key)
+
+    cached = _index_cache.get(cache_key)
+    if cached is not None and cached[0] == signature:
+        _touch(cache_key)
+        return cached[1]
+
+    with _cache_lock:
+        # Another caller may have reloaded it while we waited
+        cached = _index_cache.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            _index_cache.move_to_end(cache_key)
+            return cached[1]
+
+        logger.info(f"Loading index from {index_path}")
+        loaded = _load(index_path)
+        _loads += 1
+
+        # Only keep the result if no rebuild happened during the load
+        if get_index_signature(cache_key) == signature:
+            _index_cache[cache_key] = (signature, loaded)
+            _index_cache.move_to_end(cache_key)
+            _evict(keep=cache_key)
+        else:
+            logger.warning(f"Index at {index_path} changed while loading, not caching")
+
+        return loaded
+
+def get_index_cache_stats() -> IndexCacheStats:
+    with _cache_lock:
+        return IndexCacheStats(
+            resident=list(_index_cache),
+            resident_bytes=sum(signature_bytes(signature) for signature, _ in _index_cache.values()),
+            budget_bytes=get_collections_config()["memory_budget_bytes"],
+            loads=_loads,
+            evictions=_evictions
+        )
+
+def get_cached_index(index_path: str) -> Tuple[faiss.Index, ChunkStore]:
+    """Get the resident index and chunks, reloading only when the files changed"""
+    loaded = get_loaded_index(index_path)
+    return loaded.index, loaded.chunks
+
+def invalidate_index_cache(index_path: Optional[str] = None) -> None:
+    """Drop one cached index, or all of them"""
+    with _cache_lock:
+        if index_path is None:
+            _index_cache.clear()
+        else:
+            _index_cache.pop(os.path.abspath(index_path), None)
@@ -0,0 +1,164 @@
+import math
+import logging
+from typing import Optional, Tuple
+import numpy as np
+import faiss
+from server.src.data_model import IndexConfig, IndexType
+
+logger = logging.getLogger(__name__)
+
+# k-means wants roughly this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+def default_nlist(num_vectors: int) -> int:
+    """Number of IVF cells for a corpus size"""
+    nlist = int(4 * math.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // MIN_POINTS_PER_CENTROID))
+
+def resolve_index_config(config: IndexConfig, num_vectors: int, dimension: int) -> IndexConfig:
+    """Fill in defaults and shrink the config to what the corpus can train"""
+    config = config.model_copy()
+
+    if config.index_type in (IndexType.IVF_FLAT, IndexType.IVF_PQ):
+        if num_vectors < MIN_POINTS_PER_CENTROID:
+            logger.warning(f"Only {num_vectors} vectors, too few to train {config.index_type.value}, using flat")
+            config.index_type = IndexType.FLAT
+            return config
+        config.nlist = min(config.nlist or default_nlist(num_vectors), num_vectors)
+        config.nprobe = min(config.nprobe, config.nlist)
+
+    if config.index_type in (IndexType.IVF_PQ, IndexType.PQ):
+        # Every PQ code needs at least one training point
+        config.pq_bits = min(config.pq_bits, int(math.log2(max(num_vectors, 1))))
+        if config.pq_bits < 4:
+            fallback = IndexType.IVF_FLAT if config.index_type == IndexType.IVF_PQ else IndexType.SQ8
+            logger.warning(f"Only {num_vectors} vectors, too few to train PQ codes, using {fallback.value}")
+            config.index_type = fallback
+        while dimension % config.pq_m:
+            config.pq_m -= 1
+
+    return config
+
+def create_empty_index(dimension: int, config: IndexConfig) -> faiss.Index:
+    """Create an untrained index; inner product equals cosine similarity on normalized vectors"""
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if config.index_type == IndexType.FLAT:
+        return faiss.IndexFlatIP(dimension)
+
+    if config.index_type == IndexType.HNSW:
+        index = faiss.IndexHNSWFlat(dimension, config.hnsw_m, metric)
+        index.hnsw.efConstruction = config.ef_construction
+        return index
+
+    # Compressed codes: 1 byte per dimension, or pq_m * pq_bits bits per vector
+    if config.index_type == IndexType.SQ8:
+        return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, metric)
+    if config.index_type == IndexType.PQ:
+        return faiss.IndexPQ(dimension, config.pq_m, config.pq_bits, metric)
+
+    quantizer = faiss.IndexFlatIP(dimension)
+    if config.index_type == IndexType.IVF_FLAT:
+        return faiss.IndexIVFFlat(quantizer, dimension, config.nlist, metric)
+    if config.index_type == IndexType.IVF_PQ:
+        return faiss.IndexIVFPQ(quantizer, dimension, config.nlist, config.pq_m, config.pq_bits, metric)
+
+    raise ValueError(f"Unknown index type: {config.index_type}")
+
+def uses_mapped_vectors(config: IndexConfig) -> bool:
+    """Flat indexes are saved as their float32 vectors.npy and searched memory-mapped, with no FAISS file"""
+    return config.index_type == IndexType.FLAT
+
+class MappedFlatIndex:
+    """Exact inner-product search over a memory-mapped float32 matrix.
+
+    Stands in for IndexIDMap(IndexFlatIP) once a flat index is saved:
+    FAISS copies flat vectors into process memory on read (IO_FLAG_MMAP
+    does not apply to them), while this searches the mapped vectors.npy,
+    so every worker serving the index shares one copy in the page cache.
+    Row i of vectors has vector id ids[i].
+    """
+
+    # Selected rows gathered per block for filtered search, bounds the temporary copy
+    BLOCK_ROWS = 1 << 14
+
+    def __init__(self, vectors: np.ndarray, ids: Optional[np.ndarray] = None):
+        self.vectors = vectors
+        self.ids = np.arange(len(vectors), dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.ntotal = len(vectors)
+        self.d = vectors.shape[1]
+
+    def search(
+        self,
+        x: np.ndarray,
+        k: int,
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k scores and vector ids like Index.search, padded with -1; rows restricts the search"""
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if rows is None:
+            scores, found = faiss.knn(x, self.vectors, k, metric=faiss.METRIC_INNER_PRODUCT)
+            return scores, np.where(found >= 0, self.ids[np.maximum(found, 0)], -1)
+
+        scores, found = faiss.knn(x, np.zeros((0, self.d), dtype=np.float32), k, metric=faiss.METRIC_INNER_PRODUCT)
+        for start in range(0, len(rows), self.BLOCK_ROWS):
+            block = np.asarray(rows[start:start + self.BLOCK_ROWS], dtype=np.int64)
+            block_scores, block_found = faiss.knn(
+                x, np.ascontiguousarray(self.vectors[block]), k, metric=faiss.METRIC_INNER_PRODUCT
+            )
+            block_found = np.where(block_found >= 0, block[np.maximum(block_found, 0)], -1)
+            merged_scores = np.hstack([scores, block_scores])
+            merged_found = np.hstack([found, block_found])
+            order = np.argsort(-merged_scores, axis=1, kind="stable")[:, :k]
+            scores = np.take_along_axis(merged_scores, order, axis=1)
+            found = np.take_along_axis(merged_found, order, axis=1)
+        return scores, np.where(found >= 0, self.ids[np.maximum(found, 0)], -1)
+
+def training_sample(embeddings: np.ndarray, sample_size: int, seed: int = 0) -> np.ndarray:
+    """Random subset of the embeddings to train on"""
+    if len(embeddings) <= sample_size:
+        return embeddings
+    rng = np.random.default_rng(seed)
+    return embeddings[np.sort(rng.choice(len(embeddings), sample_size, replace=False))]
+
+def apply_search_params(index: faiss.Index, config: IndexConfig) -> None:
+    """Set the saved query-time parameters (nprobe, efSearch) on an index"""
+    params = faiss.ParameterSpace()
+    if config.index_type in (IndexType.IVF_FLAT, IndexType.IVF_PQ):
+        params.set_index_parameter(index, "nprobe", config.nprobe)
+    elif config.index_type == IndexType.HNSW:
+        params.set_index_parameter(index, "efSearch", config.ef_search)
+
+def needs_training(config: IndexConfig) -> bool:
+    """Whether the index type must see sample vectors before any are added"""
+    return config.index_type not in (IndexType.FLAT, IndexType.HNSW)
+
+def supports_ids(config: IndexConfig) -> bool:
+    """IVF indexes store ids natively, the others need an IndexIDMap"""
+    return config.index_type in (IndexType.IVF_FLAT, IndexType.IVF_PQ)
+
+def build_index(
+    embeddings: np.ndarray,
+    config: Optional[IndexConfig] = None,
+    ids: Optional[np.ndarray] = None
+) -> faiss.Index:
+    """Build, train and fill an index from normalized embeddings.
+
+    config must already be resolved for the corpus (see resolve_index_config).
+    Vectors are added under ids (row numbers by default) so documents can
+    later be removed and appended without a rebuild.
+    """
+    config = config or IndexConfig()
+    index = create_empty_index(embeddings.shape[1], config)
+
+    if not index.is_trained:
+        index.train(training_sample(embeddings, config.train_sample_size))
+
+    if not supports_ids(config):
+        index = faiss.IndexIDMap(index)
+
+    if ids is None:
+        ids = np.arange(len(embeddings), dtype=np.int64)
+    index.add_with_ids(embeddings, ids)
+    apply_search_params(index, config)
+    return index
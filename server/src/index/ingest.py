@@ -0,0 +1,305 @@
+import os
+import queue
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+import faiss
+from server.src.data_model import DocumentChunk, IndexConfig
+from server.utils.config import get_dedup_config
+from .document_processor import process_document
+from .embedding_registry import get_embedding_model
+from .embedding_cache import EmbeddingCache, encode_texts
+from .index_factory import build_index, needs_training, resolve_index_config, uses_mapped_vectors
+from .chunk_store import ChunkStoreWriter, open_chunk_store
+from .lexical_index import write_lexical_index
+from .dedup import NearDuplicateIndex, minhash_signatures, write_signatures, SIGNATURES_FILE
+from .pdf_to_json import extract_document, write_processed_document
+from .extraction_cache import ExtractionCache
+from .json_to_index import (
+    document_hash,
+    remove_faiss_index,
+    vectors_dtype,
+    write_faiss_index,
+    write_manifest
+)
+
+logger = logging.getLogger(__name__)
+
+# Chunks embedded per batch and batches in flight between stages; together
+# they bound the memory held by the pipeline
+BATCH_SIZE = 256
+QUEUE_SIZE = 4
+
+# (chunk, document text, document content hash, document page offsets)
+ChunkItem = Tuple[DocumentChunk, str, str, Optional[List[int]]]
+
+_DONE = object()
+
+class _StageError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def run_in_background(items: Iterable[Any], max_pending: int = QUEUE_SIZE) -> Iterator[Any]:
+    """Iterate items on a worker thread, handing them over through a bounded queue.
+
+    The worker blocks once max_pending items are waiting, so a slow consumer
+    holds back the stages feeding it.
+    """
+    handoff: queue.Queue = queue.Queue(maxsize=max_pending)
+    stopped = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_StageError(e))
+        finally:
+            put(_DONE)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = handoff.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # Unblock the worker if the consumer stopped early
+        stopped.set()
+        worker.join()
+
+def iter_pdf_documents(
+    pdf_folder: str,
+    text_folder: Optional[str] = None,
+    extraction_cache: Optional[ExtractionCache] = None
+) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """Extract PDFs one at a time, optionally saving the processed documents for later updates"""
+    for file_name in sorted(f for f in os.listdir(pdf_folder) if f.endswith(".pdf")):
+        text, metadata = extract_document(os.path.join(pdf_folder, file_name), extraction_cache)
+        if text_folder is not None:
+            os.makedirs(text_folder, exist_ok=True)
+            write_processed_document(text_folder, file_name, text, metadata)
+        yield text, metadata
+
+def iter_chunk_batches(
+    documents: Iterable[Tuple[str, Dict[str, str]]],
+    batch_size: int = BATCH_SIZE,
+    embedding_model: Optional[str] = None
+) -> Iterator[List[ChunkItem]]:
+    """Split documents into chunks and group them into embedding batches"""
+    batch: List[ChunkItem] = []
+    for text, metadata in documents:
+        content_hash = document_hash(text, metadata)
+        page_offsets = metadata.get("page_offsets")
+        for chunk in process_document(text, metadata, embedding_model):
+            batch.append((chunk, text, content_hash, page_offsets))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+class _VectorFile:
+    """Float32 vectors (or other fixed-width rows) appended to a raw file, turned into a .npy file at the end"""
+
+    def __init__(self, index_path: str, name: str = "vectors", raw_dtype: type = np.float32):
+        self.raw_path = os.path.join(index_path, f"{name}.raw.tmp")
+        self.raw_dtype = raw_dtype
+        self.file = open(self.raw_path, "wb")
+        self.count = 0
+        self.dimension = 0
+
+    def append(self, vectors: np.ndarray) -> None:
+        self.file.write(np.ascontiguousarray(vectors, dtype=self.raw_dtype).tobytes())
+        self.count += len(vectors)
+        self.dimension = vectors.shape[1]
+
+    def discard(self) -> None:
+        self.file.close()
+        os.remove(self.raw_path)
+
+    def save(self, path: str, block_size: int, dtype: type) -> None:
+        self.file.close()
+        raw = np.memmap(self.raw_path, dtype=self.raw_dtype, mode="r", shape=(self.count, self.dimension))
+        out = np.lib.format.open_memmap(f"{path}.tmp", mode="w+", dtype=dtype, shape=(self.count, self.dimension))
+        for start in range(0, self.count, block_size):
+            out[start:start + block_size] = raw[start:start + block_size]
+        out.flush()
+        del raw, out
+        os.replace(f"{path}.tmp", path)
+        os.remove(self.raw_path)
+
+def ingest_pdfs(
+    pdf_folder: str,
+    index_path: str,
+    embedding_model: str = 'sentence-transformers/all-MiniLM-L6-v2',
+    index_config: Optional[IndexConfig] = None,
+    text_folder: Optional[str] = None,
+    batch_size: int = BATCH_SIZE,
+    queue_size: int = QUEUE_SIZE,
+    embedding_cache: Optional[EmbeddingCache] = None,
+    extraction_cache: Optional[ExtractionCache] = None
+) -> int:
+    """Stream PDFs into a new index: pages, text, chunks, embedding batches, index append.
+
+    Extraction and chunking run on their own threads behind bounded queues,
+    so only a few batches of chunks and embeddings are held at a time.
+    Index types that need training buffer up to train_sample_size vectors
+    first and are sized for that many; set nlist for much larger corpora.
+    Produces the same files as create_faiss_index and returns the chunk count.
+    """
+    config = index_config or IndexConfig()
+    model = get_embedding_model(embedding_model)
+    os.makedirs(index_path, exist_ok=True)
+
+    documents = run_in_background(iter_pdf_documents(pdf_folder, text_folder, extraction_cache), queue_size)
+    batches = run_in_background(iter_chunk_batches(documents, batch_size, embedding_model), queue_size)
+
+    index: Optional[faiss.Index] = None
+    pending: List[np.ndarray] = []  # Vectors waiting for a trainable index to be built
+    train_size = 0
+    vector_file = _VectorFile(index_path)
+    text_path = os.path.join(index_path, "text.bin")
+    dedup = get_dedup_config()
+    # Signatures of recently repeated chunks, so repeats are folded in across documents in bounded memory
+    near_duplicates = (
+        NearDuplicateIndex(dedup["threshold"], dedup["max_signatures"]) if dedup["enabled"] else None
+    )
+    # Signature of every row, saved so updates only sign new chunks
+    signature_file = _VectorFile(index_path, "signatures", np.uint32) if dedup["enabled"] else None
+
+    with open(f"{text_path}.tmp", "wb") as text_file:
+        writer = ChunkStoreWriter(text_file)
+        for batch in batches:
+            if near_duplicates is not None:
+                unique: List[ChunkItem] = []
+                unique_signatures: List[np.ndarray] = []
+                signatures = minhash_signatures([item[0].text for item in batch])
+                for item, signature in zip(batch, signatures):
+                    # Vector ids are rows here, so the next unique chunk lands at this row
+                    representative = near_duplicates.add(vector_file.count + len(unique), signature)
+                    if representative is None:
+                        unique.append(item)
+                        unique_signatures.append(signature)
+                    else:
+                        chunk, text, content_hash, page_offsets = item
+                        writer.add_duplicate(chunk, representative, text, content_hash, page_offsets)
+                batch = unique
+                if not batch:
+                    continue
+                signature_file.append(np.stack(unique_signatures))
+
+            embeddings = encode_texts(model, [item[0].text for item in batch], embedding_model, embedding_cache)
+            faiss.normalize_L2(embeddings)
+
+            ids = np.arange(vector_file.count, vector_file.count + len(batch), dtype=np.int64)
+            for (chunk, text, content_hash, page_offsets), vector_id in zip(batch, ids):
+                writer.add_chunk(chunk, vector_id, text, content_hash, page_offsets)
+            vector_file.append(embeddings)
+            logger.info(f"Embedded {vector_file.count} chunks")
+
+            if index is not None:
+                index.add_with_ids(embeddings, ids)
+                continue
+            if uses_mapped_vectors(config):
+                # A flat index is just the vector file
+                continue
+
+            pending.append(embeddings)
+            train_size += len(embeddings)
+            if not needs_training(config) or train_size >= config.train_sample_size:
+                config = resolve_index_config(config, train_size, embeddings.shape[1])
+                index = build_index(np.vstack(pending), config)
+                pending = []
+
+    if vector_file.count == 0:
+        vector_file.discard()
+        if signature_file is not None:
+            signature_file.discard()
+        os.remove(f"{text_path}.tmp")
+        raise ValueError(f"No PDF text found in {pdf_folder}")
+
+    if index is None and not uses_mapped_vectors(config):
+        # The whole corpus fit in the training buffer
+        config = resolve_index_config(config, train_size, vector_file.dimension)
+        if not uses_mapped_vectors(config):
+            index = build_index(np.vstack(pending), config)
+
+    # Same order as write_index: vectors before the FAISS file of a flat index is removed
+    if index is not None:
+        write_faiss_index(index, index_path)
+    vector_file.save(os.path.join(index_path, "vectors.npy"), batch_size, vectors_dtype(index))
+    if index is None:
+        remove_faiss_index(index_path)
+    if signature_file is not None:
+        signature_file.save(os.path.join(index_path, SIGNATURES_FILE), batch_size, np.uint32)
+    else:
+        write_signatures(index_path, None)
+    os.replace(f"{text_path}.tmp", text_path)
+    writer.save_tables(index_path)
+
+    # Postings are built from the saved store so chunk text is never all in memory at once
+    store = open_chunk_store(index_path)
+    write_lexical_index(index_path, (store.get_text(row) for row in range(len(store))))
+
+    legacy_chunks_path = os.path.join(index_path, "chunks.json")
+    if os.path.exists(legacy_chunks_path):
+        os.remove(legacy_chunks_path)
+
+    num_chunks = vector_file.count
+    write_manifest(index_path, embedding_model, num_chunks, vector_file.dimension, config, num_chunks)
+    logger.info(
+        f"Ingested {num_chunks} chunks ({len(writer.duplicates)} near-duplicates folded in) "
+        f"from {len(writer.documents)} documents into {index_path}"
+    )
+    return num_chunks
+
+if __name__ == "__main__":
+    import argparse
+    from server.src.data_model import IndexType
+    from server.utils.config import get_embedding_config, get_extraction_config
+
+    parser = argparse.ArgumentParser(description="Stream PDFs straight into a FAISS index")
+    parser.add_argument("--pdf-folder", default="./server/src/data/documents")
+    parser.add_argument("--index-path", default="./server/tmp/indexes")
+    parser.add_argument(
+        "--text-folder",
+        default="./server/tmp/processed",
+        help="Also save processed JSON so the index can be updated incrementally"
+    )
+    parser.add_argument("--index-type", choices=[t.value for t in IndexType], default=IndexType.FLAT.value)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--embedding-cache", default=get_embedding_config()["cache_path"])
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Embed every chunk from scratch")
+    parser.add_argument("--extraction-cache", default=get_extraction_config()["cache_path"])
+    parser.add_argument("--no-extraction-cache", action="store_true", help="Re-extract every PDF")
+    args = parser.parse_args()
+
+    num_chunks = ingest_pdfs(
+        args.pdf_folder,
+        args.index_path,
+        index_config=IndexConfig(index_type=args.index_type),
+        text_folder=args.text_folder,
+        batch_size=args.batch_size,
+        embedding_cache=None if args.no_embedding_cache else EmbeddingCache(args.embedding_cache),
+        extraction_cache=None if args.no_extraction_cache else ExtractionCache(
+            args.extraction_cache, get_extraction_config()["zstd_level"]
+        )
+    )
+    print(f"Created FAISS index with {num_chunks} chunks")
+    print(f"Index saved to {args.index_path}")
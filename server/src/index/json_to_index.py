@@ -1,82 +1,269 @@
 import os
 import json
+import time
+import hashlib
 import numpy as np
 import faiss
-from typing import List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 from sentence_transformers import SentenceTransformer
 from .document_processor import process_document
-from server.src.data_model import DocumentChunk
+from .pdf_to_json import is_processed_document, read_processed_document
+from .embedding_registry import get_embedding_model
+from .embedding_cache import EmbeddingCache, encode_texts
+from .index_factory import (
+    MappedFlatIndex,
+    apply_search_params,
+    build_index,
+    resolve_index_config,
+    uses_mapped_vectors
+)
+from .chunk_store import (
+    ChunkStore,
+    write_chunk_store,
+    open_chunk_store,
+    build_chunk_store,
+    chunk_store_exists,
+    replace_file,
+    save_array,
+    CHUNK_STORE_FILES,
+    DUPLICATES_FILE,
+    PAGES_FILE
+)
+from .lexical_index import write_lexical_index, LEXICAL_INDEX_FILES
+from .dedup import NearDuplicateIndex, fold_duplicates, minhash_signatures, write_signatures
+from server.src.data_model import DocumentChunk, IndexConfig, IndexType
+from server.utils.config import get_chunking_config, get_dedup_config
 
-def load_and_split_texts(text_folder: str) -> List[DocumentChunk]:
+# Files making up a saved index; the manifest is written last
+INDEX_FILES = [
+    "faiss.index",
+    "vectors.npy",
+    *CHUNK_STORE_FILES,
+    DUPLICATES_FILE,
+    PAGES_FILE,
+    *LEXICAL_INDEX_FILES,
+    "chunks.json",
+    "manifest.json"
+]
+
+def load_documents(text_folder: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (text, metadata) for each processed document, plain or zstd-compressed JSON"""
+    for file_name in os.listdir(text_folder):
+        if is_processed_document(file_name):
+            yield read_processed_document(os.path.join(text_folder, file_name))
+
+def document_hash(text: str, metadata: Dict[str, Any]) -> str:
+    """Content hash of a processed document, used to skip unchanged documents on update"""
+    payload = json.dumps({"text": text, "metadata": metadata}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_and_split_texts(text_folder: str, embedding_model: Optional[str] = None) -> List[DocumentChunk]:
     """Load JSON files and split into chunks"""
     chunks = []
     
-    for file_name in os.listdir(text_folder):
-        if file_name.endswith('.json'):
-            with open(os.path.join(text_folder, file_name), "r") as file:
-                data = json.load(file)
-                text = data["text"]
-                metadata = data["metadata"]
-                
-                # Process document into chunks
-                doc_chunks = process_document(text, metadata)
-                chunks.extend(doc_chunks)
+    for text, metadata in load_documents(text_folder):
+        # Process document into chunks
+        doc_chunks = process_document(text, metadata, embedding_model)
+        chunks.extend(doc_chunks)
     
     return chunks
 
 def create_faiss_index(
     text_folder: str,
     index_path: str,
-    embedding_model: str = 'sentence-transformers/all-MiniLM-L6-v2'
+    embedding_model: str = 'sentence-transformers/all-MiniLM-L6-v2',
+    index_config: Optional[IndexConfig] = None,
+    embedding_cache: Optional[EmbeddingCache] = None
 ) -> None:
     """Create and save FAISS index from document chunks"""
-    # Load and split documents
-    chunks = load_and_split_texts(text_folder)
+    # Load and split documents, keeping each document's text to store it once
+    chunks = []
+    document_texts = {}
+    content_hashes = {}
+    document_pages = {}
+    for text, metadata in load_documents(text_folder):
+        chunks.extend(process_document(text, metadata, embedding_model))
+        document_texts[metadata["source_file"]] = text
+        content_hashes[metadata["source_file"]] = document_hash(text, metadata)
+        if "page_offsets" in metadata:
+            document_pages[metadata["source_file"]] = metadata["page_offsets"]
     
-    # Initialize embedding model
-    model = SentenceTransformer(embedding_model)
+    # Fold repeated headers, footers and boilerplate into one vector each
+    dedup = get_dedup_config()
+    duplicates = []
+    signatures = None
+    if dedup["enabled"]:
+        signatures = minhash_signatures([chunk.text for chunk in chunks])
+        unique, duplicates = fold_duplicates(chunks, signatures, NearDuplicateIndex(dedup["threshold"]))
+        chunks = [chunks[i] for i in unique]
+        signatures = signatures[unique]
     
-    # Create embeddings
+    # Get the shared embedding model
+    model = get_embedding_model(embedding_model)
+    
+    # Create embeddings, reusing cached ones for text seen in earlier builds
     texts = [chunk.text for chunk in chunks]
-    embeddings = model.encode(texts, convert_to_tensor=True, show_progress_bar=True)
-    embeddings = embeddings.cpu().numpy()  # Convert to numpy array
+    embeddings = encode_texts(model, texts, embedding_model, embedding_cache, show_progress_bar=True)
     
     # Normalize vectors for cosine similarity
     faiss.normalize_L2(embeddings)
     
-    # Create FAISS index
+    # Create FAISS index of the configured type
     dimension = embeddings.shape[1]  # Get embedding dimension
-    index = faiss.IndexFlatIP(dimension)  # Inner product = cosine similarity for normalized vectors
-    index.add(embeddings)
+    index_config = resolve_index_config(index_config or IndexConfig(), len(embeddings), dimension)
+    # A flat index is just its vectors, searched memory-mapped from vectors.npy
+    index = None if uses_mapped_vectors(index_config) else build_index(embeddings, index_config)
     
     # Create output directory if it doesn't exist
     os.makedirs(index_path, exist_ok=True)
     
-    # Save FAISS index
-    faiss.write_index(index, os.path.join(index_path, "faiss.index"))
+    # Save the vectors and, unless flat, the FAISS index
+    write_index(index_path, embeddings, index)
     
-    # Save chunks separately (FAISS only stores vectors)
-    chunks_data = [
-        {
-            "text": chunk.text,
-            "metadata": chunk.metadata.model_dump()
-        } for chunk in chunks
-    ]
+    # Save chunks separately (FAISS only stores vectors) in a flat,
+    # memory-mappable store so workers share page cache instead of parsing JSON
+    write_chunk_store(
+        index_path,
+        chunks,
+        document_texts,
+        content_hashes=content_hashes,
+        duplicates=duplicates,
+        document_pages=document_pages
+    )
     
-    with open(os.path.join(index_path, "chunks.json"), "w") as f:
-        json.dump(chunks_data, f)
+    # Kept so updates only sign new chunks
+    write_signatures(index_path, signatures)
     
-    print(f"Created FAISS index with {len(chunks)} chunks")
+    # BM25 postings by chunk row for exact terms (tickers, form names, figures)
+    write_lexical_index(index_path, texts)
+    
+    # Remove any JSON chunk file left by an older build
+    legacy_chunks_path = os.path.join(index_path, "chunks.json")
+    if os.path.exists(legacy_chunks_path):
+        os.remove(legacy_chunks_path)
+    
+    # Vectors are numbered by chunk row; updates continue from next_vector_id
+    write_manifest(index_path, embedding_model, len(chunks), dimension, index_config, len(chunks))
+    
+    print(f"Created FAISS index with {len(chunks)} chunks ({len(duplicates)} near-duplicates folded in)")
     print(f"Index saved to {index_path}")
+    if embedding_cache is not None:
+        stats = embedding_cache.stats()
+        print(f"Embedding cache: {stats.hits} hits, {stats.misses} misses ({stats.hit_rate:.1%} hit rate)")
+
+def write_manifest(
+    index_path: str,
+    embedding_model: str,
+    num_chunks: int,
+    dimension: int,
+    index_config: IndexConfig,
+    next_vector_id: int
+) -> None:
+    """Write the version manifest last so running servers notice the new build"""
+    chunking = get_chunking_config()
+    dedup = get_dedup_config()
+    manifest = {
+        "version": time.time_ns(),
+        "embedding_model": embedding_model,
+        "num_chunks": num_chunks,
+        "dimension": dimension,
+        "index_config": index_config.model_dump(mode="json"),
+        "next_vector_id": next_vector_id,
+        # Incremental updates must split new documents the same way
+        "chunking": {"mode": chunking["mode"], "max_tokens": chunking["max_tokens"]},
+        "dedup_threshold": dedup["threshold"] if dedup["enabled"] else None
+    }
+    replace_file(
+        os.path.join(index_path, "manifest.json"),
+        lambda f: f.write(json.dumps(manifest).encode("utf-8"))
+    )
+
+def write_faiss_index(index: faiss.Index, index_path: str) -> None:
+    """Save the FAISS index without disturbing servers that have it mapped"""
+    file_path = os.path.join(index_path, "faiss.index")
+    faiss.write_index(index, f"{file_path}.tmp")
+    os.replace(f"{file_path}.tmp", file_path)
+
+def remove_faiss_index(index_path: str) -> None:
+    """Drop the FAISS file an earlier non-flat build left behind"""
+    file_path = os.path.join(index_path, "faiss.index")
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+def vectors_dtype(index: Optional[faiss.Index]) -> type:
+    """float32 when vectors.npy is the index itself (flat), a float16 copy next to a FAISS index otherwise"""
+    return np.float32 if index is None else np.float16
+
+def write_index(index_path: str, vectors: np.ndarray, index: Optional[faiss.Index] = None) -> None:
+    """Save the row-ordered vectors, plus the FAISS index for types other than flat.
+
+    A flat index is only its float32 vectors.npy. Other types keep a
+    float16 copy next to the FAISS file even without --rescore: their
+    codes or graph can't give back the exact vectors, and the exact and
+    hybrid rankers (chosen per query) and incremental updates, which
+    carry unchanged rows into the next build, all read them. The copy is
+    memory-mapped, so it costs disk (2 bytes per dimension), not RAM.
+
+    The vectors go first for flat indexes and the FAISS file is removed
+    after, so a server reloading in between never pairs a missing FAISS
+    file with float16 vectors.
+    """
+    if index is not None:
+        write_faiss_index(index, index_path)
+    save_array(os.path.join(index_path, "vectors.npy"), np.asarray(vectors, dtype=vectors_dtype(index)))
+    if index is None:
+        remove_faiss_index(index_path)
+
+def read_faiss_index(index_path: str, vector_ids: Optional[np.ndarray] = None) -> Union[faiss.Index, MappedFlatIndex]:
+    """Read the saved index.
+
+    A flat index has no FAISS file; its vectors.npy is mapped instead, so
+    workers share those pages. vector_ids (row numbers by default) are the
+    ids of the mapped rows. FAISS files are read memory-mapped, which
+    faiss honours for IVF inverted lists; types it can't map are read
+    into this process's memory.
+    """
+    file_path = os.path.join(index_path, "faiss.index")
+    if os.path.exists(file_path):
+        try:
+            return faiss.read_index(file_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Not every index type supports mmap
+            return faiss.read_index(file_path)
+    return MappedFlatIndex(load_vectors(index_path), vector_ids)
+
+def load_vectors(index_path: str) -> Optional[np.ndarray]:
+    """Memory-map the stored vectors (float32 for flat indexes, float16 otherwise), if the index has them"""
+    vectors_path = os.path.join(index_path, "vectors.npy")
+    if not os.path.exists(vectors_path):
+        return None
+    return np.load(vectors_path, mmap_mode="r")
+
+def read_manifest(index_path: str) -> Dict[str, Any]:
+    """Read the build manifest, empty for indexes built without one"""
+    manifest_path = os.path.join(index_path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r") as f:
+        return json.load(f)
 
 def load_index(
     index_path: str
-) -> Tuple[faiss.Index, List[DocumentChunk]]:
+) -> Tuple[faiss.Index, ChunkStore]:
     """Load saved index and chunks"""
-    # Load FAISS index
-    index = faiss.read_index(os.path.join(index_path, "faiss.index"))
+    # Map the chunk store, nothing is decoded until a chunk is accessed
+    if chunk_store_exists(index_path):
+        chunks = open_chunk_store(index_path)
+        
+        # Load the index with its saved search parameters
+        index = read_faiss_index(index_path, chunks.rows["vector_id"])
+        manifest = read_manifest(index_path)
+        if "index_config" in manifest and not isinstance(index, MappedFlatIndex):
+            apply_search_params(index, IndexConfig(**manifest["index_config"]))
+        return index, chunks
     
-    # Load chunks
+    # Indexes built before the binary chunk store, always as a FAISS file
+    index = faiss.read_index(os.path.join(index_path, "faiss.index"))
     with open(os.path.join(index_path, "chunks.json"), "r") as f:
         chunks_data = json.load(f)
         chunks = [
@@ -86,12 +273,12 @@ def load_index(
             ) for c in chunks_data
         ]
     
-    return index, chunks
+    return index, build_chunk_store(chunks)
 
 def similarity_search(
     query: str,
     index: faiss.Index,
-    chunks: List[DocumentChunk],
+    chunks: Union[ChunkStore, List[DocumentChunk]],
     model: SentenceTransformer,
     k: int = 4
 ) -> List[Tuple[DocumentChunk, float]]:
@@ -106,6 +293,10 @@ def similarity_search(
     # Search
     scores, indices = index.search(query_embedding, k)
     
+    # Map FAISS ids to chunk rows (they differ once documents were updated)
+    if isinstance(chunks, ChunkStore):
+        indices = chunks.rows_for_ids(indices)
+    
     # Return chunks with scores
     results = [
         (chunks[int(idx)], float(score))  # Convert idx to int for list indexing
@@ -116,6 +307,37 @@ def similarity_search(
     return results
 
 if __name__ == "__main__":
-    text_folder = "./server/tmp/processed"
-    index_path = "./server/tmp/indexes"
-    create_faiss_index(text_folder, index_path)
+    import argparse
+    from server.utils.config import get_embedding_config
+    
+    parser = argparse.ArgumentParser(description="Build the FAISS index from processed documents")
+    parser.add_argument("--text-folder", default="./server/tmp/processed")
+    parser.add_argument("--index-path", default="./server/tmp/indexes")
+    parser.add_argument(
+        "--index-type",
+        choices=[t.value for t in IndexType],
+        default=IndexType.FLAT.value,
+        help="flat is exact; the others trade recall for speed on large corpora"
+    )
+    parser.add_argument("--nprobe", type=int, default=IndexConfig().nprobe)
+    parser.add_argument("--ef-search", type=int, default=IndexConfig().ef_search)
+    parser.add_argument(
+        "--rescore",
+        action="store_true",
+        help="Re-score candidates against the stored float16 vectors (for sq8, pq, ivf_pq)"
+    )
+    parser.add_argument("--embedding-cache", default=get_embedding_config()["cache_path"])
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Embed every chunk from scratch")
+    args = parser.parse_args()
+    
+    create_faiss_index(
+        args.text_folder,
+        args.index_path,
+        index_config=IndexConfig(
+            index_type=args.index_type,
+            nprobe=args.nprobe,
+            ef_search=args.ef_search,
+            rescore=args.rescore
+        ),
+        embedding_cache=None if args.no_embedding_cache else EmbeddingCache(args.embedding_cache)
+    )
@@ -0,0 +1,131 @@
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .chunk_store import replace_file, save_array
+
+# Term list, CSR offsets into the postings, (row, tf) postings sorted by
+# term then row, and the token count of every chunk row
+LEXICAL_INDEX_FILES = [
+    "lexical_terms.json",
+    "lexical_offsets.npy",
+    "lexical_postings.npy",
+    "lexical_lengths.npy"
+]
+
+POSTING_DTYPE = np.dtype([("row", np.int32), ("tf", np.uint16)])
+
+# Keeps tickers, form names and figures whole: "10-k", "form", "4", "3.5", "s&p"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.&'][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the "
+    "their there this to was were will with".split()
+)
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word, number and ticker tokens without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def write_lexical_index(index_path: str, texts: Iterable[str]) -> None:
+    """Build BM25 postings for chunk texts, in chunk row order"""
+    postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+    lengths = []
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings[term].append((row, min(tf, np.iinfo(np.uint16).max)))
+
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum([len(postings[term]) for term in terms], out=offsets[1:])
+    packed = np.zeros(int(offsets[-1]), dtype=POSTING_DTYPE)
+    for i, term in enumerate(terms):
+        packed[offsets[i]:offsets[i + 1]] = postings[term]
+
+    save_array(os.path.join(index_path, "lexical_offsets.npy"), offsets)
+    save_array(os.path.join(index_path, "lexical_postings.npy"), packed)
+    save_array(os.path.join(index_path, "lexical_lengths.npy"), np.asarray(lengths, dtype=np.int32))
+    replace_file(
+        os.path.join(index_path, "lexical_terms.json"),
+        lambda f: f.write(json.dumps(terms).encode("utf-8"))
+    )
+
+def lexical_index_exists(index_path: str) -> bool:
+    return all(os.path.exists(os.path.join(index_path, f)) for f in LEXICAL_INDEX_FILES)
+
+class LexicalIndex:
+    """BM25 over memory-mapped postings; scores are accumulated only for rows that match"""
+
+    def __init__(self, terms: List[str], offsets: np.ndarray, postings: np.ndarray, lengths: np.ndarray):
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.lengths = lengths
+        self.num_rows = len(lengths)
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    def search(self, query: str, k: int, row_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, rows) for a query, fewer when fewer rows match.
+
+        row_mask restricts the result to rows where it is True.
+        """
+        matched_rows = []
+        matched_scores = []
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            postings = self.postings[self.offsets[term_id]:self.offsets[term_id + 1]]
+            rows = postings["row"]
+            tf = postings["tf"].astype(np.float32)
+            df = len(postings)
+            idf = math.log(1 + (self.num_rows - df + 0.5) / (df + 0.5))
+            if row_mask is not None:
+                keep = row_mask[rows]
+                rows, tf = rows[keep], tf[keep]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[rows] / max(self.average_length, 1e-9))
+            matched_rows.append(rows)
+            matched_scores.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+        if not matched_rows:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+        rows, inverse = np.unique(np.concatenate(matched_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(matched_scores)).astype(np.float32)
+        top = np.argsort(-scores, kind="stable")[:k]
+        return scores[top], rows[top].astype(np.int64)
+
+def open_lexical_index(index_path: str) -> Optional[LexicalIndex]:
+    """Map a saved lexical index, None for indexes built without one"""
+    if not lexical_index_exists(index_path):
+        return None
+    with open(os.path.join(index_path, "lexical_terms.json"), "r") as f:
+        terms = json.load(f)
+    return LexicalIndex(
+        terms,
+        np.load(os.path.join(index_path, "lexical_offsets.npy"), mmap_mode="r"),
+        np.load(os.path.join(index_path, "lexical_postings.npy"), mmap_mode="r"),
+        np.load(os.path.join(index_path, "lexical_lengths.npy"), mmap_mode="r")
+    )
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int, rrf_k: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked row lists by summing 1 / (rrf_k + rank); returns top-k (scores, rows)"""
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            if row >= 0:
+                fused[int(row)] += 1.0 / (rrf_k + rank + 1)
+    ranked = sorted(fused.items(), key=lambda item: -item[1])[:k]
+    return (
+        np.array([score for _, score in ranked], dtype=np.float32),
+        np.array([row for row, _ in ranked], dtype=np.int64)
+    )
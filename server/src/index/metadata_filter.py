@@ -0,0 +1,127 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+import faiss
+from server.src.data_model import IndexConfig, IndexType, MetadataFilter
+from .chunk_store import ChunkStore, CHUNKING_STRATEGIES
+
+# Distinct filters whose row masks and selector bitmaps are kept per index
+FILTER_CACHE_SIZE = 64
+
+def normalize_date(date: str) -> str:
+    """Digits of a date, so PDF dates (D:20240115...) and ISO dates (2024-01-15) compare as strings"""
+    return re.sub(r"\D", "", date)[:14]
+
+def supports_selector(config: IndexConfig) -> bool:
+    """IndexPQ is the one index type FAISS cannot filter during search"""
+    return config.index_type != IndexType.PQ
+
+def search_parameters(config: IndexConfig, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """Search parameters carrying an id selector plus the saved nprobe / efSearch"""
+    if config.index_type in (IndexType.IVF_FLAT, IndexType.IVF_PQ):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=config.nprobe)
+    if config.index_type == IndexType.HNSW:
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=config.ef_search)
+    return faiss.SearchParameters(sel=selector)
+
+class FilterSelection:
+    """Rows allowed by one filter, as a row mask and as a FAISS bitmap over vector ids"""
+
+    def __init__(self, row_mask: np.ndarray, vector_ids: np.ndarray):
+        self.row_mask = row_mask
+        self.rows = np.flatnonzero(row_mask)
+        allowed_ids = np.asarray(vector_ids[self.rows], dtype=np.int64)
+        num_ids = int(vector_ids[-1]) + 1 if len(vector_ids) else 0
+        # Bit i is vector id i, little-endian within each byte as FAISS expects
+        bits = np.zeros(num_ids, dtype=bool)
+        bits[allowed_ids] = True
+        self.bitmap = np.packbits(bits, bitorder="little")
+        self.selector = faiss.IDSelectorBitmap(num_ids, faiss.swig_ptr(self.bitmap))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+class MetadataFilterIndex:
+    """Per-field masks precomputed from a chunk store.
+
+    Document-level fields (source file, title, author, date) are matched
+    against the small documents table and expanded to rows through the
+    doc_id column; chunking strategies have one row mask each. A row also
+    matches through any near-duplicate folded into it, so a document whose
+    boilerplate shares another document's vector can still be filtered to.
+    """
+
+    def __init__(self, chunks: ChunkStore):
+        self.chunks = chunks
+        self.doc_ids = np.asarray(chunks.rows["doc_id"])
+        self.vector_ids = np.asarray(chunks.rows["vector_id"], dtype=np.int64)
+        self.strategy_masks = {
+            strategy: np.asarray(chunks.rows["strategy"]) == i
+            for i, strategy in enumerate(CHUNKING_STRATEGIES)
+        }
+        self.duplicate_rows = np.asarray(chunks.duplicates["row"], dtype=np.int64)
+        self.duplicate_doc_ids = np.asarray(chunks.duplicates["doc_id"])
+        self.duplicate_strategies = np.asarray(chunks.duplicates["strategy"])
+        self.dates = [normalize_date(document.get("creation_date", "")) for document in chunks.documents]
+        self._cache: "OrderedDict[str, FilterSelection]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _document_mask(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        documents = self.chunks.documents
+        mask = np.ones(len(documents), dtype=bool)
+        fields: Dict[str, Optional[List[str]]] = {
+            "source_file": metadata_filter.source_files,
+            "title": metadata_filter.titles,
+            "author": metadata_filter.authors
+        }
+        for field, values in fields.items():
+            if values is not None:
+                allowed = set(values)
+                mask &= np.array([document[field] in allowed for document in documents], dtype=bool)
+
+        if metadata_filter.date_from:
+            date_from = normalize_date(metadata_filter.date_from)
+            mask &= np.array([bool(date) and date >= date_from for date in self.dates], dtype=bool)
+        if metadata_filter.date_to:
+            # A bare "2024" includes every date in 2024
+            date_to = normalize_date(metadata_filter.date_to)
+            mask &= np.array([bool(date) and date[:len(date_to)] <= date_to for date in self.dates], dtype=bool)
+        return mask
+
+    def select(self, metadata_filter: Optional[MetadataFilter]) -> Optional[FilterSelection]:
+        """Rows matching the filter, None when it restricts nothing"""
+        if metadata_filter is None or metadata_filter.is_empty():
+            return None
+
+        key = metadata_filter.model_dump_json()
+        with self._lock:
+            selection = self._cache.get(key)
+            if selection is not None:
+                self._cache.move_to_end(key)
+                return selection
+
+        document_mask = self._document_mask(metadata_filter)
+        row_mask = document_mask[self.doc_ids]
+        duplicate_mask = document_mask[self.duplicate_doc_ids]
+        if metadata_filter.chunking_strategies is not None:
+            strategy_mask = np.zeros(len(self.doc_ids), dtype=bool)
+            for strategy in metadata_filter.chunking_strategies:
+                if strategy in self.strategy_masks:
+                    strategy_mask |= self.strategy_masks[strategy]
+            row_mask &= strategy_mask
+            codes = [
+                CHUNKING_STRATEGIES.index(strategy)
+                for strategy in metadata_filter.chunking_strategies
+                if strategy in CHUNKING_STRATEGIES
+            ]
+            duplicate_mask &= np.isin(self.duplicate_strategies, codes)
+        row_mask[self.duplicate_rows[duplicate_mask]] = True
+
+        selection = FilterSelection(row_mask, self.vector_ids)
+        with self._lock:
+            self._cache[key] = selection
+            if len(self._cache) > FILTER_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return selection
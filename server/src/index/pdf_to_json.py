@@ -1,54 +1,290 @@
 import os
+import re
+import time
 import fitz  # PyMuPDF for reading PDFs
 import json
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from server.src.data_model import ExtractionStats
+from server.utils.config import get_extraction_config
+from .extraction_cache import ExtractionCache, compress_json, decompress_json
 
+# Files longer than this are split into page ranges across workers
+PAGES_PER_TASK = 50
 
-# Function to convert PDF to text and save as .txt files
-def convert_pdfs_to_text(pdf_folder, text_folder):
+# Processed documents are zstd-compressed or plain JSON
+PROCESSED_SUFFIXES = (".json.zst", ".json")
+
+# Applied in order, each in a single left-to-right pass
+CLEANING_REPLACEMENTS = [("\n\n", " "), ("  ", " ")]
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> Tuple[List[str], float]:
+    """Extract the text of each page in [start, end), returning it with the time taken"""
+    started = time.perf_counter()
+    with fitz.open(file_path) as doc:
+        pages = [doc[i].get_text() for i in range(start, end)]
+    return pages, time.perf_counter() - started
+
+
+def join_pages(pages: List[str]) -> Tuple[str, List[int]]:
+    """Concatenate page texts, with the character offset where each page starts plus the total length"""
+    offsets = [0]
+    for page in pages:
+        offsets.append(offsets[-1] + len(page))
+    # Join once instead of += per page, which is quadratic in page count
+    return "".join(pages), offsets
+
+
+def clean_text(text: str, page_offsets: Optional[List[int]] = None) -> Tuple[str, Optional[List[int]]]:
+    """Collapse blank lines and double spaces, moving page offsets along with the text.
+
+    Every match shortens the text by one character, so an offset moves
+    back by the number of matches ending at or before it; a page that
+    starts inside a collapsed pair starts after its replacement.
+    """
+    offsets = None if page_offsets is None else np.asarray(page_offsets, dtype=np.int64)
+    for old, new in CLEANING_REPLACEMENTS:
+        if offsets is not None:
+            ends = np.fromiter((match.end() for match in re.finditer(re.escape(old), text)), dtype=np.int64)
+            offsets = offsets - np.searchsorted(ends, offsets, side="right") * (len(old) - len(new))
+        text = text.replace(old, new)
+    return text, None if offsets is None else offsets.tolist()
+
+
+def page_ranges(num_pages: int, pages_per_task: int = PAGES_PER_TASK) -> List[Tuple[int, int]]:
+    """Split a document's pages into [start, end) ranges of at most pages_per_task"""
+    return [(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)] or [(0, 0)]
+
+
+def read_pdf_info(file_path: str) -> Tuple[int, Dict[str, str]]:
+    """Page count and metadata, without extracting any text"""
+    with fitz.open(file_path) as doc:
+        return doc.page_count, doc.metadata or {}
+
+
+def clean_document(
+    text: str,
+    pdf_metadata: Dict[str, str],
+    file_name: str,
+    page_offsets: Optional[List[int]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """Clean extracted text and pick out the metadata we keep, with page offsets into the cleaned text"""
+    # Add metadata extraction
+    metadata: Dict[str, Any] = {
+        "title": pdf_metadata.get("title", ""),
+        "author": pdf_metadata.get("author", ""),
+        "creation_date": pdf_metadata.get("creationDate", ""),
+        "source_file": file_name
+    }
+
+    # Add better text cleaning
+    text, page_offsets = clean_text(text, page_offsets)
+    if page_offsets is not None:
+        metadata["page_offsets"] = page_offsets
+    return text, metadata
+
+
+def extract_document(file_path: str, cache: Optional[ExtractionCache] = None) -> Tuple[str, Dict[str, Any]]:
+    """Extract and clean one PDF in this process, skipping the PDF when the cache has its bytes"""
+    digest = None
+    if cache is not None:
+        digest = cache.content_hash(file_path)
+        entry = cache.get(digest)
+        if entry is not None:
+            text, pdf_metadata, page_offsets = entry
+            return clean_document(text, pdf_metadata, os.path.basename(file_path), page_offsets)
+
+    num_pages, pdf_metadata = read_pdf_info(file_path)
+    pages, _ = extract_page_range(file_path, 0, num_pages)
+    text, page_offsets = join_pages(pages)
+    if cache is not None:
+        cache.put(digest, text, pdf_metadata, page_offsets)
+    return clean_document(text, pdf_metadata, os.path.basename(file_path), page_offsets)
+
+
+def is_processed_document(file_name: str) -> bool:
+    return file_name.endswith(PROCESSED_SUFFIXES)
+
+
+def write_processed_document(
+    text_folder: str,
+    file_name: str,
+    text: str,
+    metadata: Dict[str, Any],
+    compress: Optional[bool] = None
+) -> str:
+    """Save a cleaned document as <name>.json.zst (or plain <name>.json) and return the file name"""
+    config = get_extraction_config()
+    compress = config["compress"] if compress is None else compress
+    stem = os.path.splitext(file_name)[0]
+    output = {"text": text, "metadata": metadata}
+    if compress:
+        json_file_name, stale_name = stem + ".json.zst", stem + ".json"
+        data = compress_json(output, config["zstd_level"])
+    else:
+        json_file_name, stale_name = stem + ".json", stem + ".json.zst"
+        data = json.dumps(output).encode("utf-8")
+
+    with open(os.path.join(text_folder, json_file_name), "wb") as f:
+        f.write(data)
+    # A copy in the other format would be loaded as a second document
+    stale_path = os.path.join(text_folder, stale_name)
+    if os.path.exists(stale_path):
+        os.remove(stale_path)
+    return json_file_name
+
+
+def read_processed_document(path: str) -> Tuple[str, Dict[str, Any]]:
+    """Text and metadata of a processed document in either format"""
+    with open(path, "rb") as f:
+        data = f.read()
+    document = decompress_json(data) if path.endswith(".zst") else json.loads(data)
+    return document["text"], document["metadata"]
+
+
+def save_document(
+    text: str,
+    pdf_metadata: Dict[str, str],
+    file_name: str,
+    text_folder: str,
+    page_offsets: Optional[List[int]] = None
+) -> str:
+    """Clean extracted text and save it with its metadata"""
+    text, metadata = clean_document(text, pdf_metadata, file_name, page_offsets)
+    return write_processed_document(text_folder, file_name, text, metadata)
+
+
+# Function to convert PDF to text and save as .json files
+def convert_pdfs_to_text(
+    pdf_folder: str,
+    text_folder: str,
+    workers: Optional[int] = None,
+    pages_per_task: int = PAGES_PER_TASK,
+    cache: Optional[ExtractionCache] = None
+) -> List[ExtractionStats]:
+    """Extract every PDF in pdf_folder, spreading files and page ranges over a process pool.
+
+    workers=1 extracts in this process; None uses one worker per core.
+    With a cache, only PDFs whose bytes it has not seen are opened.
+    """
     # Create the folder for text files if it doesn't exist
     if not os.path.exists(text_folder):
         os.makedirs(text_folder)
 
-    # Loop through all the PDF files in the folder
-    for file_name in os.listdir(pdf_folder):
-        if file_name.endswith(".pdf"):
+    file_names = sorted(f for f in os.listdir(pdf_folder) if f.endswith(".pdf"))
+    started = time.perf_counter()
+    stats = []
+
+    # Look every file up first so the pool only gets PDFs that need extracting
+    cached: Dict[str, Tuple[Tuple[str, Dict[str, str], List[int]], float]] = {}
+    digests: Dict[str, bytes] = {}
+    if cache is not None:
+        for file_name in file_names:
+            lookup_started = time.perf_counter()
+            digest = cache.content_hash(os.path.join(pdf_folder, file_name))
+            entry = cache.get(digest)
+            if entry is None:
+                digests[file_name] = digest
+            else:
+                cached[file_name] = (entry, time.perf_counter() - lookup_started)
+
+    def finish(file_name: str, pages: List[str], pdf_metadata: Dict[str, str], seconds: float) -> None:
+        text, page_offsets = join_pages(pages)
+        if cache is not None:
+            cache.put(digests[file_name], text, pdf_metadata, page_offsets)
+        stats.append(_finish_file(text, pdf_metadata, file_name, text_folder, page_offsets, seconds))
+
+    def finish_cached(file_name: str) -> None:
+        (text, pdf_metadata, page_offsets), seconds = cached[file_name]
+        stats.append(_finish_file(text, pdf_metadata, file_name, text_folder, page_offsets, seconds, cached=True))
+
+    if workers == 1:
+        for file_name in file_names:
+            if file_name in cached:
+                finish_cached(file_name)
+                continue
             file_path = os.path.join(pdf_folder, file_name)
-            text_file_name = os.path.splitext(file_name)[0] + ".txt"
-            text_file_path = os.path.join(text_folder, text_file_name)
-
-            # Open PDF and extract text
-            with fitz.open(file_path) as doc:
-                text = ""
-                for page in doc:
-                    text += page.get_text()
-
-            # Add metadata extraction
-            metadata = {
-                "title": doc.metadata.get("title", ""),
-                "author": doc.metadata.get("author", ""),
-                "creation_date": doc.metadata.get("creationDate", ""),
-                "source_file": file_name
-            }
-
-            # Add better text cleaning
-            text = text.replace('\n\n', ' ').replace('  ', ' ')
-
-            # Save both text and metadata
-            output = {
-                "text": text,
-                "metadata": metadata
-            }
-
-            # Save as JSON to preserve metadata
-            with open(text_file_path.replace('.txt', '.json'), "w", encoding="utf-8") as f:
-                json.dump(output, f)
-            print(f"Converted {file_name} to {text_file_name}")
+            num_pages, pdf_metadata = read_pdf_info(file_path)
+            pages, seconds = extract_page_range(file_path, 0, num_pages)
+            finish(file_name, pages, pdf_metadata, seconds)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Submit every range up front so large files don't hold up the pool
+            pending = {}
+            for file_name in file_names:
+                if file_name in cached:
+                    continue
+                file_path = os.path.join(pdf_folder, file_name)
+                num_pages, pdf_metadata = read_pdf_info(file_path)
+                futures = [
+                    executor.submit(extract_page_range, file_path, start, end)
+                    for start, end in page_ranges(num_pages, pages_per_task)
+                ]
+                pending[file_name] = (pdf_metadata, futures)
+
+            for file_name in file_names:
+                if file_name in cached:
+                    finish_cached(file_name)
+                    continue
+                pdf_metadata, futures = pending[file_name]
+                results = [future.result() for future in futures]
+                pages = [page for part, _ in results for page in part]
+                seconds = sum(elapsed for _, elapsed in results)
+                finish(file_name, pages, pdf_metadata, seconds)
+
+    elapsed = time.perf_counter() - started
+    total_pages = sum(s.pages for s in stats)
+    print(f"Extracted {total_pages} pages from {len(stats)} PDFs in {elapsed:.1f}s "
+          f"({total_pages / max(elapsed, 1e-9):.1f} pages/s, {len(cached)} PDFs from cache)")
+    return stats
+
+
+def _finish_file(
+    text: str,
+    pdf_metadata: Dict[str, str],
+    file_name: str,
+    text_folder: str,
+    page_offsets: List[int],
+    seconds: float,
+    cached: bool = False
+) -> ExtractionStats:
+    json_file_name = save_document(text, pdf_metadata, file_name, text_folder, page_offsets)
+    num_pages = len(page_offsets) - 1
+    file_stats = ExtractionStats(
+        source_file=file_name,
+        pages=num_pages,
+        characters=len(text),
+        seconds=seconds,
+        pages_per_second=num_pages / max(seconds, 1e-9),
+        cached=cached
+    )
+    print(f"Converted {file_name} to {json_file_name} "
+          f"({num_pages} pages, {'from cache' if cached else f'{file_stats.pages_per_second:.1f} pages/s'})")
+    return file_stats
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract text and metadata from PDFs")
     # Specify the folder with your PDFs
-    pdf_folder = "./server/src/data/documents"
-    # Specify the folder where you want to save .txt files
-    text_folder = "./server/tmp/processed"
-    convert_pdfs_to_text(pdf_folder, text_folder)
-      
\ No newline at end of file
+    parser.add_argument("--pdf-folder", default="./server/src/data/documents")
+    # Specify the folder where you want to save .json files
+    parser.add_argument("--text-folder", default="./server/tmp/processed")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes, 1 to run serially")
+    parser.add_argument("--pages-per-task", type=int, default=PAGES_PER_TASK)
+    parser.add_argument("--extraction-cache", default=get_extraction_config()["cache_path"])
+    parser.add_argument("--no-extraction-cache", action="store_true", help="Re-extract every PDF")
+    args = parser.parse_args()
+
+    convert_pdfs_to_text(
+        args.pdf_folder,
+        args.text_folder,
+        args.workers,
+        args.pages_per_task,
+        None if args.no_extraction_cache else ExtractionCache(
+            args.extraction_cache, get_extraction_config()["zstd_level"]
+        )
+    )
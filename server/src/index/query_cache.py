@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from server.src.data_model import QueryCacheStats
+from server.utils.config import get_embedding_config
+from .batch_encoder import encode_batched
+from .embedding_cache import embedding_cache_id
+
+def lowercases_input(model: SentenceTransformer) -> bool:
+    """Whether the model's tokenizer lower-cases text, so case can't change an embedding"""
+    tokenizer = getattr(model, "tokenizer", None)
+    return bool(getattr(tokenizer, "do_lower_case", False))
+
+def normalize_query(query: str, lowercase: bool = False) -> str:
+    """Cache key for a query: whitespace collapsed, lower-cased only for uncased models"""
+    query = " ".join(query.split())
+    return query.lower() if lowercase else query
+
+class QueryEmbeddingCache:
+    """LRU of query embeddings, bounded by entry count and optionally by bytes"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key: Tuple[str, str], embedding: np.ndarray) -> None:
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)  # Shared between callers
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = embedding
+            self._bytes += embedding.nbytes
+
+            # Evict least recently used entries until within both limits
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> QueryCacheStats:
+        with self._lock:
+            total = self.hits + self.misses
+            return QueryCacheStats(
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+                hits=self.hits,
+                misses=self.misses,
+                hit_rate=self.hits / total if total else 0.0
+            )
+
+_config = get_embedding_config()
+query_cache = QueryEmbeddingCache(_config["query_cache_entries"], _config["query_cache_bytes"])
+
+def get_query_embeddings(
+    model: SentenceTransformer,
+    queries: List[str],
+    model_name: Optional[str] = None
+) -> np.ndarray:
+    """Embed queries with one encoder call for those not seen recently"""
+    model_id = embedding_cache_id(model_name)
+    lowercase = lowercases_input(model)
+    keys = [(model_id, normalize_query(query, lowercase)) for query in queries]
+
+    embeddings: List[Optional[np.ndarray]] = [query_cache.get(key) for key in keys]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        new_embeddings, _ = encode_batched(model, [queries[i] for i in missing])
+        for i, embedding in zip(missing, new_embeddings):
+            query_cache.put(keys[i], embedding)
+            embeddings[i] = embedding
+    return np.stack(embeddings)
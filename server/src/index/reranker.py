@@ -0,0 +1,77 @@
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sentence_transformers import CrossEncoder
+from server.utils.config import get_retrieval_config
+
+logger = logging.getLogger(__name__)
+
+# none: return the first-stage ranking; exact: re-score vector candidates
+# against the stored float16 vectors; cross_encoder: score (query, chunk) pairs
+RERANKERS = ["none", "exact", "cross_encoder"]
+
+# Resident cross-encoders keyed by model name
+_cross_encoders: Dict[str, CrossEncoder] = {}
+_cross_encoder_lock = threading.Lock()
+
+def get_cross_encoder(model_name: Optional[str] = None) -> CrossEncoder:
+    """Get a resident cross-encoder, loading it on first use"""
+    config = get_retrieval_config()
+    model_name = model_name or config["cross_encoder"]
+
+    model = _cross_encoders.get(model_name)
+    if model is not None:
+        return model
+
+    with _cross_encoder_lock:
+        if model_name not in _cross_encoders:
+            start_time = time.time()
+            _cross_encoders[model_name] = CrossEncoder(
+                model_name,
+                max_length=config["rerank_max_length"],
+                device="cpu"
+            )
+            logger.info(f"Loaded cross-encoder {model_name} in {time.time() - start_time:.2f}s")
+        return _cross_encoders[model_name]
+
+def register_cross_encoder(model: CrossEncoder, model_name: Optional[str] = None) -> None:
+    """Register an already constructed cross-encoder"""
+    with _cross_encoder_lock:
+        _cross_encoders[model_name or get_retrieval_config()["cross_encoder"]] = model
+
+def clear_cross_encoders() -> None:
+    with _cross_encoder_lock:
+        _cross_encoders.clear()
+
+def cross_encoder_rerank(
+    queries: List[str],
+    candidates: List[Tuple[np.ndarray, List[str]]],
+    k: List[int],
+    model_name: Optional[str] = None
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Re-rank (rows, texts) candidates of several queries with one batched cross-encoder call.
+
+    Returns the top-k (scores, rows) of each query; scores are the
+    cross-encoder's relevance as predict returns it, a probability in
+    (0, 1) for single-label models, which apply a sigmoid themselves.
+    """
+    pairs = [(query, text) for query, (_, texts) in zip(queries, candidates) for text in texts]
+    if not pairs:
+        return [(np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)) for _ in queries]
+
+    model = get_cross_encoder(model_name)
+    all_scores = np.asarray(
+        model.predict(pairs, batch_size=get_retrieval_config()["rerank_batch_size"]),
+        dtype=np.float32
+    ).reshape(-1)
+
+    results = []
+    start = 0
+    for (rows, texts), query_k in zip(candidates, k):
+        scores = all_scores[start:start + len(texts)]
+        start += len(texts)
+        order = np.argsort(-scores, kind="stable")[:query_k]
+        results.append((scores[order], np.asarray(rows, dtype=np.int64)[order]))
+    return results
@@ -0,0 +1,352 @@
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+import numpy as np
+from server.src.data_model import MetadataFilter, RetrievalBatcherStats, RetrievalStageStats, RetrievalTimings
+from server.utils.config import get_retrieval_config
+from server.src.executors import run_blocking
+from .chunk_store import ChunkStore
+from .embedding_registry import get_embedding_model
+from .index_cache import LoadedIndex, get_loaded_index
+from .lexical_index import reciprocal_rank_fusion
+from .query_cache import get_query_embeddings, query_cache
+from .reranker import RERANKERS, cross_encoder_rerank
+from .search import rescore_candidates, search_index
+
+logger = logging.getLogger(__name__)
+
+class RetrievalResult(NamedTuple):
+    """Top-k chunk rows for one query, with the chunk store they index into"""
+    scores: np.ndarray
+    rows: np.ndarray
+    chunks: ChunkStore
+    timings: Optional[RetrievalTimings] = None  # Stage times of the batch this query ran in
+
+class RetrievalRequest(NamedTuple):
+    query: str
+    index_path: str
+    k: int
+    metadata_filter: Optional[MetadataFilter] = None
+
+def embed_queries(queries: List[str]) -> np.ndarray:
+    """Embed queries with one encoder call for those not in the query cache"""
+    return get_query_embeddings(get_embedding_model(), queries)
+
+def hybrid_rank(
+    loaded: LoadedIndex,
+    query: str,
+    embedding: np.ndarray,
+    vector_rows: np.ndarray,
+    k: int,
+    candidates: int,
+    rrf_k: int,
+    row_mask: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse vector and BM25 rankings of one query with reciprocal rank fusion.
+
+    Rows come back in fused order, scored by their exact cosine similarity
+    so callers see the same kind of score as a vector-only search.
+    """
+    _, lexical_rows = loaded.lexical.search(query, candidates, row_mask)
+    _, rows = reciprocal_rank_fusion([vector_rows, lexical_rows], k, rrf_k)
+    scores = np.asarray(loaded.vectors[rows], dtype=np.float32) @ embedding.astype(np.float32)
+    return scores, rows
+
+class StageTimings:
+    """Running totals of per-stage retrieval time"""
+
+    STAGES = ["embed_ms", "search_ms", "fusion_ms", "rerank_ms", "total_ms"]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.totals = dict.fromkeys(self.STAGES, 0.0)
+
+    def add(self, timings: RetrievalTimings) -> None:
+        with self._lock:
+            self.batches += 1
+            for stage in self.STAGES:
+                self.totals[stage] += getattr(timings, stage)
+
+    def stats(self) -> RetrievalStageStats:
+        with self._lock:
+            batches = max(self.batches, 1)
+            return RetrievalStageStats(
+                batches=self.batches,
+                **{stage: total / batches for stage, total in self.totals.items()}
+            )
+
+stage_timings = StageTimings()
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+def retrieve_batch(
+    requests: List[RetrievalRequest],
+    return_exceptions: bool = False
+) -> List[Union[RetrievalResult, Exception]]:
+    """Embed a batch of queries together and run one multi-row search per index and filter.
+
+    With a reranker configured the search pulls RETRIEVAL_CANDIDATES rows
+    per query from the (possibly approximate or compressed) index; exact
+    re-scores them against the stored vectors before fusion, and
+    cross_encoder scores the fused candidates of the whole batch in one call.
+    An error in one index or filter group is raised, or with
+    return_exceptions put in place of the results of that group's queries
+    only, as asyncio.gather does.
+    """
+    config = get_retrieval_config()
+    reranker = config["rerank"]
+    if reranker not in RERANKERS:
+        raise ValueError(f"Unknown reranker '{reranker}', expected one of {RERANKERS}")
+
+    requests = [RetrievalRequest(*request) for request in requests]
+    started = time.perf_counter()
+    embeddings = embed_queries([request.query for request in requests])
+    embed_ms = _elapsed_ms(started)
+    search_ms = fusion_ms = rerank_ms = 0.0
+
+    # Queries with the same filter share one FAISS selector
+    groups: Dict[Tuple[str, Optional[str]], List[int]] = defaultdict(list)
+    for i, request in enumerate(requests):
+        filter_key = request.metadata_filter.model_dump_json() if request.metadata_filter else None
+        groups[(request.index_path, filter_key)].append(i)
+
+    results: List[Union[None, RetrievalResult, Exception]] = [None] * len(requests)
+    width = 0
+    for (index_path, _), positions in groups.items():
+        try:
+            loaded = get_loaded_index(index_path)
+            selection = loaded.filters.select(requests[positions[0]].metadata_filter) if loaded.filters else None
+            row_mask = selection.row_mask if selection is not None else None
+            k = max(requests[i].k for i in positions)
+            hybrid = config["hybrid"] and loaded.lexical is not None and loaded.vectors is not None
+            width = k
+            if hybrid:
+                width = max(width, config["hybrid_candidates"])
+            if reranker != "none":
+                width = max(width, config["candidates"])
+
+            stage_start = time.perf_counter()
+            scores, rows = search_index(
+                loaded.index,
+                embeddings[positions],
+                width,
+                config=loaded.config,
+                vectors=loaded.vectors,
+                chunks=loaded.chunks,
+                selection=selection
+            )
+            search_ms += _elapsed_ms(stage_start)
+
+            if reranker == "exact" and loaded.vectors is not None:
+                stage_start = time.perf_counter()
+                scores, rows = rescore_candidates(loaded.vectors, embeddings[positions], rows, width)
+                rerank_ms += _elapsed_ms(stage_start)
+
+            stage_start = time.perf_counter()
+            for row, i in enumerate(positions):
+                query, request_k = requests[i].query, requests[i].k
+                # The cross-encoder needs the whole candidate list, not just the top k
+                keep = width if reranker == "cross_encoder" else request_k
+                if hybrid:
+                    results[i] = RetrievalResult(
+                        *hybrid_rank(
+                            loaded,
+                            query,
+                            embeddings[i],
+                            rows[row],
+                            keep,
+                            config["hybrid_candidates"],
+                            config["rrf_k"],
+                            row_mask
+                        ),
+                        loaded.chunks
+                    )
+                else:
+                    results[i] = RetrievalResult(scores[row, :keep], rows[row, :keep], loaded.chunks)
+            fusion_ms += _elapsed_ms(stage_start)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            logger.error(f"Retrieval from {index_path} failed: {str(e)}")
+            for i in positions:
+                results[i] = e
+
+    if reranker == "cross_encoder":
+        stage_start = time.perf_counter()
+        candidates = []
+        # Queries of failed groups are left out of the cross-encoder call
+        ok = [i for i, result in enumerate(results) if isinstance(result, RetrievalResult)]
+        for i in ok:
+            rows = results[i].rows[results[i].rows >= 0]
+            candidates.append((rows, [results[i].chunks.get_text(int(row)) for row in rows]))
+        reranked = cross_encoder_rerank(
+            [requests[i].query for i in ok],
+            candidates,
+            [requests[i].k for i in ok]
+        )
+        for i, (scores, rows) in zip(ok, reranked):
+            results[i] = RetrievalResult(scores, rows, results[i].chunks)
+        rerank_ms += _elapsed_ms(stage_start)
+
+    timings = RetrievalTimings(
+        queries=len(requests),
+        reranker=reranker,
+        candidates=width,
+        embed_ms=embed_ms,
+        search_ms=search_ms,
+        fusion_ms=fusion_ms,
+        rerank_ms=rerank_ms,
+        total_ms=_elapsed_ms(started)
+    )
+    stage_timings.add(timings)
+    logger.debug(
+        f"Retrieved {len(requests)} queries: embed {embed_ms:.1f} ms, search {search_ms:.1f} ms, "
+        f"fusion {fusion_ms:.1f} ms, rerank ({reranker}) {rerank_ms:.1f} ms"
+    )
+    return [
+        result._replace(timings=timings) if isinstance(result, RetrievalResult) else result
+        for result in results
+    ]
+
+class _Pending(NamedTuple):
+    request: RetrievalRequest
+    future: asyncio.Future
+
+class RetrievalBatcher:
+    """Collects concurrent queries for a few milliseconds and serves them with one encode and search"""
+
+    def __init__(self, max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: "asyncio.Queue[_Pending]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self.queries = 0
+        self.batches = 0
+
+    async def search(
+        self,
+        query: str,
+        index_path: str,
+        k: int,
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> RetrievalResult:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Pending(RetrievalRequest(query, index_path, k, metadata_filter), future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return await future
+
+    async def _collect(self) -> List[_Pending]:
+        batch = [self._queue.get_nowait()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        # Exits once the queue is empty; the next search starts a new worker
+        while not self._queue.empty():
+            batch = await self._collect()
+            self.queries += len(batch)
+            self.batches += 1
+            try:
+                # Queries arriving while this batch runs form the next one
+                results = await run_blocking("retrieval", retrieve_batch, [p.request for p in batch], True)
+            except Exception as e:
+                # Embedding the batch failed, which affects every query in it
+                logger.error(f"Batched retrieval failed: {str(e)}")
+                results = [e] * len(batch)
+            for pending, result in zip(batch, results):
+                if pending.future.done():
+                    continue
+                if isinstance(result, Exception):
+                    pending.future.set_exception(result)
+                else:
+                    pending.future.set_result(result)
+
+    def stats(self) -> RetrievalBatcherStats:
+        return RetrievalBatcherStats(
+            queries=self.queries,
+            batches=self.batches,
+            mean_batch_size=self.queries / self.batches if self.batches else 0.0,
+            max_batch_size=self.max_batch_size,
+            max_wait_ms=self.max_wait_ms
+        )
+
+# asyncio queues belong to one event loop, so each loop gets its own batcher
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, RetrievalBatcher]" = weakref.WeakKeyDictionary()
+
+def get_retrieval_batcher() -> RetrievalBatcher:
+    """The batcher for the running event loop"""
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        config = get_retrieval_config()
+        batcher = RetrievalBatcher(config["batch_size"], config["batch_wait_ms"])
+        _batchers[loop] = batcher
+    return batcher
+
+async def retrieve(
+    query: str,
+    index_path: str,
+    k: int,
+    metadata_filter: Optional[MetadataFilter] = None
+) -> RetrievalResult:
+    """Retrieve top-k rows for one query, micro-batched with concurrent callers when enabled"""
+    if get_retrieval_config()["batching"]:
+        return await get_retrieval_batcher().search(query, index_path, k, metadata_filter)
+    results = await run_blocking("retrieval", retrieve_batch, [RetrievalRequest(query, index_path, k, metadata_filter)])
+    return results[0]
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare batched and per-query retrieval under concurrent load")
+    parser.add_argument("--index-path", default="./server/tmp/indexes")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    queries = [f"question {i} about revenue, options and interest rates" for i in range(args.concurrency)]
+
+    async def timed(fn, query: str) -> float:
+        start = time.perf_counter()
+        await fn(query)
+        return time.perf_counter() - start
+
+    async def run(fn) -> Tuple[float, float]:
+        latencies = []
+        start = time.perf_counter()
+        for round_number in range(args.rounds):
+            query_cache.clear()
+            latencies += await asyncio.gather(*(timed(fn, f"{q} {round_number}") for q in queries))
+        return len(latencies) / (time.perf_counter() - start), float(np.median(latencies)) * 1000
+
+    async def main() -> None:
+        get_loaded_index(args.index_path)
+        get_embedding_model()
+        batcher = get_retrieval_batcher()
+
+        single_qps, single_p50 = await run(
+            lambda q: run_blocking("retrieval", retrieve_batch, [(q, args.index_path, 7)])
+        )
+        batched_qps, batched_p50 = await run(lambda q: batcher.search(q, args.index_path, 7))
+        print(f"Per query: {single_qps:.1f} queries/s, p50 {single_p50:.1f} ms")
+        print(f"Batched:   {batched_qps:.1f} queries/s, p50 {batched_p50:.1f} ms, "
+              f"mean batch {batcher.stats().mean_batch_size:.1f}")
+
+    asyncio.run(main())
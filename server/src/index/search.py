@@ -0,0 +1,75 @@
+from typing import Optional, Tuple, Union
+import numpy as np
+import faiss
+from server.src.data_model import IndexConfig
+from .chunk_store import ChunkStore
+from .index_factory import MappedFlatIndex
+from .metadata_filter import FilterSelection, search_parameters, supports_selector
+
+def rescore_candidates(
+    vectors: np.ndarray,
+    query_embeddings: np.ndarray,
+    candidate_ids: np.ndarray,
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Re-rank candidate ids by exact inner product with the stored vectors.
+
+    vectors is usually the memory-mapped vectors.npy, so only the
+    candidate rows are read from disk.
+    """
+    num_queries = len(query_embeddings)
+    scores = np.full((num_queries, k), -np.inf, dtype=np.float32)
+    ids = np.full((num_queries, k), -1, dtype=np.int64)
+
+    for i in range(num_queries):
+        # Sorted ids keep the reads from the mapped file sequential
+        candidates = np.unique(candidate_ids[i][candidate_ids[i] >= 0])
+        if len(candidates) == 0:
+            continue
+        exact = np.asarray(vectors[candidates], dtype=np.float32) @ query_embeddings[i]
+        order = np.argsort(-exact)[:k]
+        scores[i, :len(order)] = exact[order]
+        ids[i, :len(order)] = candidates[order]
+
+    return scores, ids
+
+def search_index(
+    index: Union[faiss.Index, MappedFlatIndex],
+    query_embeddings: np.ndarray,
+    k: int,
+    config: Optional[IndexConfig] = None,
+    vectors: Optional[np.ndarray] = None,
+    chunks: Optional[ChunkStore] = None,
+    selection: Optional[FilterSelection] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Search the index, re-scoring a wider candidate list exactly when configured.
+
+    With chunks given, the FAISS ids are mapped to chunk store rows and
+    rows are returned; vectors is indexed by row. A selection restricts
+    the search to its rows inside FAISS, so filtering costs no extra recall.
+    """
+    query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+    config = config or IndexConfig()
+    rescore = config.rescore and vectors is not None
+
+    num_results = k * config.rescore_factor if rescore else k
+    if isinstance(index, MappedFlatIndex):
+        # Scored straight from the mapped vectors, a selection just narrows the rows
+        scores, ids = index.search(query_embeddings, num_results, None if selection is None else selection.rows)
+    else:
+        params = None
+        if selection is not None:
+            if not supports_selector(config):
+                if vectors is None:
+                    raise ValueError(f"Filtered search on {config.index_type.value} needs the stored vectors")
+                # IndexPQ cannot apply a selector, score the allowed rows exactly instead
+                allowed = np.broadcast_to(selection.rows, (len(query_embeddings), len(selection.rows)))
+                return rescore_candidates(vectors, query_embeddings, allowed, k)
+            params = search_parameters(config, selection.selector)
+        scores, ids = index.search(query_embeddings, num_results, params=params)
+    if chunks is not None:
+        ids = chunks.rows_for_ids(ids)
+
+    if not rescore:
+        return scores, ids
+    return rescore_candidates(vectors, query_embeddings, ids, k)
@@ -1,13 +1,40 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from server.src.web_app import create_web_app
 from server.src.ollama_llm import create_ollama_llm
 from server.src.groq_llm import create_groq_llm
+from server.src.index.embedding_registry import preload_embedding_models, get_embedding_model_stats
+from server.src.index.query_cache import query_cache
+from server.src.index.retrieval_batcher import get_retrieval_batcher, stage_timings
+from server.src.index.reranker import get_cross_encoder
+from server.src.index.index_cache import get_index_cache_stats
+from server.src.index.collections import DEFAULT_COLLECTION, collection_exists, collection_path, list_collections
+from server.src.tools.pdf_tools import get_pdf_page
+from server.src.executors import run_blocking, get_executor_stats, shutdown_executors
+from server.utils.config import get_embedding_config, get_retrieval_config
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load shared resources once at startup"""
+    if get_embedding_config()["preload"]:
+        try:
+            await run_blocking("retrieval", preload_embedding_models)
+        except Exception as e:
+            # Queries will retry the load on first use
+            logger.error(f"Failed to preload embedding model: {str(e)}")
+        if get_retrieval_config()["rerank"] == "cross_encoder":
+            try:
+                await run_blocking("retrieval", get_cross_encoder)
+            except Exception as e:
+                logger.error(f"Failed to preload cross-encoder: {str(e)}")
+    yield
+    shutdown_executors()
+
 def create_server() -> FastAPI:
     """Create the FastAPI server with all routes configured"""
     
@@ -15,7 +42,8 @@ def create_server() -> FastAPI:
     server = FastAPI(
         title="Investor Agent Server",
         description="Central server for LLM-powered investment analysis",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan
     )
 
     # Add CORS middleware
@@ -47,9 +75,30 @@ def create_server() -> FastAPI:
             "models": {
                 "ollama": os.getenv("OLLAMA_MODEL", "llama3.2:3b"),
                 "groq": os.getenv("GROQ_MODEL_NAME", "deepseek-r1-distill-llama-70b")
-            }
+            },
+            "embedding_models": [stats.model_dump() for stats in get_embedding_model_stats()],
+            "collections": list_collections(),
+            "index_cache": get_index_cache_stats().model_dump(),
+            "query_cache": query_cache.stats().model_dump(),
+            "retrieval_batcher": get_retrieval_batcher().stats().model_dump(),
+            "retrieval_stages": stage_timings.stats().model_dump(),
+            "executors": [stats.model_dump() for stats in get_executor_stats()]
         }
 
+    @server.get("/pdf/page")
+    async def pdf_page(source_file: str, page: int, collection: str = DEFAULT_COLLECTION):
+        """Text of one page of an indexed PDF, for checking a cited source"""
+        try:
+            exists = collection_exists(collection)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not exists:
+            raise HTTPException(status_code=404, detail=f"No index built for collection '{collection}'")
+        result = await get_pdf_page(source_file, page, collection_path(collection))
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"Page {page} of '{source_file}' not found")
+        return result.model_dump()
+
     return server
 
 # Create the server instance
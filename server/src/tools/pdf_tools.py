@@ -1,10 +1,13 @@
+import asyncio
 import logging
-from typing import Optional, List
+from typing import Optional, List, Union
 import faiss
 from sentence_transformers import SentenceTransformer
-from server.src.data_model import PDFContext, PDFAgentResponse
-from server.src.index.json_to_index import load_index
-import numpy as np
+from server.src.data_model import PDFContext, PDFAgentResponse, PDFPage, MetadataFilter
+from server.src.executors import run_blocking
+from server.src.index.embedding_registry import get_embedding_model
+from server.src.index.index_cache import get_cached_index
+from server.src.index.retrieval_batcher import retrieve
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +15,10 @@ logger = logging.getLogger(__name__)
 logging.getLogger('sentence_transformers').setLevel(logging.WARNING)
 logging.getLogger('faiss').setLevel(logging.WARNING)
 
-def initialize_embeddings(model_name: str = 'all-MiniLM-L6-v2', device: str = 'mps') -> SentenceTransformer:
-    """Initialize the embedding model"""
+def initialize_embeddings(model_name: Optional[str] = None, device: Optional[str] = None) -> SentenceTransformer:
+    """Get the shared embedding model from the process-wide registry"""
     try:
-        return SentenceTransformer(f'sentence-transformers/{model_name}', device=device)
+        return get_embedding_model(model_name, device=device)
     except Exception as e:
         logger.error(f"Failed to initialize embedding model: {str(e)}")
         raise
@@ -44,56 +47,59 @@ def create_pdf_context(
         similarity_score=similarity_score
     )
 
-async def get_relevant_chunks(query: str, index_path: str) -> List[PDFContext]:
-    """Get relevant chunks from FAISS index"""
+async def get_relevant_chunks(
+    query: str,
+    index_path: Union[str, List[str]],
+    metadata_filter: Optional[MetadataFilter] = None
+) -> List[PDFContext]:
+    """Get relevant chunks from one FAISS index or the merged top-k of several,
+    only from chunks matching metadata_filter if given"""
     try:
         # Validate query
         if not query or query.isspace():
             logger.warning("Empty or whitespace-only query received")
             return []
             
-        embedding_model = initialize_embeddings()
-        
-        # Load both index and chunks
-        index, chunks = load_index(index_path)
-        
-        # Generate query embedding
-        query_embedding = embedding_model.encode([query])[0]
-        
-        # Search FAISS index
+        # Concurrent queries share one encode and one multi-row search, so
+        # fanning out to several collections embeds the query once
         k = 7  # Number of chunks to retrieve
-        distances, indices = index.search(query_embedding.reshape(1, -1), k)
-        
-        # Convert distances to similarity scores
-        # Using exponential normalization for better score distribution
-        scores = [float(np.exp(-d)) for d in distances[0]]
-        
-        # Sort chunks by score
-        chunk_scores = list(zip(indices[0], scores))
-        chunk_scores.sort(key=lambda x: x[1], reverse=True)
+        index_paths = [index_path] if isinstance(index_path, str) else index_path
+        results = await asyncio.gather(*(retrieve(query, path, k, metadata_filter) for path in index_paths))
+        if results and results[0].timings is not None:
+            t = results[0].timings
+            logger.info(
+                f"Retrieval stages ({t.reranker}, {t.candidates} candidates): embed {t.embed_ms:.1f} ms, "
+                f"search {t.search_ms:.1f} ms, fusion {t.fusion_ms:.1f} ms, rerank {t.rerank_ms:.1f} ms"
+            )
         
-        # Create PDFContext objects using the actual chunks
-        pdf_chunks = []
-        for i, (idx, score) in enumerate(chunk_scores):
-            chunk = chunks[int(idx)]
-            pdf_chunks.append(PDFContext(
-                text=chunk.text,
-                source_file=chunk.metadata.source_file,
-                chunk_id=chunk.metadata.chunk_id,
-                total_chunks=chunk.metadata.total_chunks,
-                similarity_score=score
-            ))
+        # Each result is in the retriever's final order (fused, re-ranked or
+        # by similarity), so collections are merged rank by rank with the
+        # score only breaking ties; FAISS pads with -1 when an index holds
+        # fewer than k vectors
+        hits = [
+            (rank, float(score), int(idx), result.chunks)
+            for result in results
+            for rank, (score, idx) in enumerate(zip(result.scores, result.rows))
+            if idx >= 0
+        ]
+        hits.sort(key=lambda x: (x[0], -x[1]))
+        hits = hits[:k]
         
-        return pdf_chunks
+        # Build PDFContext objects for the hits only, best first
+        return [chunks.get_pdf_context(idx, score) for _, score, idx, chunks in hits]
         
     except Exception as e:
         logger.error(f"Error retrieving chunks: {str(e)}")
         return []
 
-async def get_pdf_context(query: str, index_path: str) -> Optional[PDFAgentResponse]:
+async def get_pdf_context(
+    query: str,
+    index_path: Union[str, List[str]],
+    metadata_filter: Optional[MetadataFilter] = None
+) -> Optional[PDFAgentResponse]:
     """Factory function to get PDF context"""
     try:
-        relevant_chunks = await get_relevant_chunks(query, index_path)
+        relevant_chunks = await get_relevant_chunks(query, index_path, metadata_filter)
         
         if not relevant_chunks:
             logger.warning(f"No relevant chunks found for query: {query}")
@@ -107,3 +113,28 @@ async def get_pdf_context(query: str, index_path: str) -> Optional[PDFAgentRespo
     except Exception as e:
         logger.error(f"Error creating PDF agent response: {str(e)}")
         return None
+
+def _find_pdf_page(source_file: str, page: int, index_paths: List[str]) -> Optional[PDFPage]:
+    for path in index_paths:
+        _, chunks = get_cached_index(path)
+        doc_id = chunks.find_document(source_file)
+        if doc_id is None or not chunks.page_count(doc_id):
+            continue
+        if not 1 <= page <= chunks.page_count(doc_id):
+            return None
+        return PDFPage(
+            source_file=source_file,
+            page=page,
+            num_pages=chunks.page_count(doc_id),
+            text=chunks.get_page_text(doc_id, page)
+        )
+    return None
+
+async def get_pdf_page(
+    source_file: str,
+    page: int,
+    index_path: Union[str, List[str]]
+) -> Optional[PDFPage]:
+    """Text of one page of an indexed PDF, None if the document, its page offsets or the page are missing"""
+    index_paths = [index_path] if isinstance(index_path, str) else index_path
+    return await run_blocking("retrieval", _find_pdf_page, source_file, page, index_paths)
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 import requests
 from server.src.data_model import SearchResult, WebAgentResponse, webAgentFn
 from server.utils.config import get_serper_config
+from server.src.executors import run_blocking
 
 def create_web_search() -> webAgentFn:
     """Factory function that creates a web search function using Serper API"""
@@ -38,7 +39,10 @@ def create_web_search() -> webAgentFn:
             return cache[cache_key]
             
         try:
-            response = requests.post(
+            # requests blocks, so the call runs in the I/O pool
+            response = await run_blocking(
+                "io",
+                requests.post,
                 base_url,
                 headers={'X-API-KEY': api_key, 'Content-Type': 'application/json'},
                 json={'q': query, 'num': 10}  # Get 10 results for better filtering
@@ -0,0 +1,48 @@
+import json
+import tempfile
+import pytest
+from pathlib import Path
+from server.src.index.index_cache import invalidate_index_cache
+from server.src.index.embedding_registry import register_embedding_model, clear_embedding_models
+from server.src.index.query_cache import query_cache
+from server.src.index.reranker import clear_cross_encoders
+from server.tests.mocks.mock_embeddings import MockEmbeddingModel
+
+@pytest.fixture
+def mock_model():
+    """Serve the deterministic mock from the embedding registry"""
+    model = MockEmbeddingModel()
+    register_embedding_model(model)
+    query_cache.clear()
+    yield model
+    # Drop everything built or cached with the mock so tests stay independent
+    clear_embedding_models()
+    clear_cross_encoders()
+    invalidate_index_cache()
+    query_cache.clear()
+
+@pytest.fixture
+def tmp_dir():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield Path(tmp_dir)
+
+@pytest.fixture
+def test_dirs(tmp_dir):
+    """Create temporary directories with one processed document"""
+    processed_dir = tmp_dir / "processed"
+    index_dir = tmp_dir / "indexes"
+    processed_dir.mkdir()
+
+    sample_data = {
+        "text": "Sample text for testing vector stores",
+        "metadata": {
+            "title": "Test",
+            "author": "Test",
+            "creation_date": "2024",
+            "source_file": "test.pdf"
+        }
+    }
+    with open(processed_dir / "test.json", "w") as f:
+        json.dump(sample_data, f)
+
+    yield str(processed_dir), str(index_dir)
@@ -0,0 +1,23 @@
+import re
+from typing import List, Tuple
+import numpy as np
+
+class MockCrossEncoder:
+    """Scores (query, text) pairs by shared word count, standing in for CrossEncoder.
+
+    Like a single-label CrossEncoder, predict returns sigmoid-activated
+    relevance in (0, 1) rather than logits.
+    """
+
+    def __init__(self):
+        self.predict_calls = 0
+        self.scored_pairs = 0
+
+    def predict(self, pairs: List[Tuple[str, str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        self.predict_calls += 1
+        self.scored_pairs += len(pairs)
+        shared = np.array([
+            len(set(re.findall(r"\w+", query.lower())) & set(re.findall(r"\w+", text.lower())))
+            for query, text in pairs
+        ], dtype=np.float32)
+        return 1 / (1 + np.exp(-shared))
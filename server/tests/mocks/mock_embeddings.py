@@ -0,0 +1,53 @@
+import re
+import hashlib
+from typing import List, Union
+import numpy as np
+import torch
+
+class MockEmbeddingModel:
+    """Deterministic bag-of-words embedder standing in for SentenceTransformer"""
+
+    def __init__(self, dimension: int = 384, max_seq_length: int = 256):
+        self.dimension = dimension
+        self.max_seq_length = max_seq_length
+        self.encode_calls = 0
+        self.encoded_texts = 0
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def parameters(self) -> List[torch.Tensor]:
+        return []
+
+    def buffers(self) -> List[torch.Tensor]:
+        return []
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        convert_to_tensor: bool = False,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self.encode_calls += 1
+        self.encoded_texts += len(texts)
+
+        embeddings = np.stack([self._embed(t) for t in texts]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            return torch.from_numpy(embeddings)
+        return embeddings
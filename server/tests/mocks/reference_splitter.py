@@ -0,0 +1,35 @@
+from typing import List, Optional, Tuple
+from server.src.index.document_processor import BOUNDARY_WINDOW, DEFAULT_SEPARATORS
+
+def reference_split_offsets(
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    separators: Optional[List[str]] = None
+) -> List[Tuple[int, int]]:
+    """The splitter as first written, kept as an oracle for RecursiveTextSplitter"""
+    separators = separators or DEFAULT_SEPARATORS
+    if len(text) <= chunk_size:
+        return [(0, len(text))]
+    spans = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end >= len(text):
+            spans.append((start, len(text)))
+            break
+        best_end = end
+        for sep in separators:
+            window_start = max(start, end - BOUNDARY_WINDOW)
+            window_end = min(len(text), end + BOUNDARY_WINDOW)
+            last_sep = text.rfind(sep, window_start, window_end)
+            if last_sep != -1 and last_sep > start:
+                best_end = last_sep + len(sep)
+                break
+        segment = text[start:best_end]
+        stripped = segment.strip()
+        if stripped:
+            chunk_start = start + len(segment) - len(segment.lstrip())
+            spans.append((chunk_start, chunk_start + len(stripped)))
+        start = best_end - chunk_overlap
+    return spans
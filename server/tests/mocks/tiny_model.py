@@ -0,0 +1,35 @@
+import os
+import torch
+from transformers import BertConfig, BertModel, BertTokenizerFast
+from sentence_transformers import SentenceTransformer, models
+
+VOCAB = [
+    "[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]",
+    "the", "a", "of", "how", "do", "what", "is", "revenue", "cash", "flow", "balance",
+    "sheet", "interest", "rate", "options", "put", "call", "dividend", "growth", "report", "market"
+]
+
+def save_tiny_sentence_transformer(path: str, seed: int = 0, lower_case: bool = True) -> str:
+    """Save a small randomly initialised BERT sentence model (uncased unless lower_case is off), so backends can be tested offline"""
+    hf_path = os.path.join(path, "hf")
+    os.makedirs(hf_path, exist_ok=True)
+    with open(os.path.join(hf_path, "vocab.txt"), "w") as f:
+        f.write("\n".join(VOCAB))
+
+    torch.manual_seed(seed)
+    config = BertConfig(
+        vocab_size=len(VOCAB),
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        intermediate_size=128,
+        max_position_embeddings=64
+    )
+    BertModel(config).save_pretrained(hf_path)
+    BertTokenizerFast(os.path.join(hf_path, "vocab.txt"), do_lower_case=lower_case).save_pretrained(hf_path)
+
+    transformer = models.Transformer(hf_path, max_seq_length=64)
+    model = SentenceTransformer(modules=[transformer, models.Pooling(64), models.Normalize()])
+    model_path = os.path.join(path, "model")
+    model.save(model_path)
+    return model_path
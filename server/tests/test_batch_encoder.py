@@ -0,0 +1,39 @@
+import numpy as np
+from server.src.index.batch_encoder import encode_batched, length_batches
+from server.tests.mocks.mock_embeddings import MockEmbeddingModel
+
+TEXTS = [
+    "short",
+    "a considerably longer chunk of text about quarterly revenue and margins",
+    "mid length text on cash flow",
+    "tiny",
+    "another fairly long passage describing the balance sheet in detail",
+]
+
+def test_batches_group_similar_lengths():
+    lengths = np.array([len(t) for t in TEXTS])
+    batches = length_batches(lengths, batch_size=2)
+
+    assert sorted(np.concatenate(batches).tolist()) == list(range(len(TEXTS)))
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert set(batches[0].tolist()) == {1, 4}
+
+def test_token_budget_packs_short_texts():
+    lengths = np.array([100, 10, 10, 10, 10])
+    batches = length_batches(lengths, batch_size=8, max_batch_tokens=40)
+    assert [len(b) for b in batches] == [1, 4]
+
+def test_encode_restores_input_order():
+    model = MockEmbeddingModel()
+    embeddings, stats = encode_batched(model, TEXTS, batch_size=2)
+
+    assert np.allclose(embeddings, model.encode(TEXTS))
+    assert stats.chunks == len(TEXTS) and stats.batches == 3
+    assert stats.chunks_per_second > 0
+    assert stats.padding_ratio >= 1.0
+
+def test_encode_empty():
+    model = MockEmbeddingModel()
+    embeddings, stats = encode_batched(model, [])
+    assert embeddings.shape == (0, model.dimension)
+    assert stats.chunks == 0
@@ -0,0 +1,205 @@
+import io
+import tempfile
+import numpy as np
+import pytest
+from server.src.data_model import DocumentChunk, ChunkMetadata, PDFContext
+from server.src.index.document_processor import process_document
+from server.src.index.chunk_store import (
+    ChunkStore,
+    ChunkStoreWriter,
+    encode_chunks,
+    write_chunk_store,
+    open_chunk_store,
+    build_chunk_store,
+    chunk_store_exists
+)
+
+def make_chunk(
+    text: str,
+    chunk_id: int,
+    total_chunks: int,
+    source_file: str = "options.pdf",
+    strategy: str = "regular"
+) -> DocumentChunk:
+    return DocumentChunk(
+        text=text,
+        metadata=ChunkMetadata(
+            title="Options Guide",
+            author="CME",
+            creation_date="2024-01-01",
+            source_file=source_file,
+            chunk_id=chunk_id,
+            total_chunks=total_chunks,
+            chunk_size=len(text),
+            chunking_strategy=strategy
+        )
+    )
+
+@pytest.fixture
+def index_dir():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+def test_round_trip(index_dir):
+    """Chunks read back from the mapped store match what was written"""
+    chunks = [
+        make_chunk("A call gives the right to buy.", 0, 3),
+        make_chunk("Prix d'exercice – strike price €", 1, 3),
+        make_chunk("", 2, 3)
+    ]
+    write_chunk_store(index_dir, chunks)
+
+    assert chunk_store_exists(index_dir)
+    store = open_chunk_store(index_dir)
+    assert len(store) == 3
+    assert list(store) == chunks
+    assert store[-1] == chunks[2]
+    assert store.get_text(1) == "Prix d'exercice – strike price €"
+
+def test_out_of_range(index_dir):
+    write_chunk_store(index_dir, [make_chunk("only", 0, 1)])
+    store = open_chunk_store(index_dir)
+
+    with pytest.raises(IndexError):
+        store[1]
+
+def test_empty_store(index_dir):
+    write_chunk_store(index_dir, [])
+    store = open_chunk_store(index_dir)
+
+    assert len(store) == 0
+    assert list(store) == []
+
+def test_documents_stored_once():
+    """Document fields are shared by all chunks of a document"""
+    chunks = [
+        make_chunk("first", 0, 2),
+        make_chunk("second", 1, 2),
+        make_chunk("balance sheet", 0, 1, source_file="financials.pdf", strategy="dense")
+    ]
+    store = build_chunk_store(chunks)
+
+    assert len(store.documents) == 2
+    assert list(store.rows["doc_id"]) == [0, 0, 1]
+    assert store.get_metadata(2) == chunks[2].metadata
+
+def test_pdf_context_for_hit():
+    store = build_chunk_store([make_chunk("first", 0, 2), make_chunk("second", 1, 2)])
+    context = store.get_pdf_context(1, 0.5)
+
+    assert context == PDFContext(
+        text="second",
+        source_file="options.pdf",
+        chunk_id=1,
+        total_chunks=2,
+        similarity_score=0.5
+    )
+
+def test_overlapping_chunks_share_document_text():
+    """Overlapping chunks are offsets into one copy of the document"""
+    text = ("Covered calls – écrire une option d'achat. " * 40 + "\n\n") * 5
+    metadata = {
+        "title": "Options Guide",
+        "author": "CME",
+        "creation_date": "2024-01-01",
+        "source_file": "options.pdf"
+    }
+    chunks = process_document(text, metadata)
+    assert len(chunks) > 1
+
+    store = build_chunk_store(chunks, {"options.pdf": text})
+
+    assert len(store.texts) == len(text.encode("utf-8"))
+    assert store.get_document_text(0) == text
+    assert list(store) == chunks
+
+def test_page_ranges_for_chunks(index_dir):
+    """Page numbers and page text come from offsets stored with the document text"""
+    pages = ["Prime – première page. ", "Second page on strikes. ", "Third page €."]
+    text = "".join(pages)
+    page_offsets = [0, len(pages[0]), len(pages[0]) + len(pages[1]), len(text)]
+    spans = [(0, 10), (20, 40), (page_offsets[2], len(text))]
+    chunks = []
+    for chunk_id, (start, end) in enumerate(spans):
+        chunk = make_chunk(text[start:end], chunk_id, 3)
+        chunk.metadata.start_index, chunk.metadata.end_index = start, end
+        chunks.append(chunk)
+    chunks.append(make_chunk("no pages", 0, 1, source_file="plain.pdf"))
+    write_chunk_store(
+        index_dir,
+        chunks,
+        {"options.pdf": text, "plain.pdf": "no pages"},
+        document_pages={"options.pdf": page_offsets}
+    )
+    store = open_chunk_store(index_dir)
+
+    assert [store.get_pages(i) for i in range(4)] == [(1, 1), (1, 2), (3, 3), None]
+    context = store.get_pdf_context(1, 0.5)
+    assert (context.page_start, context.page_end) == (1, 2)
+    assert store.page_count(0) == 3
+    assert [store.get_page_text(0, page) for page in (1, 2, 3)] == pages
+    assert store.get_page_offsets(0) == page_offsets
+    with pytest.raises(IndexError):
+        store.get_page_text(0, 4)
+
+    plain = store.find_document("plain.pdf")
+    assert store.page_count(plain) == 0
+    assert store.get_page_offsets(plain) is None
+    with pytest.raises(ValueError):
+        store.get_page_text(plain, 1)
+
+def test_offsets_of_interleaved_documents():
+    """Chunks and duplicates of several non-ASCII documents may arrive out of document order"""
+    texts = {
+        "options.pdf": "Prix d'exercice – strike € " * 20,
+        "futures.pdf": "Échéance – expiry ¥ " * 20
+    }
+    chunks = []
+    for source_file, text in texts.items():
+        for chunk_id, start in enumerate(range(0, len(text), 100)):
+            chunk = make_chunk(text[start:start + 100], chunk_id, len(range(0, len(text), 100)), source_file)
+            chunk.metadata.start_index, chunk.metadata.end_index = start, min(start + 100, len(text))
+            chunks.append(chunk)
+    # Every other chunk is folded into row 0, after chunks of the second document were written
+    unique, folded = chunks[::2], chunks[1::2]
+    store = ChunkStore(*encode_chunks(unique, texts, duplicates=[(0, chunk) for chunk in folded]))
+
+    assert list(store) == unique
+    assert [store.get_duplicate(j) for j in range(len(folded))] == folded
+
+def test_copy_stored_rows():
+    """Kept documents, rows and duplicates carry over byte for byte, without the dropped document"""
+    pages = ["Prime – première page. ", "Second page on strikes €."]
+    text = "".join(pages)
+    kept = []
+    for chunk_id, (start, end) in enumerate([(0, 12), (10, len(text))]):
+        chunk = make_chunk(text[start:end], chunk_id, 2)
+        chunk.metadata.start_index, chunk.metadata.end_index = start, end
+        kept.append(chunk)
+    dropped = make_chunk("dropped filing", 0, 1, source_file="dropped.pdf")
+    # No document text stored, so this chunk keeps its own copy
+    loose = make_chunk("standalone note ¥", 0, 1, source_file="note.pdf")
+    folded = make_chunk("Prime – première", 0, 1, source_file="copy.pdf")
+    store = ChunkStore(*encode_chunks(
+        [kept[0], dropped, kept[1], loose],
+        {"options.pdf": text, "dropped.pdf": "dropped filing", "copy.pdf": "Prime – première"},
+        document_pages={"options.pdf": [0, len(pages[0]), len(text)]},
+        duplicates=[(0, folded)]
+    ))
+
+    buffer = io.BytesIO()
+    writer = ChunkStoreWriter(buffer)
+    doc_ids = [store.find_document(source) for source in ["options.pdf", "note.pdf", "copy.pdf"]]
+    writer.add_stored(store, doc_ids, np.array([0, 2, 3]), np.array([0]), np.array([0]))
+    new_chunk = make_chunk("première", 2, 3)
+    new_chunk.metadata.start_index, new_chunk.metadata.end_index = 8, 16
+    writer.add_chunk(new_chunk, 7, text)
+    copy = ChunkStore(buffer.getvalue(), writer.rows.copy(), writer.documents, writer.duplicates, writer.pages)
+
+    assert list(copy) == [kept[0], kept[1], loose, new_chunk]
+    assert list(copy.rows["vector_id"]) == [0, 2, 3, 7]
+    assert copy.get_duplicate(0) == folded and list(copy.duplicate_indices(0)) == [0]
+    assert [copy.get_page_text(0, page) for page in (1, 2)] == pages
+    assert copy.get_pages(1) == (1, 2)
+    # The new chunk points into the copied document text instead of a second copy of it
+    assert len(copy.documents) == 3 and copy.rows["doc_id"][3] == 0
@@ -0,0 +1,93 @@
+import json
+import tempfile
+import pytest
+from pathlib import Path
+from server.src.index.json_to_index import create_faiss_index
+from server.src.index.index_cache import get_loaded_index, get_index_cache_stats, invalidate_index_cache
+from server.src.index.collections import (
+    DEFAULT_COLLECTION,
+    collection_path,
+    list_collections,
+    resolve_collections
+)
+from server.src.agents.pdf_agent import create_pdf_agent
+from server.src.tools.pdf_tools import get_relevant_chunks
+
+COLLECTIONS = {
+    "options": ["A call option gives the right to buy.", "A put option gives the right to sell."],
+    "filings": ["The 10-K is the annual report.", "The 10-Q is the quarterly report."],
+    "macro": ["Inflation slowed in the euro area.", "Employment stayed strong."]
+}
+
+@pytest.fixture
+def collections_root(mock_model, monkeypatch):
+    """One built index per collection under a temporary COLLECTIONS_ROOT"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        monkeypatch.setenv("COLLECTIONS_ROOT", str(Path(tmp_dir) / "collections"))
+        monkeypatch.setenv("INDEX_PATH", str(Path(tmp_dir) / "indexes"))
+        for name, texts in COLLECTIONS.items():
+            processed = Path(tmp_dir) / "processed" / name
+            processed.mkdir(parents=True)
+            for i, text in enumerate(texts):
+                with open(processed / f"{name}_{i}.json", "w") as f:
+                    json.dump({
+                        "text": text,
+                        "metadata": {"title": name, "author": "A", "creation_date": "2024", "source_file": f"{name}_{i}.pdf"}
+                    }, f)
+            create_faiss_index(str(processed), collection_path(name))
+        yield tmp_dir
+
+def test_collections_are_discovered(collections_root):
+    assert list_collections() == ["filings", "macro", "options"]
+    assert resolve_collections(["options"]) == [collection_path("options")]
+    assert resolve_collections(["all"]) == [collection_path(name) for name in ["filings", "macro", "options"]]
+    # The default collection is the original INDEX_PATH corpus
+    assert collection_path(DEFAULT_COLLECTION).endswith("indexes")
+
+def test_unknown_and_invalid_collections(collections_root):
+    with pytest.raises(ValueError):
+        resolve_collections(["research"])
+    with pytest.raises(ValueError):
+        collection_path("../options")
+
+def test_least_recently_used_index_is_evicted(collections_root, monkeypatch):
+    invalidate_index_cache()
+    get_loaded_index(collection_path("options"))
+    one_index = get_index_cache_stats().resident_bytes
+    monkeypatch.setenv("INDEX_MEMORY_BUDGET_MB", str(2.5 * one_index / 1024 / 1024))
+
+    get_loaded_index(collection_path("filings"))
+    get_loaded_index(collection_path("options"))  # Now most recently used
+    get_loaded_index(collection_path("macro"))
+
+    stats = get_index_cache_stats()
+    assert [Path(path).name for path in stats.resident] == ["options", "macro"]
+    assert stats.evictions == 1
+    assert stats.resident_bytes <= stats.budget_bytes
+
+    # An evicted collection loads again on next use
+    loads = stats.loads
+    get_loaded_index(collection_path("filings"))
+    assert get_index_cache_stats().loads == loads + 1
+
+@pytest.mark.asyncio
+async def test_fan_out_merges_top_k(collections_root):
+    paths = resolve_collections(["options", "filings", "macro"])
+    chunks = await get_relevant_chunks("the quarterly 10-Q report", paths)
+
+    assert len(chunks) == 6
+    sources = {chunk.source_file for chunk in chunks}
+    assert {"options_0.pdf", "filings_1.pdf", "macro_0.pdf"} <= sources
+
+    single = await get_relevant_chunks("the quarterly 10-Q report", paths[1])
+    assert {chunk.source_file for chunk in single} == {"filings_0.pdf", "filings_1.pdf"}
+
+@pytest.mark.asyncio
+async def test_pdf_agent_queries_configured_collections(collections_root, monkeypatch):
+    monkeypatch.setenv("PDF_COLLECTIONS", "filings")
+    response = await create_pdf_agent()("what is the 10-K")
+    assert response is not None
+    assert {chunk.source_file for chunk in response.relevant_chunks} == {"filings_0.pdf", "filings_1.pdf"}
+
+    response = await create_pdf_agent(["macro", "options"])("inflation")
+    assert {chunk.source_file.split("_")[0] for chunk in response.relevant_chunks} == {"macro", "options"}
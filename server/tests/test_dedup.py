@@ -0,0 +1,168 @@
+import json
+import tempfile
+import pytest
+from pathlib import Path
+from server.src.data_model import DocumentChunk, ChunkMetadata, MetadataFilter
+from server.src.index.dedup import NearDuplicateIndex, estimated_similarity, fold_duplicates, minhash_signatures
+from server.src.index.json_to_index import create_faiss_index, load_index, read_manifest
+from server.src.index.incremental import update_faiss_index
+from server.src.index.metadata_filter import MetadataFilterIndex
+from server.src.index.index_cache import invalidate_index_cache
+
+DISCLAIMER = (
+    "This report contains forward-looking statements within the meaning of the Private Securities "
+    "Litigation Reform Act. Actual results may differ materially from those projected due to market "
+    "conditions, competition, regulatory changes and other risks described in our filings with the "
+    "Securities and Exchange Commission. We undertake no obligation to update these statements. "
+    "Report date: {date}."
+)
+
+@pytest.fixture
+def processed_dir():
+    """Three copies of the same disclaimer with different dates, and one unrelated document"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processed = Path(tmp_dir) / "processed"
+        processed.mkdir()
+        for i, date in enumerate(["March 2024", "June 2024", "September 2024"]):
+            write_document(processed, f"disclaimer_{i}", DISCLAIMER.format(date=date))
+        write_document(processed, "results", "Quarterly revenue grew twelve percent on strong cloud demand.")
+        yield processed
+
+def write_document(processed: Path, name: str, text: str) -> None:
+    with open(processed / f"{name}.json", "w") as f:
+        json.dump({
+            "text": text,
+            "metadata": {"title": name, "author": "A", "creation_date": "2024", "source_file": f"{name}.pdf"}
+        }, f)
+
+def make_chunk(text: str, source_file: str) -> DocumentChunk:
+    return DocumentChunk(
+        text=text,
+        metadata=ChunkMetadata(
+            title="t",
+            author="a",
+            creation_date="2024",
+            source_file=source_file,
+            chunk_id=0,
+            total_chunks=1,
+            chunk_size=len(text),
+            chunking_strategy="regular"
+        )
+    )
+
+def test_signatures_estimate_similarity():
+    signatures = minhash_signatures([
+        DISCLAIMER.format(date="March 2024"),
+        DISCLAIMER.format(date="June 2024"),
+        "Quarterly revenue grew twelve percent on strong cloud demand.",
+        ""
+    ])
+    assert estimated_similarity(signatures[0], signatures[1]) > 0.9
+    assert estimated_similarity(signatures[0], signatures[2]) < 0.2
+    # Empty text matches nothing, not even other empty text
+    assert (signatures[3] == signatures[3].max()).all()
+
+def test_fold_keeps_first_occurrence():
+    chunks = [
+        make_chunk(DISCLAIMER.format(date="March 2024"), "a.pdf"),
+        make_chunk("Operating margin widened on lower input costs.", "a.pdf"),
+        make_chunk(DISCLAIMER.format(date="June 2024"), "b.pdf"),
+        make_chunk("", "b.pdf"),
+        make_chunk("", "c.pdf")
+    ]
+    signatures = minhash_signatures([chunk.text for chunk in chunks])
+    unique, duplicates = fold_duplicates(chunks, signatures, NearDuplicateIndex())
+
+    assert unique == [0, 1, 3, 4]
+    assert [(row, chunk.metadata.source_file) for row, chunk in duplicates] == [(0, "b.pdf")]
+
+def test_fold_numbers_rows_after_existing_ones():
+    chunks = [
+        make_chunk(DISCLAIMER.format(date="March 2024"), "a.pdf"),
+        make_chunk(DISCLAIMER.format(date="June 2024"), "b.pdf")
+    ]
+    unique, duplicates = fold_duplicates(chunks, minhash_signatures([c.text for c in chunks]), NearDuplicateIndex(), 7)
+
+    assert unique == [0]
+    assert [(row, chunk.metadata.source_file) for row, chunk in duplicates] == [(7, "b.pdf")]
+
+def test_bounded_index_forgets_least_recently_matched():
+    disclaimer, other, third = minhash_signatures([
+        DISCLAIMER.format(date="March 2024"),
+        "Operating margin widened on lower input costs.",
+        "Quarterly revenue grew twelve percent on strong cloud demand."
+    ])
+    repeat = minhash_signatures([DISCLAIMER.format(date="June 2024")])[0]
+    index = NearDuplicateIndex(max_signatures=2)
+    assert index.add(0, disclaimer) is None
+    assert index.add(1, other) is None
+    # Matching the disclaimer keeps it, so the third chunk pushes out the other one
+    assert index.add(2, repeat) == 0
+    assert index.add(3, third) is None
+    assert len(index) == 2
+    # A forgotten chunk becomes a representative again, pushing out the disclaimer in turn
+    assert index.add(4, other) is None
+    assert index.add(5, repeat) is None
+    assert len(index) == 2
+
+def test_build_folds_duplicates_into_one_vector(mock_model, processed_dir, tmp_path):
+    index_dir = str(tmp_path / "index")
+    create_faiss_index(str(processed_dir), index_dir)
+    index, chunks = load_index(index_dir)
+
+    assert index.ntotal == len(chunks) == read_manifest(index_dir)["num_chunks"] == 2
+    assert mock_model.encoded_texts == 2
+    assert len(chunks.duplicates) == 2
+    assert len(chunks.documents) == 4
+
+    row = next(i for i in range(len(chunks)) if "forward-looking" in chunks.get_text(i))
+    context = chunks.get_pdf_context(row, 1.0)
+    sources = sorted([context.source_file, *context.duplicate_sources])
+    assert sources == ["disclaimer_0.pdf", "disclaimer_1.pdf", "disclaimer_2.pdf"]
+    # Folded chunks keep their own text
+    texts = [chunks.get_text(row)] + [chunks.get_duplicate(int(j)).text for j in chunks.duplicate_indices(row)]
+    assert all(any(date in text for text in texts) for date in ["March", "June", "September"])
+
+    # Filtering to a document whose chunk was folded still reaches the shared row
+    selection = MetadataFilterIndex(chunks).select(MetadataFilter(source_files=["disclaimer_2.pdf"]))
+    assert list(selection.rows) == [row]
+
+def test_dedup_can_be_disabled(mock_model, processed_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("CHUNK_DEDUP", "false")
+    index_dir = str(tmp_path / "index")
+    create_faiss_index(str(processed_dir), index_dir)
+    _, chunks = load_index(index_dir)
+
+    assert len(chunks) == 4
+    assert len(chunks.duplicates) == 0
+    assert read_manifest(index_dir)["dedup_threshold"] is None
+
+def test_incremental_update_keeps_provenance(mock_model, processed_dir, tmp_path):
+    index_dir = str(tmp_path / "index")
+    create_faiss_index(str(processed_dir), index_dir)
+
+    # A new copy of the disclaimer shares the existing vector instead of being embedded
+    write_document(processed_dir, "disclaimer_3", DISCLAIMER.format(date="December 2024"))
+    encoded_before = mock_model.encoded_texts
+    update_faiss_index(str(processed_dir), index_dir)
+    _, chunks = load_index(index_dir)
+    assert mock_model.encoded_texts == encoded_before
+    assert len(chunks) == 2
+    assert len(chunks.duplicates) == 3
+
+    # Deleting the document that owned the vector re-embeds one surviving copy for the rest
+    row = next(i for i in range(len(chunks)) if "forward-looking" in chunks.get_text(i))
+    owner = chunks.get_metadata(row).source_file
+    (processed_dir / owner.replace(".pdf", ".json")).unlink()
+    encoded_before = mock_model.encoded_texts
+    update_faiss_index(str(processed_dir), index_dir)
+    invalidate_index_cache()
+    _, chunks = load_index(index_dir)
+    assert mock_model.encoded_texts - encoded_before == 1
+    assert len(chunks) == 2
+    assert len(chunks.duplicates) == 2
+    row = next(i for i in range(len(chunks)) if "forward-looking" in chunks.get_text(i))
+    context = chunks.get_pdf_context(row, 1.0)
+    assert sorted([context.source_file, *context.duplicate_sources]) == sorted(
+        f"disclaimer_{i}.pdf" for i in range(4) if f"disclaimer_{i}.pdf" != owner
+    )
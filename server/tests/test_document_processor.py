@@ -0,0 +1,132 @@
+import random
+import tempfile
+import pytest
+from sentence_transformers import SentenceTransformer
+from server.src.index.embedding_registry import register_embedding_model, clear_embedding_models
+from server.src.index.document_processor import (
+    RecursiveTextSplitter,
+    TokenTextSplitter,
+    clear_token_splitters,
+    is_dense_content,
+    process_document
+)
+from server.tests.mocks.mock_embeddings import MockEmbeddingModel
+from server.tests.mocks.reference_splitter import reference_split_offsets
+from server.tests.mocks.tiny_model import save_tiny_sentence_transformer
+
+PIECES = [
+    "Revenue rose 12% to $4.1 billion", "Net income:", "Item 7.", "Risk factors!", "Why?",
+    "\n\n", "\n", "\n\n\n", " ", "   ", "\t", " ", " ", "; ", ". ", "...",
+    "Balance Sheet", "café", "€", "𝔘nicode", "x" * 150, "y" * 1200
+]
+
+def random_text(seed: int, pieces: int) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(PIECES) + rng.choice(["", " "]) for _ in range(pieces))
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(1000, 200), (800, 400), (200, 50), (300, 150)])
+@pytest.mark.parametrize("seed", range(8))
+def test_matches_original_splitter(chunk_size, chunk_overlap, seed):
+    text = random_text(seed, 2000)
+    splitter = RecursiveTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    assert splitter.split_text_with_offsets(text) == reference_split_offsets(text, chunk_size, chunk_overlap)
+
+def test_matches_original_with_custom_separators():
+    text = random_text(42, 3000)
+    separators = ["\n\n", "...", "; ", " "]
+    splitter = RecursiveTextSplitter(chunk_size=500, chunk_overlap=100, separators=separators)
+    assert splitter.split_text_with_offsets(text) == reference_split_offsets(text, 500, 100, separators)
+
+def test_dense_detection_matches_lowercase_search():
+    for text in ["The BALANCE sheet", "income Statement follows", "balance  sheet", "no terms here", ""]:
+        expected = any(t in text.lower() for t in ["financial statement", "balance sheet", "income statement"])
+        assert is_dense_content(text) == expected
+
+def test_process_document_strategy_and_offsets():
+    text = random_text(7, 1000) + " Consolidated Balance Sheet"
+    chunks = process_document(text, {"title": "T", "author": "A", "creation_date": "2024", "source_file": "t.pdf"})
+    assert all(chunk.metadata.chunking_strategy == "dense" for chunk in chunks)
+    assert all(text[c.metadata.start_index:c.metadata.end_index] == c.text for c in chunks)
+
+@pytest.fixture(scope="module")
+def tiny_model_path():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield save_tiny_sentence_transformer(tmp_dir)
+
+@pytest.fixture
+def token_chunking(tiny_model_path, monkeypatch):
+    """Token chunking against a tiny offline model with a 64-token limit"""
+    monkeypatch.setenv("CHUNKING_MODE", "tokens")
+    monkeypatch.setenv("CHUNK_OVERLAP_TOKENS", "8")
+    model = SentenceTransformer(tiny_model_path, device="cpu")
+    register_embedding_model(model, tiny_model_path)
+    yield model
+    clear_embedding_models()
+    clear_token_splitters()
+
+FILING = (
+    "The revenue of the cash flow report. What is a put option? Balance sheet growth of the market!\n\n"
+    "Interest rate options, the dividend report; call options: growth. "
+) * 30
+
+def token_count(model, text: str) -> int:
+    return len(model.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+def test_token_chunks_fit_model_budget(token_chunking, tiny_model_path):
+    model = token_chunking
+    chunks = process_document(FILING, {"title": "T", "author": "A", "creation_date": "2024", "source_file": "t.pdf"},
+                              tiny_model_path)
+
+    budget = model.max_seq_length - model.tokenizer.num_special_tokens_to_add()
+    assert len(chunks) > 1
+    assert all(token_count(model, c.text) <= budget for c in chunks)
+    assert all(c.metadata.chunking_strategy == "tokens" for c in chunks)
+    assert all(FILING[c.metadata.start_index:c.metadata.end_index] == c.text for c in chunks)
+    # Chunks end on sentence ends and overlap their neighbours
+    assert all(c.text[-1] in ".!?;:" for c in chunks[:-1])
+    assert all(chunks[i + 1].metadata.start_index < chunks[i].metadata.end_index for i in range(len(chunks) - 1))
+
+def test_token_splitter_cuts_long_words_at_budget(token_chunking):
+    splitter = TokenTextSplitter(token_chunking.tokenizer, max_tokens=10, overlap_tokens=2)
+    text = " ".join(["revenue"] * 35)
+    spans = splitter.split_text_with_offsets(text)
+    assert all(token_count(token_chunking, text[s:e]) <= 10 for s, e in spans)
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+
+def test_short_and_empty_text(token_chunking):
+    splitter = TokenTextSplitter(token_chunking.tokenizer, max_tokens=10)
+    assert splitter.split_text_with_offsets("  cash flow  ") == [(2, 11)]
+    assert splitter.split_text_with_offsets("") == [(0, 0)]
+
+def test_token_chunking_needs_a_tokenizer(monkeypatch):
+    monkeypatch.setenv("CHUNKING_MODE", "tokens")
+    register_embedding_model(MockEmbeddingModel())
+    try:
+        with pytest.raises(ValueError):
+            process_document("text", {"title": "T", "author": "A", "creation_date": "2024", "source_file": "t.pdf"})
+    finally:
+        clear_embedding_models()
+        clear_token_splitters()
+
+def test_changed_chunking_rebuilds_index(token_chunking, tiny_model_path, monkeypatch):
+    from pathlib import Path
+    import json
+    from server.src.index.json_to_index import create_faiss_index
+    from server.src.index.incremental import update_faiss_index
+    from server.src.index.chunk_store import open_chunk_store
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processed = Path(tmp_dir) / "processed"
+        processed.mkdir()
+        with open(processed / "filing.json", "w") as f:
+            json.dump({"text": FILING, "metadata": {"title": "T", "author": "A", "creation_date": "2024", "source_file": "t.pdf"}}, f)
+        index_path = str(Path(tmp_dir) / "index")
+
+        monkeypatch.setenv("CHUNKING_MODE", "characters")
+        create_faiss_index(str(processed), index_path, tiny_model_path)
+        assert {c.metadata.chunking_strategy for c in open_chunk_store(index_path)} == {"dense"}
+
+        # Unchanged documents are re-split when the chunking mode changes
+        monkeypatch.setenv("CHUNKING_MODE", "tokens")
+        update_faiss_index(str(processed), index_path, tiny_model_path)
+        assert {c.metadata.chunking_strategy for c in open_chunk_store(index_path)} == {"tokens"}
@@ -0,0 +1,92 @@
+import tempfile
+import importlib.util
+import pytest
+import torch
+from server.src.index import embedding_registry
+from server.src.index.embedding_registry import (
+    get_embedding_model,
+    get_embedding_model_stats,
+    clear_embedding_models,
+    resolve_model_key
+)
+from server.src.index.backend_benchmark import benchmark_backends, cosine_agreement
+from server.tests.mocks.tiny_model import save_tiny_sentence_transformer
+
+TEXTS = [
+    "how do options work",
+    "what is a put",
+    "the revenue growth of the market",
+    "cash flow and the balance sheet",
+    "interest rate report",
+]
+
+@pytest.fixture(scope="module")
+def tiny_model_path():
+    """A real, offline sentence model small enough to load in tests"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield save_tiny_sentence_transformer(tmp_dir)
+
+@pytest.fixture(scope="module")
+def onnx_export(tiny_model_path):
+    """Skip when the installed torch can't export to ONNX through optimum.
+
+    optimum is a pinned requirement, so a missing install still fails;
+    torch releases after the pinned one switch to an exporter optimum
+    1.24 can't drive.
+    """
+    from optimum.exporters.onnx import main_export
+    with tempfile.TemporaryDirectory() as output_dir:
+        try:
+            main_export(tiny_model_path, output_dir, task="feature-extraction")
+        except Exception as e:
+            pytest.skip(f"ONNX export does not work with torch {torch.__version__}: {e}")
+
+@pytest.fixture
+def registry():
+    clear_embedding_models()
+    yield
+    clear_embedding_models()
+
+def test_backends_keyed_separately(registry, tiny_model_path):
+    torch_model = get_embedding_model(tiny_model_path, device="cpu", backend="torch")
+    int8_model = get_embedding_model(tiny_model_path, device="cpu", backend="int8")
+
+    assert torch_model is not int8_model
+    assert {s.backend for s in get_embedding_model_stats()} == {"torch", "int8"}
+
+def test_int8_matches_reference(registry, tiny_model_path):
+    """Dynamic int8 quantization keeps embeddings pointing the same way"""
+    reference = get_embedding_model(tiny_model_path, device="cpu", backend="torch").encode(TEXTS)
+    quantized = get_embedding_model(tiny_model_path, device="cpu", backend="int8").encode(TEXTS)
+    assert cosine_agreement(reference, quantized).min() >= 0.99
+
+def test_onnx_matches_reference(registry, tiny_model_path, onnx_export):
+    reference = get_embedding_model(tiny_model_path, device="cpu", backend="torch").encode(TEXTS)
+    exported = get_embedding_model(tiny_model_path, device="cpu", backend="onnx").encode(TEXTS)
+    assert cosine_agreement(reference, exported).min() >= 0.999
+
+    stats = {s.backend: s for s in get_embedding_model_stats()}
+    # The ONNX weights live outside torch but still count towards resident memory
+    assert stats["onnx"].memory_bytes >= stats["torch"].memory_bytes * 0.5
+
+def test_onnx_without_runtime_fails_clearly(registry, tiny_model_path, monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        embedding_registry.importlib.util, "find_spec",
+        lambda name, *args: None if name == "onnxruntime" else find_spec(name, *args)
+    )
+    with pytest.raises(ImportError, match="server_requirements.txt"):
+        get_embedding_model(tiny_model_path, device="cpu", backend="onnx")
+
+def test_benchmark_reports_each_backend(registry, tiny_model_path):
+    results = benchmark_backends(TEXTS, TEXTS[:2], ["torch", "int8"], model_name=tiny_model_path)
+
+    assert [r.backend for r in results] == ["torch", "int8"]
+    assert results[0].mean_cosine == pytest.approx(1.0)
+    assert all(r.query_latency_ms > 0 and r.chunks_per_second > 0 for r in results)
+
+def test_invalid_backend_combinations():
+    with pytest.raises(ValueError):
+        resolve_model_key("all-MiniLM-L6-v2", device="cpu", backend="tensorrt")
+    with pytest.raises(ValueError):
+        resolve_model_key("all-MiniLM-L6-v2", device="cpu", precision="float16", backend="int8")
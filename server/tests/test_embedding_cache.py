@@ -0,0 +1,52 @@
+import json
+import pytest
+import numpy as np
+from server.src.index.embedding_cache import EmbeddingCache, embedding_cache_id
+from server.src.index.json_to_index import create_faiss_index, load_vectors
+
+def test_cache_encodes_unseen_text_only(mock_model, tmp_dir):
+    cache = EmbeddingCache(str(tmp_dir / "cache.sqlite"))
+    first = cache.encode(mock_model, ["revenue", "margin", "revenue"], "model-a")
+    assert mock_model.encoded_texts == 2  # Duplicates within a call are encoded once
+
+    second = cache.encode(mock_model, ["margin", "guidance"], "model-a")
+    assert mock_model.encoded_texts == 3
+    assert np.array_equal(second[0], first[1])
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (2, 3, 3)
+    assert stats.hit_rate == pytest.approx(0.4)
+
+def test_cache_is_keyed_by_model(mock_model, tmp_dir):
+    cache = EmbeddingCache(str(tmp_dir / "cache.sqlite"))
+    cache.encode(mock_model, ["revenue"], "model-a")
+    cache.encode(mock_model, ["revenue"], "model-b")
+    assert mock_model.encoded_texts == 2
+    assert embedding_cache_id("all-MiniLM-L6-v2", "float16") != embedding_cache_id("all-MiniLM-L6-v2", "float32")
+
+def test_cache_persists_across_instances(mock_model, tmp_dir):
+    EmbeddingCache(str(tmp_dir / "cache.sqlite")).encode(mock_model, ["revenue"], "model-a")
+    reopened = EmbeddingCache(str(tmp_dir / "cache.sqlite"))
+    reopened.encode(mock_model, ["revenue"], "model-a")
+    assert mock_model.encoded_texts == 1
+    assert reopened.stats().hits == 1
+
+def test_rebuild_reuses_cached_embeddings(mock_model, tmp_dir):
+    """A second build of unchanged documents runs the model on nothing"""
+    processed_dir = tmp_dir / "processed"
+    processed_dir.mkdir()
+    for i in range(3):
+        with open(processed_dir / f"doc_{i}.json", "w") as f:
+            json.dump({
+                "text": f"Document {i} covers quarterly earnings.",
+                "metadata": {"title": "T", "author": "A", "creation_date": "2024", "source_file": f"doc_{i}.pdf"}
+            }, f)
+    cache = EmbeddingCache(str(tmp_dir / "cache.sqlite"))
+
+    create_faiss_index(str(processed_dir), str(tmp_dir / "a"), embedding_cache=cache)
+    encoded = mock_model.encoded_texts
+    create_faiss_index(str(processed_dir), str(tmp_dir / "b"), embedding_cache=cache)
+
+    assert mock_model.encoded_texts == encoded
+    assert cache.stats().hits == 3
+    assert np.array_equal(load_vectors(str(tmp_dir / "a")), load_vectors(str(tmp_dir / "b")))
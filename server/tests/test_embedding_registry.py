@@ -0,0 +1,60 @@
+import pytest
+from server.src.index import embedding_registry
+from server.src.index.embedding_registry import (
+    get_embedding_model,
+    get_embedding_model_stats,
+    clear_embedding_models,
+    normalize_model_name,
+    resolve_device,
+    resolve_model_key
+)
+from server.tests.mocks.mock_embeddings import MockEmbeddingModel
+
+@pytest.fixture
+def mock_loader(monkeypatch):
+    """Replace model loading with a counting mock"""
+    loads = []
+
+    def load(model_name, device=None):
+        loads.append((model_name, device))
+        return MockEmbeddingModel()
+
+    monkeypatch.setattr(embedding_registry, "SentenceTransformer", load)
+    clear_embedding_models()
+    yield loads
+    clear_embedding_models()
+
+def test_model_loaded_once(mock_loader):
+    """Repeated lookups share one resident model"""
+    first = get_embedding_model("all-MiniLM-L6-v2", device="cpu")
+    second = get_embedding_model("sentence-transformers/all-MiniLM-L6-v2", device="cpu")
+
+    assert first is second
+    assert len(mock_loader) == 1
+
+def test_models_keyed_by_device_and_precision(mock_loader):
+    """Different devices get separate entries"""
+    get_embedding_model("all-MiniLM-L6-v2", device="cpu")
+    get_embedding_model("all-MiniLM-L6-v2", device="meta")
+
+    assert len(mock_loader) == 2
+    stats = get_embedding_model_stats()
+    assert {s.device for s in stats} == {"cpu", "meta"}
+    assert all(s.load_time_seconds >= 0 for s in stats)
+
+def test_unavailable_device_falls_back_to_cpu(monkeypatch):
+    """Requesting mps on a machine without it should not fail"""
+    monkeypatch.setattr(embedding_registry.torch.backends.mps, "is_available", lambda: False)
+    assert resolve_device("mps") == "cpu"
+
+def test_device_from_environment(monkeypatch):
+    """EMBEDDING_DEVICE is used when no device is passed"""
+    monkeypatch.setenv("EMBEDDING_DEVICE", "cpu")
+    assert resolve_device() == "cpu"
+
+def test_short_model_names_are_expanded():
+    assert normalize_model_name("all-MiniLM-L6-v2") == "sentence-transformers/all-MiniLM-L6-v2"
+
+def test_unsupported_precision_rejected():
+    with pytest.raises(ValueError):
+        resolve_model_key("all-MiniLM-L6-v2", device="cpu", precision="float8")
@@ -0,0 +1,63 @@
+import time
+import asyncio
+import pytest
+from server.src.executors import BoundedExecutor, get_executor, run_blocking, shutdown_executors
+
+@pytest.fixture
+def executor():
+    pool = BoundedExecutor("test", max_workers=2, max_pending=1)
+    yield pool
+    pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_running_during_blocking_work(executor):
+    """Other coroutines make progress while a blocking call runs in the pool"""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    await asyncio.gather(executor.run(time.sleep, 0.2), ticker())
+    assert ticks == 5
+
+@pytest.mark.asyncio
+async def test_admission_is_bounded(executor):
+    """At most max_workers + max_pending jobs are in the pool at once"""
+    peak = 0
+
+    async def observe():
+        nonlocal peak
+        for _ in range(20):
+            stats = executor.stats()
+            peak = max(peak, stats.queued + stats.running)
+            await asyncio.sleep(0.005)
+
+    await asyncio.gather(*(executor.run(time.sleep, 0.02) for _ in range(8)), observe())
+
+    stats = executor.stats()
+    assert peak <= 3
+    assert stats.completed == 8
+    assert stats.peak_queued >= 1
+    assert stats.waiting == stats.queued == stats.running == 0
+
+@pytest.mark.asyncio
+async def test_errors_propagate(executor):
+    def fail():
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError):
+        await executor.run(fail)
+    assert executor.stats().running == 0
+
+@pytest.mark.asyncio
+async def test_named_pools():
+    try:
+        assert await run_blocking("io", sum, [1, 2, 3]) == 6
+        assert get_executor("io") is get_executor("io")
+        with pytest.raises(ValueError):
+            get_executor("gpu")
+    finally:
+        shutdown_executors()
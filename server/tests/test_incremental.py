@@ -0,0 +1,128 @@
+import os
+import json
+import pytest
+from pathlib import Path
+import numpy as np
+from server.src.data_model import IndexConfig, IndexType
+from server.src.index.json_to_index import create_faiss_index, load_index, load_vectors, read_manifest
+from server.src.index import incremental
+from server.src.index.incremental import update_faiss_index
+from server.src.index.chunk_store import ChunkStore
+from server.src.index.dedup import load_signatures, minhash_signatures
+from server.src.index.search import search_index
+from server.tests.mocks.mock_embeddings import MockEmbeddingModel
+
+TOPICS = ["revenue growth", "balance sheet", "cash flow", "interest rates", "dividend policy"]
+
+@pytest.fixture
+def topic_dirs(tmp_dir):
+    """Create temporary directories with one processed document per topic"""
+    processed_dir = tmp_dir / "processed"
+    processed_dir.mkdir()
+    for i, topic in enumerate(TOPICS):
+        write_document(processed_dir, f"doc_{i}", f"This report discusses {topic} in detail.")
+    return processed_dir, str(tmp_dir / "indexes")
+
+def write_document(processed_dir: Path, name: str, text: str) -> None:
+    with open(processed_dir / f"{name}.json", "w") as f:
+        json.dump({
+            "text": text,
+            "metadata": {"title": name, "author": "A", "creation_date": "2024", "source_file": f"{name}.pdf"}
+        }, f)
+
+def top_source(index_dir: str, model: MockEmbeddingModel, query: str) -> str:
+    index, chunks = load_index(index_dir)
+    config = IndexConfig(**read_manifest(index_dir)["index_config"])
+    query_embedding = model.encode([query])
+    _, rows = search_index(index, query_embedding, 1, config, load_vectors(index_dir), chunks)
+    return chunks[int(rows[0][0])].metadata.source_file
+
+def test_unchanged_documents_not_reembedded(mock_model, topic_dirs):
+    processed_dir, index_dir = topic_dirs
+    create_faiss_index(str(processed_dir), index_dir)
+    write_document(processed_dir, "doc_new", "A new filing about share buybacks.")
+
+    encoded_before = mock_model.encoded_texts
+    stats = update_faiss_index(str(processed_dir), index_dir)
+
+    assert stats == {"added": 1, "removed": 0, "unchanged": len(TOPICS)}
+    assert mock_model.encoded_texts - encoded_before == 1
+    assert top_source(index_dir, mock_model, "share buybacks") == "doc_new.pdf"
+
+def test_kept_chunks_copied_not_rebuilt(mock_model, topic_dirs, monkeypatch):
+    """An update signs only the new document's chunks and never rebuilds kept ones"""
+    processed_dir, index_dir = topic_dirs
+    create_faiss_index(str(processed_dir), index_dir)
+    os.remove(processed_dir / "doc_0.json")
+    write_document(processed_dir, "doc_new", "A new filing about share buybacks.")
+
+    signed = []
+    def record_signatures(texts):
+        signed.extend(texts)
+        return minhash_signatures(texts)
+    def no_chunk_objects(store, i):
+        raise AssertionError("kept chunk rebuilt")
+    with monkeypatch.context() as patch:
+        patch.setattr(incremental, "minhash_signatures", record_signatures)
+        patch.setattr(ChunkStore, "__getitem__", no_chunk_objects)
+        update_faiss_index(str(processed_dir), index_dir)
+
+    assert signed == ["A new filing about share buybacks."]
+    _, chunks = load_index(index_dir)
+    texts = [chunks.get_text(row) for row in range(len(chunks))]
+    assert np.array_equal(load_signatures(index_dir), minhash_signatures(texts))
+
+    # Same chunks, documents and pages as a build from scratch
+    rebuilt_dir = str(Path(index_dir).parent / "rebuilt")
+    create_faiss_index(str(processed_dir), rebuilt_dir)
+    _, rebuilt = load_index(rebuilt_dir)
+    assert sorted(chunks, key=lambda c: c.metadata.source_file) == sorted(rebuilt, key=lambda c: c.metadata.source_file)
+    def documents(store):
+        return sorted(
+            (document["source_file"], document["content_hash"], store.get_document_text(doc_id))
+            for doc_id, document in enumerate(store.documents)
+        )
+    assert documents(chunks) == documents(rebuilt)
+
+def test_up_to_date_index_left_alone(mock_model, topic_dirs):
+    processed_dir, index_dir = topic_dirs
+    create_faiss_index(str(processed_dir), index_dir)
+    mtime = os.stat(os.path.join(index_dir, "manifest.json")).st_mtime_ns
+
+    stats = update_faiss_index(str(processed_dir), index_dir)
+
+    assert stats["added"] == stats["removed"] == 0
+    assert os.stat(os.path.join(index_dir, "manifest.json")).st_mtime_ns == mtime
+
+@pytest.mark.parametrize("index_config", [
+    IndexConfig(index_type=IndexType.FLAT),
+    IndexConfig(index_type=IndexType.HNSW),
+    # SQ8 ranges were trained on the original documents, re-scoring keeps new ones exact
+    IndexConfig(index_type=IndexType.SQ8, rescore=True)
+])
+def test_changed_and_deleted_documents(mock_model, topic_dirs, index_config):
+    processed_dir, index_dir = topic_dirs
+    create_faiss_index(str(processed_dir), index_dir, index_config=index_config)
+
+    os.remove(processed_dir / "doc_0.json")
+    write_document(processed_dir, "doc_1", "This report now covers currency hedging instead.")
+    update_faiss_index(str(processed_dir), index_dir)
+
+    index, chunks = load_index(index_dir)
+    sources = {chunk.metadata.source_file for chunk in chunks}
+    assert "doc_0.pdf" not in sources
+    assert index.ntotal == len(chunks) == len(load_vectors(index_dir))
+    assert top_source(index_dir, mock_model, "currency hedging") == "doc_1.pdf"
+    assert top_source(index_dir, mock_model, "cash flow") == "doc_2.pdf"
+
+    # Surviving chunks keep their ids and the store maps them back to rows
+    assert not np.array_equal(chunks.rows["vector_id"], np.arange(len(chunks)))
+    assert list(chunks.rows_for_ids(chunks.rows["vector_id"])) == list(range(len(chunks)))
+
+def test_update_without_index_builds_one(mock_model, topic_dirs):
+    processed_dir, index_dir = topic_dirs
+    stats = update_faiss_index(str(processed_dir), index_dir)
+
+    index, chunks = load_index(index_dir)
+    assert stats["added"] == len(TOPICS)
+    assert index.ntotal == len(chunks) == len(TOPICS)
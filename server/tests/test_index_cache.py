@@ -0,0 +1,70 @@
+import os
+import json
+import faiss
+import numpy as np
+from server.src.data_model import IndexConfig, IndexType
+from server.src.index.json_to_index import create_faiss_index, load_index, load_vectors
+from server.src.index.index_cache import get_cached_index
+
+def test_manifest_written(mock_model, test_dirs):
+    processed_dir, index_dir = test_dirs
+    create_faiss_index(processed_dir, index_dir)
+
+    with open(os.path.join(index_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    assert manifest["num_chunks"] == 1
+    assert manifest["dimension"] == mock_model.dimension
+
+def test_saved_files_per_index_type(mock_model, test_dirs):
+    """Flat saves only float32 vectors; other types add a float16 copy beside the FAISS file"""
+    processed_dir, index_dir = test_dirs
+    create_faiss_index(processed_dir, index_dir)
+    assert not os.path.exists(os.path.join(index_dir, "faiss.index"))
+    assert load_vectors(index_dir).dtype == np.float32
+
+    create_faiss_index(processed_dir, index_dir, index_config=IndexConfig(index_type=IndexType.SQ8))
+    assert os.path.exists(os.path.join(index_dir, "faiss.index"))
+    assert load_vectors(index_dir).dtype == np.float16
+
+def test_search_params_restored_on_load(mock_model, test_dirs):
+    """The saved index config is reapplied when the index is loaded"""
+    processed_dir, index_dir = test_dirs
+    for i in range(60):
+        with open(os.path.join(processed_dir, f"doc_{i}.json"), "w") as f:
+            json.dump({
+                "text": f"Document {i} about topic {i % 7}",
+                "metadata": {"title": "T", "author": "A", "creation_date": "2024", "source_file": f"doc_{i}.pdf"}
+            }, f)
+    create_faiss_index(processed_dir, index_dir, index_config=IndexConfig(index_type=IndexType.IVF_FLAT, nprobe=1))
+
+    index, chunks = load_index(index_dir)
+    assert faiss.extract_index_ivf(index).nprobe == 1
+    assert index.ntotal == len(chunks)
+
+def test_index_stays_resident(mock_model, test_dirs):
+    """Repeated lookups return the same objects without reloading"""
+    processed_dir, index_dir = test_dirs
+    create_faiss_index(processed_dir, index_dir)
+
+    index_a, chunks_a = get_cached_index(index_dir)
+    index_b, chunks_b = get_cached_index(index_dir)
+
+    assert index_a is index_b
+    assert chunks_a is chunks_b
+
+def test_rebuild_invalidates_cache(mock_model, test_dirs):
+    """A rebuilt index on disk is picked up on the next lookup"""
+    processed_dir, index_dir = test_dirs
+    create_faiss_index(processed_dir, index_dir)
+    index_a, chunks_a = get_cached_index(index_dir)
+
+    with open(os.path.join(processed_dir, "second.json"), "w") as f:
+        json.dump({
+            "text": "Another document about balance sheets",
+            "metadata": {"title": "B", "author": "B", "creation_date": "2024", "source_file": "b.pdf"}
+        }, f)
+    create_faiss_index(processed_dir, index_dir)
+
+    index_b, chunks_b = get_cached_index(index_dir)
+    assert index_b is not index_a
+    assert len(chunks_b) == 2
@@ -0,0 +1,150 @@
+import os
+import numpy as np
+import faiss
+import pytest
+from server.src.data_model import IndexConfig, IndexType
+from server.src.index.index_factory import MappedFlatIndex, build_index, resolve_index_config
+from server.src.index.json_to_index import read_faiss_index, write_faiss_index
+from server.src.index.index_benchmark import benchmark_index_configs, recall_at_k, sample_queries
+from server.src.index.search import search_index, rescore_candidates
+
+@pytest.fixture
+def embeddings():
+    """Clustered, normalized vectors so approximate search has structure to exploit"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 64))
+    vectors = centers[rng.integers(0, 20, 3000)] + 0.2 * rng.normal(size=(3000, 64))
+    vectors = vectors.astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+@pytest.mark.parametrize("index_type", list(IndexType))
+def test_each_index_type_finds_itself(embeddings, index_type):
+    config = resolve_index_config(IndexConfig(index_type=index_type), len(embeddings), embeddings.shape[1])
+    index = build_index(embeddings, config)
+
+    assert index.ntotal == len(embeddings)
+    _, indices = index.search(embeddings[:20], 5)
+    found_self = np.mean([i in row for i, row in enumerate(indices)])
+    assert found_self >= 0.8
+
+def test_small_corpus_falls_back_to_flat():
+    config = resolve_index_config(IndexConfig(index_type=IndexType.IVF_PQ), 10, 384)
+    assert config.index_type == IndexType.FLAT
+
+def test_pq_subquantizers_divide_dimension():
+    config = resolve_index_config(IndexConfig(index_type=IndexType.IVF_PQ, pq_m=16), 5000, 100)
+    assert 100 % config.pq_m == 0
+    assert config.nlist is not None
+
+def test_search_params_applied(embeddings):
+    config = resolve_index_config(
+        IndexConfig(index_type=IndexType.IVF_FLAT, nprobe=3),
+        len(embeddings),
+        embeddings.shape[1]
+    )
+    index = build_index(embeddings, config)
+    assert faiss.extract_index_ivf(index).nprobe == 3
+
+def test_recall_at_k():
+    truth = np.array([[1, 2, 3], [4, 5, 6]])
+    found = np.array([[1, 2, 9], [6, 5, 4]])
+    assert recall_at_k(truth, found, 3) == pytest.approx(5 / 6)
+
+def test_benchmark_report(embeddings):
+    results = benchmark_index_configs(
+        embeddings,
+        sample_queries(embeddings, 20),
+        [IndexConfig(index_type=IndexType.FLAT), IndexConfig(index_type=IndexType.HNSW)],
+        k=5
+    )
+
+    flat = [r for r in results if r.index_type == IndexType.FLAT]
+    assert len(flat) == 1 and flat[0].recall_at_k == 1.0
+    assert any(r.search_params.get("ef_search") for r in results)
+    assert all(r.latency_ms > 0 for r in results)
+
+def test_rescoring_matches_exact_search(embeddings):
+    """SQ8 candidates re-scored against float16 vectors reproduce the exact top-k"""
+    exact = build_index(embeddings, IndexConfig(index_type=IndexType.FLAT))
+    config = resolve_index_config(
+        IndexConfig(index_type=IndexType.SQ8, rescore=True),
+        len(embeddings),
+        embeddings.shape[1]
+    )
+    compressed = build_index(embeddings, config)
+    queries = sample_queries(embeddings, 20)
+
+    _, exact_ids = exact.search(queries, 7)
+    scores, ids = search_index(compressed, queries, 7, config, embeddings.astype(np.float16))
+
+    assert recall_at_k(exact_ids, ids, 7) >= 0.95
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+def test_rescoring_pads_missing_candidates():
+    vectors = np.eye(4, dtype=np.float16)
+    scores, ids = rescore_candidates(vectors, np.eye(4, dtype=np.float32)[:1], np.array([[2, 0, -1]]), 3)
+
+    assert list(ids[0]) == [0, 2, -1]
+    assert scores[0, 0] == pytest.approx(1.0)
+
+def test_mapped_flat_matches_faiss(embeddings, tmp_path):
+    np.save(tmp_path / "vectors.npy", embeddings)
+    ids = np.arange(len(embeddings), dtype=np.int64) * 2 + 5
+    mapped = MappedFlatIndex(np.load(tmp_path / "vectors.npy", mmap_mode="r"), ids)
+    reference = faiss.IndexIDMap(faiss.IndexFlatIP(embeddings.shape[1]))
+    reference.add_with_ids(embeddings, ids)
+
+    scores, found = mapped.search(embeddings[:10], 5)
+    expected_scores, expected_found = reference.search(embeddings[:10], 5)
+    assert np.array_equal(found, expected_found)
+    assert np.allclose(scores, expected_scores)
+
+    # A row subset, gathered over several blocks, matches exact search over those rows
+    rows = np.arange(1, len(embeddings), 3)
+    mapped.BLOCK_ROWS = 256
+    _, found = mapped.search(embeddings[:10], 5, rows)
+    exact = np.argsort(-(embeddings[:10] @ embeddings[rows].T), axis=1)[:, :5]
+    assert np.array_equal(found, ids[rows[exact]])
+
+    # Fewer rows than k are padded like FAISS
+    _, found = mapped.search(embeddings[:1], 5, rows[:2])
+    assert list(found[0][2:]) == [-1, -1, -1]
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs Linux /proc")
+def test_flat_index_is_mapped_not_copied(tmp_path):
+    """Searching a saved flat index reads the file's pages instead of copying it into process memory"""
+    def anonymous_rss() -> int:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) * 1024 for line in f if line.startswith("RssAnon:"))
+
+    vectors = np.random.default_rng(0).normal(size=(100_000, 128)).astype(np.float32)
+    np.save(tmp_path / "vectors.npy", vectors)
+    size = vectors.nbytes
+    del vectors
+
+    before = anonymous_rss()
+    index = read_faiss_index(str(tmp_path))
+    index.search(np.ones((1, 128), dtype=np.float32), 5)
+
+    assert isinstance(index, MappedFlatIndex) and index.ntotal == 100_000
+    with open("/proc/self/maps") as f:
+        assert any(str(tmp_path / "vectors.npy") in line for line in f)
+    assert anonymous_rss() - before < size // 4
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs Linux /proc")
+@pytest.mark.parametrize("index_type,mapped", [(IndexType.IVF_FLAT, True), (IndexType.HNSW, False)])
+def test_faiss_file_read_mapped_where_supported(tmp_path, embeddings, index_type, mapped):
+    """IVF inverted lists are served from the file's pages; other types fall back to a plain read"""
+    config = resolve_index_config(IndexConfig(index_type=index_type, nlist=16), len(embeddings), embeddings.shape[1])
+    built = build_index(embeddings, config)
+    write_faiss_index(built, str(tmp_path))
+
+    index = read_faiss_index(str(tmp_path))
+
+    assert index.ntotal == len(embeddings)
+    _, expected = built.search(embeddings[:5], 5)
+    _, found = index.search(embeddings[:5], 5)
+    assert np.array_equal(found, expected)
+    with open("/proc/self/maps") as f:
+        assert any(str(tmp_path / "faiss.index") in line for line in f) == mapped
@@ -75,6 +75,14 @@ def test_text_splitter_basic(sample_text):
             # There should be some common text between chunks
             assert any(sent in next_chunk for sent in current_chunk.split('.') if sent)
 
+def test_text_splitter_offsets(sample_text):
+    """Offsets slice out exactly the chunks split_text returns"""
+    splitter = RecursiveTextSplitter(chunk_size=200, chunk_overlap=50)
+    spans = splitter.split_text_with_offsets(sample_text)
+    
+    assert [sample_text[start:end] for start, end in spans] == splitter.split_text(sample_text)
+    assert all(start < end for start, end in spans)
+
 def test_document_processing(sample_text, sample_metadata):
     """Test document processing with metadata"""
     chunks = process_document(sample_text, sample_metadata)
@@ -93,8 +101,9 @@ def test_index_creation_and_loading(test_dirs):
     create_faiss_index(processed_dir, index_dir)
     
     # Verify files exist
-    assert os.path.exists(os.path.join(index_dir, "faiss.index"))
-    assert os.path.exists(os.path.join(index_dir, "chunks.json"))
+    assert os.path.exists(os.path.join(index_dir, "vectors.npy"))
+    assert os.path.exists(os.path.join(index_dir, "text.bin"))
+    assert os.path.exists(os.path.join(index_dir, "chunks.npy"))
     
     # Test loading
     index, chunks = load_index(index_dir)
@@ -0,0 +1,82 @@
+import tempfile
+from pathlib import Path
+import fitz
+import numpy as np
+import pytest
+from server.src.data_model import IndexConfig, IndexType
+from server.src.index.ingest import ingest_pdfs, run_in_background
+from server.src.index.json_to_index import create_faiss_index, load_index, load_vectors, read_manifest
+from server.src.index.incremental import update_faiss_index
+from server.src.index.dedup import load_signatures, minhash_signatures
+
+TOPICS = ["revenue growth", "balance sheet", "cash flow", "interest rates", "dividend policy"]
+
+@pytest.fixture
+def pdf_dirs():
+    """Create temporary folders with a few generated multi-page PDFs"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_dir = Path(tmp_dir) / "pdfs"
+        pdf_dir.mkdir()
+        for i, topic in enumerate(TOPICS):
+            doc = fitz.open()
+            for page_number in range(3):
+                page = doc.new_page()
+                page.insert_text((72, 72), f"Section {page_number} of this report discusses {topic}.")
+            doc.save(pdf_dir / f"doc_{i}.pdf")
+            doc.close()
+        yield str(pdf_dir), Path(tmp_dir)
+
+def test_background_stage_is_bounded():
+    """The producer never runs more than the queue size ahead of the consumer"""
+    produced = []
+
+    def items():
+        for i in range(20):
+            produced.append(i)
+            yield i
+
+    stream = run_in_background(items(), max_pending=2)
+    assert next(stream) == 0
+    assert len(produced) <= 4
+    assert list(stream) == list(range(1, 20))
+
+def test_background_stage_raises():
+    def items():
+        yield 1
+        raise ValueError("bad page")
+
+    with pytest.raises(ValueError):
+        list(run_in_background(items()))
+
+def test_streaming_matches_batch_build(mock_model, pdf_dirs):
+    """Streaming ingest writes the same chunks and vectors as create_faiss_index"""
+    pdf_dir, tmp_dir = pdf_dirs
+    num_chunks = ingest_pdfs(pdf_dir, str(tmp_dir / "streamed"), text_folder=str(tmp_dir / "processed"), batch_size=2)
+    create_faiss_index(str(tmp_dir / "processed"), str(tmp_dir / "batch"))
+
+    streamed_index, streamed = load_index(str(tmp_dir / "streamed"))
+    batch_index, batch = load_index(str(tmp_dir / "batch"))
+
+    assert num_chunks == len(streamed) == streamed_index.ntotal == batch_index.ntotal
+    assert sorted(c.text for c in streamed) == sorted(c.text for c in batch)
+    assert read_manifest(str(tmp_dir / "streamed"))["next_vector_id"] == num_chunks
+    assert np.allclose(
+        np.asarray(load_vectors(str(tmp_dir / "streamed")), dtype=np.float32),
+        mock_model.encode([c.text for c in streamed]),
+        atol=1e-3
+    )
+    # Row signatures are saved for updates, as by the batch build
+    assert np.array_equal(load_signatures(str(tmp_dir / "streamed")), minhash_signatures([c.text for c in streamed]))
+
+    # The saved JSON lets later runs update the streamed index incrementally
+    assert update_faiss_index(str(tmp_dir / "processed"), str(tmp_dir / "streamed"))["added"] == 0
+
+def test_streaming_trains_index(mock_model, pdf_dirs):
+    """Trainable index types are built once enough vectors are buffered"""
+    pdf_dir, tmp_dir = pdf_dirs
+    config = IndexConfig(index_type=IndexType.SQ8, train_sample_size=2)
+    ingest_pdfs(pdf_dir, str(tmp_dir / "index"), index_config=config, batch_size=1)
+
+    index, chunks = load_index(str(tmp_dir / "index"))
+    assert index.ntotal == len(chunks) == len(TOPICS)
+    assert read_manifest(str(tmp_dir / "index"))["index_config"]["index_type"] == "sq8"
@@ -0,0 +1,107 @@
+import json
+import tempfile
+import numpy as np
+import pytest
+from pathlib import Path
+from server.src.index.lexical_index import (
+    tokenize,
+    write_lexical_index,
+    open_lexical_index,
+    reciprocal_rank_fusion
+)
+from server.src.index.json_to_index import create_faiss_index
+from server.src.index.incremental import update_faiss_index
+from server.src.index.index_cache import get_loaded_index
+from server.src.index.retrieval_batcher import retrieve_batch
+from server.src.index.hybrid_benchmark import benchmark_hybrid
+
+TEXTS = [
+    "Apple (AAPL) filed its 10-K with revenue of 383.3 billion.",
+    "Options give the holder a right but not an obligation.",
+    "The 10-Q is filed quarterly and is unaudited.",
+    "Interest rates and bond prices move in opposite directions."
+]
+
+def write_docs(folder: Path, texts):
+    for i, text in enumerate(texts):
+        with open(folder / f"doc_{i}.json", "w") as f:
+            json.dump({
+                "text": text,
+                "metadata": {"title": f"Doc {i}", "author": "A", "creation_date": "2024", "source_file": f"doc_{i}.pdf"}
+            }, f)
+
+def test_tokenize_keeps_financial_terms():
+    tokens = tokenize("AAPL's 10-K: revenue of $383.3 billion, S&P 500.")
+    assert "10-k" in tokens and "383.3" in tokens and "s&p" in tokens and "aapl's" in tokens
+    assert "of" not in tokens
+
+def test_bm25_ranks_exact_terms():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_lexical_index(tmp_dir, TEXTS)
+        lexical = open_lexical_index(tmp_dir)
+
+        scores, rows = lexical.search("10-K filed quarterly", 4)
+        assert rows[0] == 2
+        assert list(scores) == sorted(scores, reverse=True)
+        # Rows that match no query term are never scored
+        assert set(rows) == {0, 2}
+        assert len(lexical.search("nonexistent ticker zzzz", 4)[0]) == 0
+
+def test_missing_lexical_index_is_none():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        assert open_lexical_index(tmp_dir) is None
+
+def test_reciprocal_rank_fusion():
+    scores, rows = reciprocal_rank_fusion([np.array([1, 2, 3]), np.array([3, 1, -1])], k=3, rrf_k=60)
+    assert list(rows) == [1, 3, 2]
+    assert scores[0] == pytest.approx(1 / 61 + 1 / 62)
+
+def test_hybrid_retrieval_finds_exact_terms(mock_model, monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processed = Path(tmp_dir) / "processed"
+        processed.mkdir()
+        write_docs(processed, TEXTS)
+        index_path = str(Path(tmp_dir) / "index")
+        create_faiss_index(str(processed), index_path)
+
+        loaded = get_loaded_index(index_path)
+        assert loaded.lexical is not None and loaded.lexical.num_rows == len(loaded.chunks)
+
+        (result,) = retrieve_batch([("Which filing is the 10-Q?", index_path, 2)])
+        assert "10-Q" in result.chunks.get_text(int(result.rows[0]))
+        # Scores stay cosine similarities of the returned rows
+        vectors = np.asarray(loaded.vectors[result.rows], dtype=np.float32)
+        assert np.all(result.scores <= 1.0 + 1e-3) and len(result.scores) == len(vectors)
+
+        monkeypatch.setenv("RETRIEVAL_HYBRID", "false")
+        (vector_only,) = retrieve_batch([("Which filing is the 10-Q?", index_path, 2)])
+        assert len(vector_only.rows) == 2
+
+def test_incremental_update_rebuilds_postings(mock_model):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processed = Path(tmp_dir) / "processed"
+        processed.mkdir()
+        write_docs(processed, TEXTS)
+        index_path = str(Path(tmp_dir) / "index")
+        create_faiss_index(str(processed), index_path)
+
+        (processed / "doc_0.json").unlink()
+        update_faiss_index(str(processed), index_path)
+
+        loaded = get_loaded_index(index_path)
+        assert loaded.lexical.num_rows == len(loaded.chunks)
+        _, rows = loaded.lexical.search("10-Q", 1)
+        assert "10-Q" in loaded.chunks.get_text(int(rows[0]))
+        assert len(loaded.lexical.search("AAPL", 1)[1]) == 0
+
+def test_benchmark_reports_each_method(mock_model):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processed = Path(tmp_dir) / "processed"
+        processed.mkdir()
+        write_docs(processed, TEXTS)
+        index_path = str(Path(tmp_dir) / "index")
+        create_faiss_index(str(processed), index_path)
+
+        results = benchmark_hybrid(index_path, num_queries=4, k=2)
+        assert [r.method for r in results] == ["vector", "lexical", "hybrid"]
+        assert all(0.0 <= r.recall_at_k <= 1.0 for r in results)
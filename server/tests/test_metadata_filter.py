@@ -0,0 +1,121 @@
+import json
+import tempfile
+import pytest
+from pathlib import Path
+from server.src.data_model import IndexConfig, IndexType, MetadataFilter
+from server.src.index.json_to_index import create_faiss_index
+from server.src.index.incremental import update_faiss_index
+from server.src.index.index_cache import get_loaded_index
+from server.src.index.metadata_filter import normalize_date
+from server.src.index.retrieval_batcher import retrieve_batch
+
+WORDS = ["options", "dividends", "bonds", "equity", "cash", "revenue", "margin", "leverage"]
+AUTHORS = ["Hull", "Graham", "Fabozzi"]
+
+@pytest.fixture
+def processed_dir():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processed = Path(tmp_dir) / "processed"
+        processed.mkdir()
+        # Enough single-chunk documents to train the IVF index types
+        for i in range(60):
+            with open(processed / f"doc_{i}.json", "w") as f:
+                json.dump({
+                    "text": f"Notes on {WORDS[i % 8]} and {WORDS[(i * 3) % 8]} number {i}.",
+                    "metadata": {
+                        "title": f"Doc {i}",
+                        "author": AUTHORS[i % 3],
+                        "creation_date": f"D:20{10 + i % 15:02d}0101000000Z",
+                        "source_file": f"doc_{i}.pdf"
+                    }
+                }, f)
+        yield processed
+
+def sources(result):
+    return {result.chunks.get_document(int(row))["source_file"] for row in result.rows if row >= 0}
+
+def test_normalize_date():
+    assert normalize_date("D:20240115093000+01'00'") == "20240115093000"
+    assert normalize_date("2024-01-15") == "20240115"
+    assert normalize_date("") == ""
+
+@pytest.mark.parametrize("index_type", [IndexType.FLAT, IndexType.HNSW, IndexType.IVF_FLAT, IndexType.SQ8, IndexType.PQ])
+def test_filter_applies_inside_search(mock_model, processed_dir, index_type, monkeypatch):
+    monkeypatch.setenv("RETRIEVAL_HYBRID", "false")
+    index_path = str(processed_dir.parent / index_type.value)
+    create_faiss_index(
+        str(processed_dir),
+        index_path,
+        index_config=IndexConfig(index_type=index_type, nprobe=64, pq_m=8)
+    )
+    allowed = {"doc_3.pdf", "doc_17.pdf", "doc_42.pdf"}
+
+    (result,) = retrieve_batch([("notes on options", index_path, 5, MetadataFilter(source_files=sorted(allowed)))])
+
+    # Every allowed document is found even though none may rank in the unfiltered top 5
+    assert sources(result) == allowed
+
+def test_author_and_date_filters(mock_model, processed_dir):
+    index_path = str(processed_dir.parent / "index")
+    create_faiss_index(str(processed_dir), index_path)
+    loaded = get_loaded_index(index_path)
+
+    selection = loaded.filters.select(MetadataFilter(authors=["Graham"], date_from="2013-01-01", date_to="2016"))
+    documents = [loaded.chunks.get_document(int(row)) for row in selection.rows]
+    assert documents
+    assert all(d["author"] == "Graham" and "2013" <= d["creation_date"][2:6] <= "2016" for d in documents)
+
+    (result,) = retrieve_batch([("dividends", index_path, 50, MetadataFilter(authors=["Graham"], date_to="2016"))])
+    assert sources(result) == {d["source_file"] for d in loaded.chunks.documents
+                              if d["author"] == "Graham" and d["creation_date"][2:6] <= "2016"}
+
+def test_strategy_and_empty_filters(mock_model, processed_dir):
+    index_path = str(processed_dir.parent / "index")
+    create_faiss_index(str(processed_dir), index_path)
+    filters = get_loaded_index(index_path).filters
+
+    assert filters.select(None) is None
+    assert filters.select(MetadataFilter()) is None
+    assert len(filters.select(MetadataFilter(chunking_strategies=["regular"]))) == 60
+    assert len(filters.select(MetadataFilter(chunking_strategies=["dense"]))) == 0
+    # Repeated filters reuse the cached selection
+    f = MetadataFilter(source_files=["doc_1.pdf"])
+    assert filters.select(f) is filters.select(f)
+
+def test_hybrid_lexical_hits_are_filtered(mock_model, processed_dir, monkeypatch):
+    monkeypatch.setenv("RETRIEVAL_HYBRID", "true")
+    index_path = str(processed_dir.parent / "index")
+    create_faiss_index(str(processed_dir), index_path)
+
+    (result,) = retrieve_batch([("number 7", index_path, 3, MetadataFilter(source_files=["doc_8.pdf", "doc_9.pdf"]))])
+    assert sources(result) == {"doc_8.pdf", "doc_9.pdf"}
+
+def test_filter_after_incremental_update(mock_model, processed_dir, monkeypatch):
+    monkeypatch.setenv("RETRIEVAL_HYBRID", "false")
+    index_path = str(processed_dir.parent / "index")
+    create_faiss_index(str(processed_dir), index_path)
+    (processed_dir / "doc_0.json").unlink()
+    with open(processed_dir / "doc_5.json", "w") as f:
+        json.dump({
+            "text": "Rewritten notes on margin.",
+            "metadata": {"title": "Doc 5", "author": "Hull", "creation_date": "2024", "source_file": "doc_5.pdf"}
+        }, f)
+    update_faiss_index(str(processed_dir), index_path)
+
+    # Vector ids no longer equal rows, the selector bitmap is keyed by vector id
+    (result,) = retrieve_batch([("margin", index_path, 3, MetadataFilter(source_files=["doc_5.pdf"]))])
+    assert sources(result) == {"doc_5.pdf"}
+    assert result.chunks.get_text(int(result.rows[0])) == "Rewritten notes on margin."
+
+def test_queries_with_different_filters_in_one_batch(mock_model, processed_dir):
+    index_path = str(processed_dir.parent / "index")
+    create_faiss_index(str(processed_dir), index_path)
+
+    first, second, unfiltered = retrieve_batch([
+        ("options", index_path, 2, MetadataFilter(source_files=["doc_1.pdf"])),
+        ("options", index_path, 2, MetadataFilter(source_files=["doc_2.pdf"])),
+        ("options", index_path, 2)
+    ])
+    assert sources(first) == {"doc_1.pdf"}
+    assert sources(second) == {"doc_2.pdf"}
+    assert len(unfiltered.rows) == 2
@@ -72,4 +72,26 @@ async def test_pdf_agent_chunk_ordering():
     if response and response.relevant_chunks:
         # Check that chunks are ordered by similarity score (descending)
         scores = [chunk.similarity_score for chunk in response.relevant_chunks]
-        assert scores == sorted(scores, reverse=True) 
\ No newline at end of file
+        assert scores == sorted(scores, reverse=True) 
+@pytest.mark.asyncio
+async def test_pdf_agent_pages_credited_to_primary_source(monkeypatch):
+    """Test that a chunk's page range is given for its own file only"""
+    chunk = PDFContext(
+        text="Past performance does not guarantee future results.",
+        source_file="a.pdf",
+        chunk_id=0,
+        total_chunks=1,
+        similarity_score=0.9,
+        duplicate_sources=["b.pdf", "c.pdf"],
+        page_start=3,
+        page_end=4
+    )
+
+    async def fake_context(query, index_paths):
+        return PDFAgentResponse(relevant_chunks=[chunk])
+
+    monkeypatch.setattr("server.src.agents.pdf_agent.resolve_collections", lambda collections: [])
+    monkeypatch.setattr("server.src.agents.pdf_agent.get_pdf_context", fake_context)
+    response = await create_pdf_agent()("What about past performance?")
+
+    assert "Source: a.pdf (pages 3-4), b.pdf, c.pdf\n" in response.synthesized_answer
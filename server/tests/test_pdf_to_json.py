@@ -0,0 +1,115 @@
+import os
+import tempfile
+from pathlib import Path
+import fitz
+import pytest
+from server.src.index import pdf_to_json
+from server.src.index.pdf_to_json import (
+    clean_text,
+    convert_pdfs_to_text,
+    join_pages,
+    page_ranges,
+    read_processed_document
+)
+from server.src.index.extraction_cache import ExtractionCache
+from server.src.index.json_to_index import load_documents
+
+@pytest.fixture
+def pdf_dirs():
+    """Create temporary folders with two small generated PDFs"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_dir = Path(tmp_dir) / "pdfs"
+        text_dir = Path(tmp_dir) / "processed"
+        pdf_dir.mkdir()
+        for name, num_pages in [("short.pdf", 3), ("long.pdf", 12)]:
+            doc = fitz.open()
+            for i in range(num_pages):
+                page = doc.new_page()
+                page.insert_text((72, 72), f"{name} page {i} revenue")
+            doc.set_metadata({"title": name, "author": "Tester"})
+            doc.save(pdf_dir / name)
+            doc.close()
+        yield str(pdf_dir), text_dir
+
+def test_page_ranges():
+    assert page_ranges(12, 5) == [(0, 5), (5, 10), (10, 12)]
+    assert page_ranges(0, 5) == [(0, 0)]
+
+def test_clean_text_moves_page_offsets():
+    pages = ["Revenue  grew.\n\n", "\n\nMargins    held. ", "", "Outlook\n\n\nstable."]
+    text, offsets = join_pages(pages)
+    cleaned, cleaned_offsets = clean_text(text, offsets)
+
+    # Same text as cleaning without offsets
+    assert cleaned == text.replace("\n\n", " ").replace("  ", " ")
+    assert cleaned_offsets[-1] == len(cleaned)
+    assert [cleaned[a:b] for a, b in zip(cleaned_offsets, cleaned_offsets[1:])] == [
+        "Revenue grew. ", "Margins  held. ", "", "Outlook \nstable."
+    ]
+
+def test_parallel_matches_serial(pdf_dirs):
+    """Splitting files into page ranges across workers gives the same documents"""
+    pdf_dir, text_dir = pdf_dirs
+    serial_stats = convert_pdfs_to_text(pdf_dir, str(text_dir / "serial"), workers=1)
+    parallel_stats = convert_pdfs_to_text(pdf_dir, str(text_dir / "parallel"), workers=2, pages_per_task=4)
+
+    for name in ["short.json.zst", "long.json.zst"]:
+        serial_text, serial_metadata = read_processed_document(str(text_dir / "serial" / name))
+        parallel_text, parallel_metadata = read_processed_document(str(text_dir / "parallel" / name))
+        assert (serial_text, serial_metadata) == (parallel_text, parallel_metadata)
+    assert "long.pdf page 11 revenue" in serial_text
+    assert serial_metadata["author"] == "Tester"
+    offsets = serial_metadata["page_offsets"]
+    assert len(offsets) == 13 and offsets[-1] == len(serial_text)
+    assert all(
+        f"long.pdf page {i} revenue" in serial_text[offsets[i]:offsets[i + 1]] for i in range(12)
+    )
+
+    assert {s.source_file: s.pages for s in parallel_stats} == {"long.pdf": 12, "short.pdf": 3}
+    assert all(s.pages_per_second > 0 for s in serial_stats + parallel_stats)
+
+def test_cache_only_opens_changed_pdfs(pdf_dirs, monkeypatch):
+    pdf_dir, text_dir = pdf_dirs
+    convert_pdfs_to_text(pdf_dir, str(text_dir / "uncached"), workers=1)
+    uncached = sorted(load_documents(str(text_dir / "uncached")))
+
+    cache = ExtractionCache(str(text_dir / "extraction_cache.sqlite"))
+    first = convert_pdfs_to_text(pdf_dir, str(text_dir / "cached"), workers=1, cache=cache)
+    assert not any(s.cached for s in first)
+
+    # Unchanged PDFs are served from the cache without being opened
+    opened = []
+    extract_page_range = pdf_to_json.extract_page_range
+    def tracking_extract(file_path, start, end):
+        opened.append(os.path.basename(file_path))
+        return extract_page_range(file_path, start, end)
+    monkeypatch.setattr(pdf_to_json, "extract_page_range", tracking_extract)
+
+    second = convert_pdfs_to_text(pdf_dir, str(text_dir / "cached"), workers=1, cache=cache)
+    assert all(s.cached for s in second) and opened == []
+    assert sorted(load_documents(str(text_dir / "cached"))) == uncached
+
+    # Changing one PDF re-extracts only that file
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "restated revenue")
+    doc.save(Path(pdf_dir) / "short.pdf")
+    doc.close()
+    third = convert_pdfs_to_text(pdf_dir, str(text_dir / "cached"), workers=1, cache=cache)
+    assert {s.source_file: s.cached for s in third} == {"long.pdf": True, "short.pdf": False}
+    assert opened == ["short.pdf"]
+    stats = cache.stats()
+    assert (stats.entries, stats.hits, stats.misses) == (3, 3, 3)
+
+def test_processed_documents_compressed(pdf_dirs, monkeypatch):
+    pdf_dir, text_dir = pdf_dirs
+    monkeypatch.setenv("PROCESSED_COMPRESSION", "false")
+    convert_pdfs_to_text(pdf_dir, str(text_dir), workers=1)
+    plain = sorted(load_documents(str(text_dir)))
+    plain_size = os.path.getsize(text_dir / "long.json")
+
+    # Switching format replaces the old files instead of loading documents twice
+    monkeypatch.setenv("PROCESSED_COMPRESSION", "true")
+    convert_pdfs_to_text(pdf_dir, str(text_dir), workers=1)
+    assert sorted(os.listdir(text_dir)) == ["long.json.zst", "short.json.zst"]
+    assert sorted(load_documents(str(text_dir))) == plain
+    assert os.path.getsize(text_dir / "long.json.zst") < plain_size
@@ -0,0 +1,136 @@
+import json
+import tempfile
+import pytest
+from pathlib import Path
+from server.src.data_model import PDFContext
+from server.src.index.json_to_index import create_faiss_index
+from server.src.index.reranker import register_cross_encoder
+from server.src.index.retrieval_batcher import RetrievalRequest, retrieve_batch
+from server.src.tools.pdf_tools import get_relevant_chunks, get_pdf_page
+from server.tests.mocks.mock_cross_encoder import MockCrossEncoder
+
+DOCUMENTS = {
+    "options.json": "A call option gives the holder the right to buy. A put option gives the right to sell.",
+    "balance.json": "The balance sheet lists assets, liabilities and shareholder equity.",
+    "macro.json": "Inflation in the euro area slowed while employment stayed strong."
+}
+
+# A rare ticker in a long filing ranks high on BM25 but low on cosine, so
+# the fused order differs from the cosine order for HYBRID_QUERY
+HYBRID_DOCUMENTS = {
+    "ticker": "AAPL guidance for the next fiscal year was raised after strong iPhone demand in Asia and Europe.",
+    "revenue": "Revenue growth revenue growth and more revenue growth across every quarterly report.",
+    "growth": "Growth in revenue slowed as the quarterly report showed weaker growth.",
+    "margin": "Gross margin improved while operating costs fell.",
+    "services": "Revenue growth in services.",
+    "wearables": "Revenue growth in wearables.",
+    "targets": "Revenue and growth targets.",
+    "cash": "Free cash flow covered the dividend twice."
+}
+HYBRID_QUERY = "AAPL revenue growth report"
+
+@pytest.fixture
+def index_dir(mock_model):
+    """Build a small index with the mock model"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processed_dir = Path(tmp_dir) / "processed"
+        index_dir = Path(tmp_dir) / "indexes"
+        processed_dir.mkdir()
+
+        for file_name, text in DOCUMENTS.items():
+            with open(processed_dir / file_name, "w") as f:
+                metadata = {
+                    "title": file_name,
+                    "author": "Test",
+                    "creation_date": "2024",
+                    "source_file": file_name.replace(".json", ".pdf")
+                }
+                if file_name == "options.json":
+                    # Two pages, one sentence each
+                    metadata["page_offsets"] = [0, text.index("A put"), len(text)]
+                json.dump({"text": text, "metadata": metadata}, f)
+
+        create_faiss_index(str(processed_dir), str(index_dir))
+        yield str(index_dir)
+
+@pytest.mark.asyncio
+async def test_relevant_chunks_from_small_index(index_dir):
+    """Fewer vectors than k returns only real hits"""
+    chunks = await get_relevant_chunks("what is a put option", index_dir)
+
+    assert len(chunks) == len(DOCUMENTS)
+    assert all(isinstance(chunk, PDFContext) for chunk in chunks)
+    assert {chunk.source_file for chunk in chunks} == {"options.pdf", "balance.pdf", "macro.pdf"}
+
+@pytest.mark.asyncio
+async def test_empty_query_returns_nothing(index_dir):
+    assert await get_relevant_chunks("   ", index_dir) == []
+
+@pytest.mark.asyncio
+async def test_pages_served_from_chunk_store(index_dir):
+    chunks = await get_relevant_chunks("what is a put option", index_dir)
+    pages = {chunk.source_file: (chunk.page_start, chunk.page_end) for chunk in chunks}
+    assert pages["options.pdf"] == (1, 2)
+    assert pages["balance.pdf"] == (None, None)
+
+    page = await get_pdf_page("options.pdf", 2, index_dir)
+    assert (page.page, page.num_pages) == (2, 2)
+    assert page.text == "A put option gives the right to sell."
+
+    assert await get_pdf_page("options.pdf", 3, index_dir) is None
+    assert await get_pdf_page("balance.pdf", 1, index_dir) is None
+    assert await get_pdf_page("missing.pdf", 1, index_dir) is None
+
+@pytest.mark.asyncio
+async def test_best_match_comes_first(index_dir, monkeypatch):
+    monkeypatch.setenv("RETRIEVAL_HYBRID", "false")
+    chunks = await get_relevant_chunks("inflation in the euro area slowed", index_dir)
+
+    assert chunks[0].source_file == "macro.pdf"
+    scores = [chunk.similarity_score for chunk in chunks]
+    assert scores == sorted(scores, reverse=True)
+    # Cosine similarity of normalized embeddings, reported unchanged
+    assert 0.5 < scores[0] <= 1.0 + 1e-6
+
+@pytest.fixture
+def hybrid_index_dir(mock_model, tmp_dir):
+    processed_dir = tmp_dir / "processed"
+    processed_dir.mkdir()
+    for name, text in HYBRID_DOCUMENTS.items():
+        with open(processed_dir / f"{name}.json", "w") as f:
+            json.dump({
+                "text": text,
+                "metadata": {"title": name, "author": "Test", "creation_date": "2024", "source_file": f"{name}.pdf"}
+            }, f)
+    create_faiss_index(str(processed_dir), str(tmp_dir / "indexes"))
+    return str(tmp_dir / "indexes")
+
+@pytest.mark.asyncio
+async def test_hybrid_order_kept(hybrid_index_dir, monkeypatch):
+    """Fused rows come back in fused order, not re-sorted by their cosine scores"""
+    monkeypatch.setenv("RETRIEVAL_HYBRID", "true")
+    (result,) = retrieve_batch([RetrievalRequest(HYBRID_QUERY, hybrid_index_dir, 7)])
+    fused = [result.chunks.get_metadata(int(row)).source_file for row in result.rows]
+
+    chunks = await get_relevant_chunks(HYBRID_QUERY, hybrid_index_dir)
+
+    assert [chunk.source_file for chunk in chunks] == fused
+    # The ticker filing is fused above documents with a higher cosine score
+    scores = {chunk.source_file: chunk.similarity_score for chunk in chunks}
+    assert fused.index("ticker.pdf") < fused.index("services.pdf")
+    assert scores["ticker.pdf"] < scores["services.pdf"]
+
+@pytest.mark.asyncio
+async def test_cross_encoder_scores_reported_as_predicted(index_dir, monkeypatch):
+    """predict already returns probabilities, they are not squashed a second time"""
+    cross_encoder = MockCrossEncoder()
+    register_cross_encoder(cross_encoder)
+    monkeypatch.setenv("RETRIEVAL_RERANK", "cross_encoder")
+    query = "what is a put option"
+
+    chunks = await get_relevant_chunks(query, index_dir)
+
+    assert chunks[0].source_file == "options.pdf"
+    expected = cross_encoder.predict([(query, DOCUMENTS["options.json"])])[0]
+    assert chunks[0].similarity_score == pytest.approx(float(expected))
+    assert chunks[0].similarity_score > 0.9
@@ -0,0 +1,56 @@
+import tempfile
+import numpy as np
+import pytest
+from sentence_transformers import SentenceTransformer
+from server.src.index.query_cache import (
+    QueryEmbeddingCache,
+    get_query_embeddings,
+    lowercases_input,
+    normalize_query,
+    query_cache
+)
+from server.src.index.retrieval_batcher import embed_queries
+from server.tests.mocks.tiny_model import save_tiny_sentence_transformer
+
+def test_repeated_query_skips_model(mock_model):
+    """Retrieval embeds queries through the cache"""
+    first = embed_queries(["How do options work?"])
+    second = embed_queries(["  How do   options work? ", "what is a put"])
+
+    assert mock_model.encoded_texts == 2
+    assert np.array_equal(first[0], second[0])
+    stats = query_cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 2, 2)
+
+def test_normalize_query():
+    assert normalize_query(" What  is a\tPUT ") == "What is a PUT"
+    assert normalize_query(" What  is a\tPUT ", lowercase=True) == "what is a put"
+
+@pytest.mark.parametrize("lower_case", [True, False])
+def test_case_folded_only_for_uncased_models(mock_model, lower_case):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = SentenceTransformer(save_tiny_sentence_transformer(tmp_dir, lower_case=lower_case), device="cpu")
+    assert lowercases_input(model) == lower_case
+
+    get_query_embeddings(model, ["what is a put", "What is a PUT"], "tiny")
+    assert query_cache.stats().entries == (1 if lower_case else 2)
+
+def test_evicts_least_recently_used():
+    cache = QueryEmbeddingCache(max_entries=2)
+    for name in ["a", "b"]:
+        cache.put(("m", name), np.ones(4))
+    cache.get(("m", "a"))
+    cache.put(("m", "c"), np.ones(4))
+
+    assert cache.get(("m", "b")) is None
+    assert cache.get(("m", "a")) is not None
+    assert cache.stats().entries == 2
+
+def test_byte_limit():
+    cache = QueryEmbeddingCache(max_entries=100, max_bytes=3 * 384 * 4)
+    for i in range(5):
+        cache.put(("m", str(i)), np.ones(384))
+
+    stats = cache.stats()
+    assert stats.entries == 3
+    assert stats.bytes <= 3 * 384 * 4
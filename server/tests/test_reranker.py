@@ -0,0 +1,94 @@
+import json
+import tempfile
+import numpy as np
+import pytest
+from pathlib import Path
+from server.src.data_model import IndexConfig, IndexType
+from server.src.index.json_to_index import create_faiss_index
+from server.src.index.reranker import register_cross_encoder
+from server.src.index.retrieval_batcher import retrieve_batch, stage_timings
+from server.tests.mocks.mock_cross_encoder import MockCrossEncoder
+
+TOPICS = [
+    "call options give the right to buy",
+    "put options give the right to sell",
+    "the balance sheet lists assets and liabilities",
+    "cash flow statements track operating cash",
+    "interest rates move bond prices",
+    "dividends are paid from earnings",
+    "earnings per share divides net income",
+    "market capitalization is price times shares"
+]
+
+@pytest.fixture
+def mock_model(mock_model, monkeypatch):
+    # Re-ranking is compared against plain vector search
+    monkeypatch.setenv("RETRIEVAL_HYBRID", "false")
+    return mock_model
+
+def build_index(tmp_dir: str, index_type: IndexType) -> str:
+    processed = Path(tmp_dir) / "processed"
+    processed.mkdir(exist_ok=True)
+    for i, topic in enumerate(TOPICS):
+        with open(processed / f"doc_{i}.json", "w") as f:
+            json.dump({
+                "text": topic,
+                "metadata": {"title": topic, "author": "A", "creation_date": "2024", "source_file": f"doc_{i}.pdf"}
+            }, f)
+    index_path = str(Path(tmp_dir) / index_type.value)
+    create_faiss_index(str(processed), index_path, index_config=IndexConfig(index_type=index_type))
+    return index_path
+
+def test_exact_rerank_of_compressed_index_matches_flat(mock_model, monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        flat_path = build_index(tmp_dir, IndexType.FLAT)
+        sq8_path = build_index(tmp_dir, IndexType.SQ8)
+        monkeypatch.setenv("RETRIEVAL_RERANK", "exact")
+        monkeypatch.setenv("RETRIEVAL_CANDIDATES", "8")
+
+        queries = ["options to buy", "bond interest", "net income per share"]
+        flat = retrieve_batch([(q, flat_path, 3) for q in queries])
+        reranked = retrieve_batch([(q, sq8_path, 3) for q in queries])
+
+        for f, r in zip(flat, reranked):
+            assert list(f.rows) == list(r.rows)
+            assert np.allclose(f.scores, r.scores, atol=1e-2)
+        assert reranked[0].timings.reranker == "exact"
+        assert reranked[0].timings.candidates == 8
+
+def test_cross_encoder_scores_whole_batch_in_one_call(mock_model, monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_path = build_index(tmp_dir, IndexType.FLAT)
+        cross_encoder = MockCrossEncoder()
+        register_cross_encoder(cross_encoder)
+        monkeypatch.setenv("RETRIEVAL_RERANK", "cross_encoder")
+        monkeypatch.setenv("RETRIEVAL_CANDIDATES", "5")
+
+        results = retrieve_batch([
+            ("who pays dividends from earnings", index_path, 2),
+            ("right to sell put options", index_path, 1)
+        ])
+
+        assert cross_encoder.predict_calls == 1
+        assert cross_encoder.scored_pairs == 10
+        assert "dividends" in results[0].chunks.get_text(int(results[0].rows[0]))
+        assert len(results[0].rows) == 2 and len(results[1].rows) == 1
+        assert "put options" in results[1].chunks.get_text(int(results[1].rows[0]))
+        assert list(results[0].scores) == sorted(results[0].scores, reverse=True)
+
+def test_stage_timings_are_reported(mock_model):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_path = build_index(tmp_dir, IndexType.FLAT)
+        batches = stage_timings.stats().batches
+
+        (result,) = retrieve_batch([("cash flow", index_path, 2)])
+
+        timings = result.timings
+        assert timings.reranker == "none" and timings.queries == 1
+        assert timings.total_ms >= timings.embed_ms + timings.search_ms
+        assert stage_timings.stats().batches == batches + 1
+
+def test_unknown_reranker_is_rejected(mock_model, monkeypatch):
+    monkeypatch.setenv("RETRIEVAL_RERANK", "colbert")
+    with pytest.raises(ValueError):
+        retrieve_batch([("cash flow", "/nonexistent", 1)])
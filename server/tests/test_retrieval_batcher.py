@@ -0,0 +1,85 @@
+import json
+import asyncio
+import tempfile
+import pytest
+from pathlib import Path
+from server.src.index.json_to_index import create_faiss_index
+from server.src.index.retrieval_batcher import RetrievalBatcher, retrieve_batch
+
+TOPICS = ["call options", "put options", "balance sheet", "cash flow", "interest rates", "dividends"]
+
+@pytest.fixture
+def index_dir(mock_model):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processed_dir = Path(tmp_dir) / "processed"
+        processed_dir.mkdir()
+        for i, topic in enumerate(TOPICS):
+            with open(processed_dir / f"doc_{i}.json", "w") as f:
+                json.dump({
+                    "text": f"This guide explains {topic}.",
+                    "metadata": {"title": topic, "author": "A", "creation_date": "2024", "source_file": f"doc_{i}.pdf"}
+                }, f)
+        create_faiss_index(str(processed_dir), str(Path(tmp_dir) / "index"))
+        yield str(Path(tmp_dir) / "index")
+
+def test_batch_matches_single_queries(index_dir):
+    requests = [(f"explain {topic}", index_dir, 3) for topic in TOPICS]
+    batched = retrieve_batch(requests)
+
+    for request, result in zip(requests, batched):
+        single = retrieve_batch([request])[0]
+        assert list(result.rows) == list(single.rows)
+        assert result.chunks[int(result.rows[0])].text == single.chunks[int(single.rows[0])].text
+
+def test_batch_respects_each_k(index_dir):
+    small, large = retrieve_batch([("cash flow", index_dir, 1), ("cash flow", index_dir, 4)])
+    assert len(small.rows) == 1 and len(large.rows) == 4
+    assert small.rows[0] == large.rows[0]
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_share_one_encode(mock_model, index_dir):
+    batcher = RetrievalBatcher(max_batch_size=32, max_wait_ms=20)
+    encode_calls = mock_model.encode_calls
+
+    results = await asyncio.gather(*(batcher.search(f"explain {topic}", index_dir, 2) for topic in TOPICS))
+
+    assert len(results) == len(TOPICS)
+    assert mock_model.encode_calls - encode_calls == 1
+    stats = batcher.stats()
+    assert stats.queries == len(TOPICS) and stats.batches == 1
+    for topic, result in zip(TOPICS, results):
+        assert topic in result.chunks[int(result.rows[0])].text
+
+@pytest.mark.asyncio
+async def test_batch_size_limit(index_dir):
+    batcher = RetrievalBatcher(max_batch_size=2, max_wait_ms=20)
+    await asyncio.gather(*(batcher.search(topic, index_dir, 1) for topic in TOPICS))
+    assert batcher.stats().batches == 3
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller(mock_model):
+    batcher = RetrievalBatcher(max_wait_ms=5)
+    with pytest.raises(Exception):
+        await asyncio.gather(batcher.search("a", "/nonexistent/index", 1), batcher.search("b", "/nonexistent/index", 1))
+
+@pytest.mark.asyncio
+async def test_error_stays_with_its_group(mock_model, index_dir):
+    """A bad index path fails only the queries sent to it, not the ones batched with them"""
+    batcher = RetrievalBatcher(max_wait_ms=20)
+    good, bad, also_good = await asyncio.gather(
+        batcher.search("cash flow", index_dir, 1),
+        batcher.search("cash flow", "/nonexistent/index", 1),
+        batcher.search("options", index_dir, 1),
+        return_exceptions=True
+    )
+
+    assert batcher.stats().batches == 1
+    assert isinstance(bad, Exception)
+    assert "cash flow" in good.chunks[int(good.rows[0])].text
+    assert "options" in also_good.chunks[int(also_good.rows[0])].text
+
+def test_batch_returns_group_errors(index_dir):
+    good, bad = retrieve_batch([("cash flow", index_dir, 1), ("cash flow", "/nonexistent/index", 1)], True)
+    assert good.timings is not None and isinstance(bad, Exception)
+    with pytest.raises(Exception):
+        retrieve_batch([("cash flow", index_dir, 1), ("cash flow", "/nonexistent/index", 1)])
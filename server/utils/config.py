@@ -17,6 +17,80 @@ def get_alpha_vantage_config():
         "api_key": os.getenv("ALPHA_VANTAGE_API_KEY")
     }
 
+def get_embedding_config():
+    """Get embedding model configuration."""
+    return {
+        "model_name": os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
+        "device": os.getenv("EMBEDDING_DEVICE"),
+        "precision": os.getenv("EMBEDDING_PRECISION", "float32"),
+        "backend": os.getenv("EMBEDDING_BACKEND", "torch"),
+        "preload": os.getenv("EMBEDDING_PRELOAD", "true").lower() == "true",
+        "cache_path": os.getenv("EMBEDDING_CACHE_PATH", "server/tmp/embedding_cache.sqlite"),
+        "batch_size": int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+        "max_batch_tokens": int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "0")) or None,
+        "query_cache_entries": int(os.getenv("QUERY_CACHE_ENTRIES", "1024")),
+        "query_cache_bytes": int(os.getenv("QUERY_CACHE_BYTES", "0")) or None
+    }
 
+def get_extraction_config():
+    """Get PDF extraction cache and processed document configuration."""
+    return {
+        "cache_path": os.getenv("EXTRACTION_CACHE_PATH", "server/tmp/extraction_cache.sqlite"),
+        # Processed documents are written as zstd-compressed JSON (<name>.json.zst) unless disabled
+        "compress": os.getenv("PROCESSED_COMPRESSION", "true").lower() == "true",
+        "zstd_level": int(os.getenv("ZSTD_LEVEL", "3"))
+    }
 
+def get_chunking_config():
+    """Get document chunking configuration."""
+    return {
+        # characters: 800/1000 character chunks; tokens: cut at the embedding model's token budget
+        "mode": os.getenv("CHUNKING_MODE", "characters").lower(),
+        "max_tokens": int(os.getenv("CHUNK_MAX_TOKENS", "0")) or None,
+        "overlap_tokens": int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+    }
+
+def get_dedup_config():
+    """Get near-duplicate chunk elimination configuration."""
+    return {
+        "enabled": os.getenv("CHUNK_DEDUP", "true").lower() == "true",
+        # Estimated Jaccard similarity of word 3-grams above which chunks share one vector
+        "threshold": float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.9")),
+        # Representative signatures streaming ingest remembers (about 3 KB each)
+        "max_signatures": int(os.getenv("CHUNK_DEDUP_MAX_SIGNATURES", "100000"))
+    }
 
+def get_retrieval_config():
+    """Get PDF retrieval configuration."""
+    return {
+        "batching": os.getenv("RETRIEVAL_BATCHING", "true").lower() == "true",
+        "batch_size": int(os.getenv("RETRIEVAL_BATCH_SIZE", "32")),
+        "batch_wait_ms": float(os.getenv("RETRIEVAL_BATCH_WAIT_MS", "2")),
+        "hybrid": os.getenv("RETRIEVAL_HYBRID", "true").lower() == "true",
+        "hybrid_candidates": int(os.getenv("RETRIEVAL_HYBRID_CANDIDATES", "50")),
+        "rrf_k": int(os.getenv("RETRIEVAL_RRF_K", "60")),
+        "rerank": os.getenv("RETRIEVAL_RERANK", "none").lower(),
+        "candidates": int(os.getenv("RETRIEVAL_CANDIDATES", "100")),
+        "cross_encoder": os.getenv("RETRIEVAL_CROSS_ENCODER", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+        "rerank_batch_size": int(os.getenv("RETRIEVAL_RERANK_BATCH_SIZE", "32")),
+        "rerank_max_length": int(os.getenv("RETRIEVAL_RERANK_MAX_LENGTH", "256"))
+    }
+
+def get_collections_config():
+    """Get PDF collection locations and the resident index memory budget."""
+    return {
+        "index_path": os.getenv("INDEX_PATH", "server/tmp/indexes"),
+        "collections_root": os.getenv("COLLECTIONS_ROOT", "server/tmp/collections"),
+        "pdf_collections": [
+            name.strip() for name in os.getenv("PDF_COLLECTIONS", "default").split(",") if name.strip()
+        ],
+        "memory_budget_bytes": int(float(os.getenv("INDEX_MEMORY_BUDGET_MB", "4096")) * 1024 * 1024)
+    }
+
+def get_executor_config():
+    """Get sizes of the thread pools for blocking tool work."""
+    return {
+        "retrieval_workers": int(os.getenv("EXECUTOR_RETRIEVAL_WORKERS", str(min(4, os.cpu_count() or 1)))),
+        "io_workers": int(os.getenv("EXECUTOR_IO_WORKERS", "16")),
+        "max_pending": int(os.getenv("EXECUTOR_MAX_PENDING", "64"))
+    }